@@ -0,0 +1,183 @@
+"""Εργαλεία διαχείρισης του WMS από τη γραμμή εντολών.
+
+Τρέχουν από τον φάκελο της εφαρμογής, π.χ.:
+
+    python wms_admin.py upgrade-storage
+    python wms_admin.py migrate
+    python wms_admin.py reconcile
+    python wms_admin.py migrate-layout sharded
+    python wms_admin.py archive --days 90
+    python wms_admin.py snapshot "Άσκηση 3" --class Γ1
+    python wms_admin.py snapshots
+    python wms_admin.py restore "Άσκηση 3" --class Γ1 --from s001
+    python wms_admin.py serve --workers 4 --port 8501
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from wms_app import (
+    STORAGE_LAYOUTS, StudentWMS, connect_db, migrate_student_db, rebuild_stock_balances,
+)
+
+
+def cmd_upgrade_storage(args):
+    wms = StudentWMS()
+    for path, mode in wms.upgrade_storage():
+        print(f"{path}: journal_mode={mode}")
+
+
+def cmd_migrate(args):
+    # Οι βάσεις ενημερώνονται ούτως ή άλλως με το πρώτο άνοιγμα· εδώ όλες μαζί
+    wms = StudentWMS()
+    for path in wms.layout.iter_paths():
+        conn = connect_db(path)
+        try:
+            applied = migrate_student_db(conn)
+            notes = conn.execute(
+                "SELECT entity, entity_id, note FROM migration_log "
+                f"WHERE version IN ({', '.join('?' for _ in applied)})", applied
+            ).fetchall() if applied else []
+        finally:
+            conn.close()
+        print(f"{path}: {applied or 'ενημερωμένη'}")
+        for entity, entity_id, note in notes:
+            print(f"  {entity} #{entity_id}: {note}")
+
+
+def cmd_reconcile(args):
+    wms = StudentWMS()
+    for path in wms.layout.iter_paths():
+        conn = connect_db(path)
+        try:
+            migrate_student_db(conn)
+            drift, quantity_drift = rebuild_stock_balances(conn)
+        finally:
+            conn.close()
+        print(f"{path}: {drift} διαφορές θέσεων, {quantity_drift} διαφορές συνολικού αποθέματος")
+
+
+def cmd_migrate_layout(args):
+    wms = StudentWMS()
+    source = wms.layout.name
+    moved = wms.migrate_layout(STORAGE_LAYOUTS[args.layout]())
+    print(f"{source} -> {args.layout}: μεταφέρθηκαν {moved} βάσεις")
+
+
+def cmd_archive(args):
+    wms = StudentWMS()
+    archived = wms.archive_inactive(args.days)
+    print(f"Αρχειοθετήθηκαν {len(archived)} βάσεις")
+
+
+def cmd_snapshot(args):
+    wms = StudentWMS()
+    if args.empty:
+        digest = wms.snapshots.take_empty(args.label)
+        print(f"{args.label}: κενή αποθήκη {digest[:12]}")
+        return
+    students = wms.class_students(args.class_name) if args.class_name else args.students
+    result = wms.snapshots.take(args.label, students)
+    print(f"{args.label}: {result['taken']} στιγμιότυπα, {result['stored']} νέα αρχεία, "
+          f"{result['skipped']} χωρίς βάση, {result['seconds']:.2f} δευτ.")
+
+
+def cmd_snapshots(args):
+    wms = StudentWMS()
+    for row in wms.snapshots.labels():
+        print(f"{row['label']}: {row['snapshots']} στιγμιότυπα, {row['files']} αρχεία, {row['created_date']}")
+
+
+def cmd_restore(args):
+    wms = StudentWMS()
+    snapshots = wms.snapshots.catalog(args.label)
+    if args.source is not None:
+        snapshots = [s for s in snapshots if s['student_id'] == args.source]
+    if not snapshots:
+        raise SystemExit(f"Δεν βρέθηκε στιγμιότυπο {args.label!r}")
+    if len({s['digest'] for s in snapshots}) > 1:
+        raise SystemExit("Η ετικέτα έχει διαφορετικά αρχεία ανά μαθητή· διάλεξε πρότυπο με --from")
+    result = wms.snapshots.restore_class(args.class_name, snapshots[0]['digest'], workers=args.workers)
+    print(f"{args.class_name}: επαναφέρθηκαν {result['restored']} βάσεις σε {result['seconds']:.2f} δευτ.")
+    if result['busy']:
+        print(f"Σε χρήση: {', '.join(result['busy'])}")
+
+
+def cmd_serve(args):
+    # Σχήμα και φάκελοι μία φορά, πριν ξεκινήσουν οι διεργασίες μαζί
+    StudentWMS()
+    env = dict(os.environ, WMS_MULTIPROCESS='1')
+    procs = []
+    for i in range(args.workers):
+        port = args.port + i
+        procs.append(subprocess.Popen(
+            [sys.executable, '-m', 'streamlit', 'run', 'wms_app.py',
+             '--server.port', str(port), '--server.headless', 'true'],
+            env=env,
+        ))
+        print(f"Διεργασία {i + 1}: http://localhost:{port}")
+    print("Ο load balancer μπροστά τους χρειάζεται sticky sessions (websocket, "
+          "media και λήψεις αρχείων μένουν στη διεργασία που τα έφτιαξε).")
+    try:
+        for proc in procs:
+            proc.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Διαχείριση WMS Μαθητών")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('upgrade-storage', help="WAL και PRAGMA προφίλ σε όλες τις βάσεις")
+    p.set_defaults(func=cmd_upgrade_storage)
+
+    p = sub.add_parser('migrate', help="εκδόσεις σχήματος σε όλες τις βάσεις μαθητών")
+    p.set_defaults(func=cmd_migrate)
+
+    p = sub.add_parser('reconcile', help="υπόλοιπα ανά θέση από το ημερολόγιο κινήσεων")
+    p.set_defaults(func=cmd_reconcile)
+
+    p = sub.add_parser('migrate-layout', help="μεταφορά βάσεων μαθητών σε άλλο layout")
+    p.add_argument('layout', choices=sorted(STORAGE_LAYOUTS))
+    p.set_defaults(func=cmd_migrate_layout)
+
+    p = sub.add_parser('archive', help="συμπίεση ανενεργών βάσεων στο student_archive/")
+    p.add_argument('--days', type=float, default=90)
+    p.set_defaults(func=cmd_archive)
+
+    p = sub.add_parser('snapshot', help="στιγμιότυπο βάσεων μαθητών με ετικέτα")
+    p.add_argument('label')
+    group = p.add_mutually_exclusive_group(required=True)
+    group.add_argument('--class', dest='class_name')
+    group.add_argument('--students', nargs='+')
+    group.add_argument('--empty', action='store_true', help="η άδεια βάση του template")
+    p.set_defaults(func=cmd_snapshot)
+
+    p = sub.add_parser('snapshots', help="λίστα στιγμιοτύπων ανά ετικέτα")
+    p.set_defaults(func=cmd_snapshots)
+
+    p = sub.add_parser('restore', help="επαναφορά όλης της τάξης από στιγμιότυπο")
+    p.add_argument('label')
+    p.add_argument('--class', dest='class_name', required=True)
+    p.add_argument('--from', dest='source', help="μαθητής του στιγμιοτύπου που θα γίνει πρότυπο")
+    p.add_argument('--workers', type=int, default=8)
+    p.set_defaults(func=cmd_restore)
+
+    p = sub.add_parser('serve', help="πολλές διεργασίες Streamlit με κοινές συνδέσεις και κλειδώματα")
+    p.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    p.add_argument('--port', type=int, default=8501)
+    p.set_defaults(func=cmd_serve)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,3042 @@
+import time
+
+# Αρχή εκτέλεσης του script· το Streamlit το ξανατρέχει σε κάθε rerun
+SCRIPT_STARTED = time.perf_counter()
+
 import streamlit as st
 import sqlite3
-import pandas as pd
+import atexit
+import functools
 import os
-from datetime import datetime, date   # χρειαζόμαστε και date
+import pathlib
+import queue
+import random
+import re
+import shutil
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+import csv
+import glob
+import gzip
+import io
+import tempfile
+import uuid
+import zipfile
+import hashlib
+import hmac
+import html
+import json
+import secrets
+import socket
+from datetime import datetime, date, timedelta   # χρειαζόμαστε και date
+
+try:
+    import fcntl
+except ImportError:  # Windows: τα κλειδώματα ισχύουν μόνο μέσα στη διεργασία
+    fcntl = None
+
+# Ρύθμιση σελίδας
+st.set_page_config(
+    page_title="WMS Μαθητών",
+    page_icon="📦",
+    layout="wide"
+)
+
+# Προφίλ αποθήκευσης για master.db και κάθε βάση μαθητή.
+# WAL: οι αναγνώστες (dashboard, αποθήκη) δεν μπλοκάρουν από τους εγγραφείς
+# και synchronous=NORMAL γλιτώνει το fsync σε κάθε commit.
+STORAGE_PROFILE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -16000,        # ~16 MB (αρνητικό = KiB)
+    'mmap_size': 64 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Κάθε πόσα δευτερόλεπτα γίνεται checkpoint του WAL και PRAGMA optimize
+MAINTENANCE_INTERVAL = 300
+
+
+def apply_storage_profile(conn, profile=None):
+    """Εφαρμόζει τα PRAGMA του προφίλ σε μια σύνδεση."""
+    for name, value in (STORAGE_PROFILE if profile is None else profile).items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def process_singleton(factory):
+    """Getter για ένα αντικείμενο ανά διεργασία αντί για ένα ανά rerun.
+
+    Μέσα στο Streamlit το κρατά το st.cache_resource· σε απλό import
+    (wms_admin, wms_bench) δεν υπάρχει runtime και αρκεί ένα closure.
+    """
+    cached = st.cache_resource(factory)
+    local = []
+    lock = threading.Lock()
+
+    @functools.wraps(factory)
+    def get():
+        if st.runtime.exists():
+            return cached()
+        with lock:
+            if not local:
+                local.append(factory())
+            return local[0]
+    return get
+
+
+class PerfRecorder:
+    """Μετρήσεις ερωτημάτων και χρόνων σελίδας σε κυκλικό buffer.
+
+    Κάθε ερώτημα καταγράφεται με τη βάση, το SQL, τον χρόνο (execute και
+    fetch) και τις γραμμές που επέστρεψε, μαζί με την ενότητα μενού που
+    έτρεχε εκείνη τη στιγμή στο thread.
+
+    Οι τιμές των παραμέτρων (ονόματα, ΑΦΜ, διευθύνσεις μαθητών) δεν
+    κρατιούνται, εκτός αν capture_params· στη θέση τους μπαίνει None, ώστε
+    το EXPLAIN QUERY PLAN να δένει ακόμη τον σωστό αριθμό παραμέτρων.
+    """
+
+    def __init__(self, max_queries=5000, max_sections=1000, slow_ms=50, capture_params=False):
+        self.queries = deque(maxlen=max_queries)
+        self.sections = deque(maxlen=max_sections)
+        self.slow_ms = slow_ms
+        self.capture_params = capture_params
+        self.startup = {}
+        self._local = threading.local()
+
+    @contextmanager
+    def section(self, name):
+        """Χρόνος ενός rerun για την ενότητα του μενού."""
+        previous = getattr(self._local, 'section', None)
+        self._local.section = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections.append({
+                'ts': time.time(),
+                'section': name,
+                'ms': (time.perf_counter() - started) * 1000,
+            })
+            self._local.section = previous
+
+    def record_query(self, db, sql, params, seconds, rows):
+        if isinstance(params, (list, tuple)):
+            params = list(params) if self.capture_params else [None] * len(params)
+        elif isinstance(params, dict) and not self.capture_params:
+            params = dict.fromkeys(params)
+        record = {
+            'ts': time.time(),
+            'section': getattr(self._local, 'section', None),
+            'db': db,
+            'sql': " ".join(sql.split()),
+            'params': params,
+            'ms': seconds * 1000,
+            'rows': rows,
+        }
+        self.queries.append(record)
+        return record
+
+    def record_startup(self, import_seconds, render_seconds):
+        """Χρόνος εκτέλεσης του script ως το main() και του main().
+
+        Κρατά τις τιμές της πρώτης εκτέλεσης στη διεργασία (κρύα εκκίνηση)
+        και της τελευταίας (rerun).
+        """
+        values = {'import_ms': import_seconds * 1000, 'render_ms': render_seconds * 1000}
+        if not self.startup:
+            self.startup['first'] = values
+        self.startup['last'] = values
+        self.startup['runs'] = self.startup.get('runs', 0) + 1
+
+    def query_stats(self):
+        import pandas as pd
+        df = pd.DataFrame(list(self.queries), columns=['section', 'sql', 'ms', 'rows'])
+        if df.empty:
+            return df
+        grouped = df.groupby('sql')
+        stats = grouped['ms'].describe(percentiles=[0.5, 0.95, 0.99])[['count', '50%', '95%', '99%', 'max']]
+        stats.columns = ['count', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']
+        stats['rows_avg'] = grouped['rows'].mean()
+        return stats.sort_values('p95_ms', ascending=False).reset_index()
+
+    def section_stats(self):
+        import pandas as pd
+        df = pd.DataFrame(list(self.sections), columns=['section', 'ms'])
+        if df.empty:
+            return df
+        stats = df.groupby('section')['ms'].describe(percentiles=[0.5, 0.95, 0.99])
+        stats = stats[['count', '50%', '95%', '99%', 'max']]
+        stats.columns = ['reruns', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']
+        return stats.reset_index()
+
+    def slow_queries(self):
+        return [q for q in list(self.queries) if q['ms'] >= self.slow_ms]
+
+    def export_jsonl(self):
+        lines = [json.dumps({'kind': 'query', **q}, ensure_ascii=False, default=str) for q in list(self.queries)]
+        lines += [json.dumps({'kind': 'section', **s}, ensure_ascii=False) for s in list(self.sections)]
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        self.queries.clear()
+        self.sections.clear()
+
+
+@process_singleton
+def get_perf_recorder():
+    """Ένα κοινό PerfRecorder για όλες τις συνεδρίες και τα reruns."""
+    return PerfRecorder(
+        slow_ms=float(os.environ.get('WMS_SLOW_QUERY_MS', 50)),
+        # WMS_INSTRUMENT_PARAMS=1 κρατά και τις τιμές των παραμέτρων, μόνο για αποσφαλμάτωση
+        capture_params=os.environ.get('WMS_INSTRUMENT_PARAMS', '0') == '1',
+    )
+
+
+perf = get_perf_recorder()
+
+# WMS_INSTRUMENT=0 απενεργοποιεί τις μετρήσεις ερωτημάτων
+INSTRUMENT = os.environ.get('WMS_INSTRUMENT', '1') != '0'
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor που μετρά χρόνο και γραμμές για κάθε ερώτημα στο perf."""
+
+    _record = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._record = perf.record_query(
+                self.connection.label, sql, parameters,
+                time.perf_counter() - started, max(self.rowcount, 0)
+            )
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._record = perf.record_query(
+                self.connection.label, sql, None,
+                time.perf_counter() - started, max(self.rowcount, 0)
+            )
+
+    def _fetched(self, rows, started):
+        if self._record is not None:
+            self._record['rows'] += rows
+            self._record['ms'] += (time.perf_counter() - started) * 1000
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(row is not None, started)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(len(rows), started)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(len(rows), started)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        row = super().__next__()
+        self._fetched(1, started)
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Σύνδεση που περνά όλα τα ερωτήματα και τα commit από το perf."""
+
+    label = ''
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            perf.record_query(self.label, "COMMIT", None, time.perf_counter() - started, 0)
+
+
+def connect_db(path, profile=None, **kwargs):
+    if INSTRUMENT:
+        kwargs.setdefault('factory', InstrumentedConnection)
+    conn = sqlite3.connect(path, **kwargs)
+    if isinstance(conn, InstrumentedConnection):
+        conn.label = path
+    register_sql_functions(conn)
+    return apply_storage_profile(conn, profile)
+
+
+def readonly_uri(path):
+    """URI μόνο ανάγνωσης για το αρχείο.
+
+    Το path κωδικοποιείται, ώστε #, ? και % στο όνομα να μη διαβαστούν ως
+    μέρη του URI (άλλο αρχείο ή mode=ro που χάνεται).
+    """
+    return pathlib.Path(path).resolve().as_uri() + "?mode=ro"
+
+
+def connect_readonly(path):
+    """Σύνδεση μόνο ανάγνωσης, για χρήση και από άλλα threads."""
+    conn = sqlite3.connect(readonly_uri(path), uri=True, check_same_thread=False)
+    conn.execute("PRAGMA busy_timeout = 5000")
+    return conn
+
+
+def run_db_maintenance(conn):
+    """Checkpoint του WAL χωρίς αναμονή αναγνωστών και ανανέωση στατιστικών."""
+    conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    conn.execute("PRAGMA optimize")
+
+
+# WMS_MULTIPROCESS=1: πολλές διεργασίες Streamlit πάνω στα ίδια αρχεία
+# (βλ. 'wms_admin.py serve'). Ενεργοποιεί leases για τους writers και
+# ειδοποιήσεις ακύρωσης cache ανάμεσα στις διεργασίες.
+MULTIPROCESS = os.environ.get('WMS_MULTIPROCESS', '0') == '1'
+COORDINATION_DB = 'coordination.db'
+LOCK_DIR = 'locks'
+# Η λήξη μετρά από την τελευταία χρήση· όσο ο μαθητής δουλεύει μένει συνδεδεμένος
+SESSION_TTL = float(os.environ.get('WMS_SESSION_TTL', 2 * 3600))
+
+
+def file_identity(path):
+    """(συσκευή, inode) του αρχείου ή None· αλλάζει όταν το αρχείο αντικατασταθεί."""
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return info.st_dev, info.st_ino
+
+
+def lease_path(path):
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:20]
+    return os.path.join(LOCK_DIR, f"{digest}.lock")
+
+
+class FileLease:
+    """Αποκλειστική κατοχή μιας βάσης ανάμεσα σε διεργασίες, με flock.
+
+    Ο κάτοχος γράφει στο αρχείο pid και host, ώστε να φαίνεται ποιος κρατά
+    τη βάση. Αν η διεργασία πέσει, το λειτουργικό αφήνει το κλείδωμα, οπότε
+    δεν μένουν ορφανά leases. Μέσα στη διεργασία τα threads σειριοποιούνται
+    με ένα RLock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._fd = None
+        self._depth = 0
+
+    def acquire(self):
+        self._lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                os.ftruncate(fd, 0)
+                os.write(fd, f"{os.getpid()} {socket.gethostname()} {time.time():.0f}\n".encode())
+            except BaseException:
+                os.close(fd)
+                self._lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def owner(self):
+        """«pid host χρόνος» του τελευταίου κατόχου ή None."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+
+@process_singleton
+def _file_leases():
+    return {}, threading.Lock()
+
+
+def file_lease(path):
+    """Το FileLease μιας βάσης, κοινό για όλη τη διεργασία.
+
+    Δύο ανοίγματα του ίδιου αρχείου κλειδώματος στην ίδια διεργασία θα
+    μπλόκαραν το ένα το άλλο, άρα όλοι (writer, provisioning, επαναφορά)
+    πρέπει να μοιράζονται το ίδιο αντικείμενο.
+    """
+    leases, lock = _file_leases()
+    key = lease_path(path)
+    with lock:
+        lease = leases.get(key)
+        if lease is None:
+            lease = leases[key] = FileLease(key)
+        return lease
+
+
+class SessionStore:
+    """Συνδέσεις χρηστών με κλειδί ένα token, κοινές σε όλες τις διεργασίες.
+
+    Το token μπαίνει σε cookie του browser, οπότε μετά από ανανέωση της
+    σελίδας ή σύνδεση σε άλλη διεργασία ο μαθητής μένει συνδεδεμένος. Οι
+    καθηγητές δεν παίρνουν token. Στη βάση κρατιέται μόνο
+    το sha256 του token. Όποια αποθήκη έχει τις ίδιες μεθόδους (create, get,
+    delete, purge) μπορεί να πάρει τη θέση της.
+    """
+
+    def __init__(self, path=COORDINATION_DB, ttl=SESSION_TTL, touch_interval=60):
+        self.path = path
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+        self._conn = None
+        self._created = 0
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = connect_db(self.path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    token_hash TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_seen REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_seen ON sessions(last_seen)")
+            self._conn.commit()
+        return self._conn
+
+    def create(self, data):
+        token = secrets.token_urlsafe(32)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT INTO sessions (token_hash, data, created, last_seen) VALUES (?, ?, ?, ?)",
+                (self._key(token), json.dumps(data, ensure_ascii=False), now, now)
+            )
+            conn.commit()
+            self._created += 1
+            purge = self._created % 100 == 0
+        if purge:
+            self.purge()
+        return token
+
+    def get(self, token):
+        """Τα δεδομένα της σύνδεσης ή None αν δεν υπάρχει ή έληξε."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT data, last_seen FROM sessions WHERE token_hash = ?", (self._key(token),)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                return None
+            # Η λήξη μετρά από την τελευταία χρήση· δεν γράφουμε σε κάθε rerun
+            if now - row[1] > self.touch_interval:
+                conn.execute("UPDATE sessions SET last_seen = ? WHERE token_hash = ?", (now, self._key(token)))
+                conn.commit()
+        return json.loads(row[0])
+
+    def delete(self, token):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM sessions WHERE token_hash = ?", (self._key(token),))
+            conn.commit()
+
+    def purge(self):
+        """Διαγραφή όσων έληξαν· επιστρέφει το πλήθος."""
+        with self._lock:
+            conn = self._connection()
+            deleted = conn.execute("DELETE FROM sessions WHERE last_seen < ?", (time.time() - self.ttl,)).rowcount
+            conn.commit()
+        return deleted
+
+
+class Notifier:
+    """Ειδοποιήσεις ακύρωσης cache ανάμεσα σε διεργασίες.
+
+    Κάθε διεργασία γράφει (kind, key) στον πίνακα notifications και, στην
+    αρχή κάθε rerun, διαβάζει όσες έγραψαν οι άλλες. Το PRAGMA data_version
+    αλλάζει μόνο όταν γράψει άλλη σύνδεση, οπότε χωρίς νέες ειδοποιήσεις το
+    poll κοστίζει ένα PRAGMA.
+
+    Το publish δεν γράφει αμέσως: οι ειδοποιήσεις μαζεύονται, οι ίδιες
+    ενώνονται, και ένα thread τις γράφει με ένα commit κάθε flush_interval.
+    Έτσι η κοινή βάση δέχεται μία εγγραφή ανά διάστημα και διεργασία, όχι
+    μία ανά εγγραφή μαθητή.
+    """
+
+    def __init__(self, path=COORDINATION_DB, retention=3600, flush_interval=0.25):
+        self.path = path
+        self.retention = retention
+        self.flush_interval = flush_interval
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending = OrderedDict()
+        self._wake = threading.Event()
+        self._handlers = {}
+        self._conn = connect_db(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS notifications (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                origin TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                key TEXT,
+                created REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        # Μόνο ό,τι γραφτεί από εδώ και πέρα· τα παλιά αφορούν caches που δεν υπάρχουν
+        self._last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM notifications").fetchone()[0]
+        self._data_version = None
+        self.published = 0
+        self.flushes = 0
+        self.received = 0
+        threading.Thread(target=self._flusher, name="wms-notifier", daemon=True).start()
+        # Ό,τι έμεινε στην ουρά γράφεται πριν τερματίσει η διεργασία
+        atexit.register(self.flush)
+
+    def subscribe(self, kind, handler):
+        """handler(key) για κάθε ειδοποίηση του kind από άλλη διεργασία."""
+        self._handlers.setdefault(kind, []).append(handler)
+
+    def publish(self, kind, key=None):
+        with self._pending_lock:
+            self._pending[(kind, key)] = time.time()
+            self.published += 1
+        self._wake.set()
+
+    def flush(self):
+        """Γράφει τις ειδοποιήσεις που περιμένουν· επιστρέφει το πλήθος τους."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, OrderedDict()
+        if not pending:
+            return 0
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT INTO notifications (origin, kind, key, created) VALUES (?, ?, ?, ?)",
+                    [(self.origin, kind, key, created) for (kind, key), created in pending.items()]
+                )
+                self.flushes += 1
+                if self.flushes % 1000 == 0:
+                    self._conn.execute("DELETE FROM notifications WHERE created < ?", (time.time() - self.retention,))
+                self._conn.commit()
+        except sqlite3.Error:
+            # Ξανά στο επόμενο flush, μαζί με όσες ήρθαν στο μεταξύ
+            if self._conn.in_transaction:
+                self._conn.rollback()
+            with self._pending_lock:
+                for item, created in pending.items():
+                    self._pending.setdefault(item, created)
+            raise
+        return len(pending)
+
+    def _flusher(self):
+        while True:
+            self._wake.wait()
+            # Ό,τι δημοσιευτεί μέσα στο διάστημα μπαίνει στο ίδιο commit
+            time.sleep(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                self._wake.set()
+
+    def poll(self):
+        """Εκτελεί τους handlers για τις νέες ειδοποιήσεις· επιστρέφει το πλήθος."""
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return 0
+            self._data_version = version
+            rows = self._conn.execute(
+                "SELECT id, origin, kind, key FROM notifications WHERE id > ? ORDER BY id", (self._last_id,)
+            ).fetchall()
+            if rows:
+                self._last_id = rows[-1][0]
+            incoming = [(kind, key) for _, origin, kind, key in rows if origin != self.origin]
+            self.received += len(incoming)
+        for kind, key in incoming:
+            for handler in self._handlers.get(kind, ()):
+                handler(key)
+        return len(incoming)
+
+    def stats(self):
+        return {
+            'origin': self.origin, 'published': self.published, 'flushes': self.flushes,
+            'received': self.received,
+        }
+
+
+@process_singleton
+def get_session_store():
+    return SessionStore()
+
+
+@process_singleton
+def get_notifier():
+    """Ο Notifier της διεργασίας, μόνο με WMS_MULTIPROCESS=1."""
+    return Notifier() if MULTIPROCESS else None
+
+
+# Τόνοι, διαλυτικά και τελικό σίγμα για την αναζήτηση κειμένου. Ο tokenizer
+# unicode61 του FTS5 κάνει πεζά τα ελληνικά αλλά δεν αφαιρεί τους τόνους τους,
+# οπότε το κείμενο διπλώνεται πριν μπει στο ευρετήριο και πριν την αναζήτηση.
+GREEK_FOLD = str.maketrans("άέήίόύώϊϋΐΰςΆΈΉΊΌΎΏΪΫ", "αεηιουωιυιυσΑΕΗΙΟΥΩΙΥ")
+
+
+def fold_text(text):
+    return (text or "").translate(GREEK_FOLD)
+
+
+def register_sql_functions(conn):
+    """Συναρτήσεις που καλούν τα triggers των βάσεων μαθητών.
+
+    Κάθε σύνδεση που γράφει σε products τις χρειάζεται· η connect_db τις
+    καταχωρεί πάντα.
+    """
+    conn.create_function('fold', 1, fold_text, deterministic=True)
+    return conn
+
+
+def fold_sql(expr):
+    """Το fold_text ως έκφραση SQL με replace(), για τη μετάβαση 4.
+
+    Από τη μετάβαση 7 τα triggers καλούν τη fold(): 63 φωλιασμένα replace()
+    σε κάθε εγγραφή προϊόντος έκοβαν την εισαγωγή στο ένα πέμπτο.
+    """
+    for accented, plain in zip("άέήίόύώϊϋΐΰςΆΈΉΊΌΎΏΪΫ", "αεηιουωιυιυσΑΕΗΙΟΥΩΙΥ"):
+        expr = f"replace({expr}, '{accented}', '{plain}')"
+    return expr
+
+
+def _products_fts_values(prefix):
+    return ", ".join(fold_sql(f"COALESCE({prefix}.{c}, '')") for c in ("name", "description", "category"))
+
+
+def _products_fts_folded(prefix):
+    # Ίδιο αποτέλεσμα με το _products_fts_values, ώστε τα 'delete' να ταιριάζουν
+    return ", ".join(f"fold({prefix}.{c})" for c in ("name", "description", "category"))
+
+
+MIGRATION_LOG_TABLE = """
+    CREATE TABLE IF NOT EXISTS migration_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        version INTEGER NOT NULL,
+        entity TEXT NOT NULL,
+        entity_id INTEGER NOT NULL,
+        note TEXT,
+        created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+# Θέση για απόθεμα που δεν έχει μπει ακόμη σε ράφι: αρχικά υπόλοιπα νέων
+# προϊόντων και μαζικών εισαγωγών. Από εκεί μεταφέρεται σε πραγματικές θέσεις.
+UNALLOCATED_LOCATION = 'ΧΩΡΙΣ-ΘΕΣΗ'
+
+
+# Καταγραφή δεδομένων που θα αλλάξει μια έκδοση, πριν τρέξουν οι εντολές της.
+# Δεν αλλάζει το σχήμα, οπότε οι εκδόσεις μένουν όπως δημοσιεύτηκαν· τρέχει
+# μόνο σε βάσεις που δεν έχουν ακόμη την έκδοση.
+STUDENT_DB_MIGRATION_AUDITS = {
+    # Τα διπλά barcodes που θα αφαιρέσει η έκδοση 4, ώστε να διορθωθούν με το χέρι
+    4: [
+        MIGRATION_LOG_TABLE,
+        """
+        INSERT INTO migration_log (version, entity, entity_id, note)
+        SELECT 4, 'products', id, 'Διπλό barcode ' || barcode || ' (το κρατά το προϊόν #' || (
+            SELECT MIN(p.id) FROM products p WHERE p.barcode = products.barcode
+        ) || ')'
+        FROM products
+        WHERE trim(barcode) <> '' AND id > (
+            SELECT MIN(p.id) FROM products p WHERE p.barcode = products.barcode
+        )
+        """,
+    ],
+}
+
+# Εκδόσεις σχήματος των βάσεων μαθητών: (έκδοση, περιγραφή, εντολές).
+# Νέες αλλαγές μπαίνουν ΠΑΝΤΑ στο τέλος με την επόμενη έκδοση.
+STUDENT_DB_MIGRATIONS = [
+    (1, "Ευρετήρια για τα συχνά ερωτήματα", [
+        "CREATE INDEX IF NOT EXISTS idx_products_name ON products(name)",
+        "CREATE INDEX IF NOT EXISTS idx_products_created ON products(created_date)",
+        "CREATE INDEX IF NOT EXISTS idx_products_in_stock ON products(quantity) WHERE quantity > 0",
+        "CREATE INDEX IF NOT EXISTS idx_suppliers_name ON suppliers(name)",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_doc_number ON invoices(doc_number)",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_doc_date ON invoices(doc_date, id)",
+        "CREATE INDEX IF NOT EXISTS idx_invoice_lines_invoice ON invoice_lines(invoice_id, product_id, quantity)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_product ON transactions(product_id, transaction_date)",
+    ]),
+    (2, "Ευρετήριο barcode για αναζήτηση στις γραμμές παραστατικού", [
+        "CREATE INDEX IF NOT EXISTS idx_products_barcode ON products(barcode)",
+    ]),
+    (3, "Append-only ημερολόγιο κινήσεων και υπόλοιπα ανά θέση", [
+        """
+        CREATE TABLE IF NOT EXISTS stock_balances (
+            product_id INTEGER NOT NULL,
+            location_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (product_id, location_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_stock_balances_location ON stock_balances(location_id, product_id)",
+        # Το υπόλοιπο ενημερώνεται με κάθε κίνηση, χωρίς επανυπολογισμό ιστορικού
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_balance
+        AFTER INSERT ON transactions WHEN NEW.location_id IS NOT NULL
+        BEGIN
+            INSERT INTO stock_balances (product_id, location_id, quantity)
+            VALUES (NEW.product_id, NEW.location_id, NEW.quantity)
+            ON CONFLICT (product_id, location_id)
+            DO UPDATE SET quantity = quantity + excluded.quantity;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_no_update
+        BEFORE UPDATE ON transactions
+        BEGIN
+            SELECT RAISE(ABORT, 'Οι κινήσεις αποθήκης δεν αλλάζουν');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_no_delete
+        BEFORE DELETE ON transactions
+        BEGIN
+            SELECT RAISE(ABORT, 'Οι κινήσεις αποθήκης δεν διαγράφονται');
+        END
+        """,
+        """
+        INSERT OR REPLACE INTO stock_balances (product_id, location_id, quantity)
+        SELECT product_id, location_id, SUM(quantity) FROM transactions
+        WHERE location_id IS NOT NULL GROUP BY product_id, location_id
+        """,
+    ]),
+    (4, "Μοναδικό barcode και ευρετήριο κειμένου FTS5 για τα προϊόντα", [
+        # Κενό barcode σημαίνει «χωρίς barcode»· από τα διπλά μένει το παλαιότερο
+        "UPDATE products SET barcode = NULL WHERE trim(barcode) = ''",
+        """
+        UPDATE products SET barcode = NULL
+        WHERE barcode IS NOT NULL AND id > (
+            SELECT MIN(p.id) FROM products p WHERE p.barcode = products.barcode
+        )
+        """,
+        "DROP INDEX IF EXISTS idx_products_barcode",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_products_barcode ON products(barcode)",
+        # Contentless: το κείμενο μένει μόνο στον products, εδώ μόνο το ευρετήριο
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            name, description, category,
+            content='', prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_insert
+        AFTER INSERT ON products
+        BEGIN
+            INSERT INTO products_fts (rowid, name, description, category)
+            VALUES (NEW.id, {_products_fts_values('NEW')});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_delete
+        AFTER DELETE ON products
+        BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, description, category)
+            VALUES ('delete', OLD.id, {_products_fts_values('OLD')});
+        END
+        """,
+        # Μόνο για αλλαγές κειμένου· οι αλλαγές αποθέματος δεν αγγίζουν το ευρετήριο
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_products_fts_update
+        AFTER UPDATE OF name, description, category ON products
+        BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, description, category)
+            VALUES ('delete', OLD.id, {_products_fts_values('OLD')});
+            INSERT INTO products_fts (rowid, name, description, category)
+            VALUES (NEW.id, {_products_fts_values('NEW')});
+        END
+        """,
+        f"""
+        INSERT INTO products_fts (rowid, name, description, category)
+        SELECT id, {_products_fts_values('products')} FROM products
+        """,
+    ]),
+    (5, "Σημεία αναπαραγγελίας, προμηθευτές ανά προϊόν και λίστα χαμηλού αποθέματος", [
+        "ALTER TABLE products ADD COLUMN reorder_point INTEGER",
+        """
+        CREATE TABLE IF NOT EXISTS product_suppliers (
+            product_id INTEGER NOT NULL,
+            supplier_id INTEGER NOT NULL,
+            lead_time_days INTEGER NOT NULL DEFAULT 7,
+            PRIMARY KEY (product_id, supplier_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_product_suppliers_supplier ON product_suppliers(supplier_id)",
+        "CREATE TRIGGER IF NOT EXISTS trg_products_suppliers_delete AFTER DELETE ON products "
+        "BEGIN DELETE FROM product_suppliers WHERE product_id = OLD.id; END",
+        "CREATE TRIGGER IF NOT EXISTS trg_suppliers_products_delete AFTER DELETE ON suppliers "
+        "BEGIN DELETE FROM product_suppliers WHERE supplier_id = OLD.id; END",
+        # Προϊόντα στο ή κάτω από το σημείο αναπαραγγελίας. Τα triggers γράφουν
+        # μόνο όταν ένα προϊόν μπαίνει ή βγαίνει από τη λίστα, οπότε η σελίδα
+        # δεν σαρώνει ποτέ όλα τα προϊόντα.
+        """
+        CREATE TABLE IF NOT EXISTS low_stock (
+            product_id INTEGER PRIMARY KEY,
+            since TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_products_low_stock_insert
+        AFTER INSERT ON products WHEN NEW.quantity <= NEW.reorder_point
+        BEGIN
+            INSERT OR IGNORE INTO low_stock (product_id) VALUES (NEW.id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_products_low_stock_enter
+        AFTER UPDATE OF quantity, reorder_point ON products
+        WHEN NEW.quantity <= NEW.reorder_point AND NOT COALESCE(OLD.quantity <= OLD.reorder_point, 0)
+        BEGIN
+            INSERT OR IGNORE INTO low_stock (product_id) VALUES (NEW.id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_products_low_stock_leave
+        AFTER UPDATE OF quantity, reorder_point ON products
+        WHEN OLD.quantity <= OLD.reorder_point AND NOT COALESCE(NEW.quantity <= NEW.reorder_point, 0)
+        BEGIN
+            DELETE FROM low_stock WHERE product_id = NEW.id;
+        END
+        """,
+        "CREATE TRIGGER IF NOT EXISTS trg_products_low_stock_delete AFTER DELETE ON products "
+        "BEGIN DELETE FROM low_stock WHERE product_id = OLD.id; END",
+        "INSERT OR IGNORE INTO low_stock (product_id) SELECT id FROM products WHERE quantity <= reorder_point",
+    ]),
+    (6, "Ευρετήριο ημερομηνίας για τη λίστα κινήσεων", [
+        # Η λίστα κινήσεων ταξινομεί κατά (transaction_date, id) με keyset
+        "CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(transaction_date, id)",
+    ]),
+    (7, "Triggers του FTS με τη συνάρτηση fold()", [
+        MIGRATION_LOG_TABLE,
+        "DROP TRIGGER IF EXISTS trg_products_fts_insert",
+        "DROP TRIGGER IF EXISTS trg_products_fts_delete",
+        "DROP TRIGGER IF EXISTS trg_products_fts_update",
+        f"""
+        CREATE TRIGGER trg_products_fts_insert
+        AFTER INSERT ON products
+        BEGIN
+            INSERT INTO products_fts (rowid, name, description, category)
+            VALUES (NEW.id, {_products_fts_folded('NEW')});
+        END
+        """,
+        f"""
+        CREATE TRIGGER trg_products_fts_delete
+        AFTER DELETE ON products
+        BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, description, category)
+            VALUES ('delete', OLD.id, {_products_fts_folded('OLD')});
+        END
+        """,
+        f"""
+        CREATE TRIGGER trg_products_fts_update
+        AFTER UPDATE OF name, description, category ON products
+        BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, description, category)
+            VALUES ('delete', OLD.id, {_products_fts_folded('OLD')});
+            INSERT INTO products_fts (rowid, name, description, category)
+            VALUES (NEW.id, {_products_fts_folded('NEW')});
+        END
+        """,
+    ]),
+    (8, "Θέση χωρίς ράφι και αρχικά υπόλοιπα στο ημερολόγιο κινήσεων", [
+        f"""
+        INSERT OR IGNORE INTO locations (location_code, description)
+        VALUES ('{UNALLOCATED_LOCATION}', 'Απόθεμα που δεν έχει μπει ακόμη σε θέση')
+        """,
+        "UPDATE products SET quantity = 0 WHERE quantity IS NULL",
+        # Ό,τι δεν εξηγούν οι κινήσεις με θέση (αρχικές ποσότητες, εισαγωγές,
+        # τιμολόγια χωρίς θέση) γίνεται μία διόρθωση στη θέση χωρίς ράφι, ώστε
+        # το products.quantity να ισούται με το άθροισμα των υπολοίπων
+        f"""
+        INSERT INTO transactions (type, product_id, location_id, quantity, notes)
+        SELECT 'ADJUSTMENT', p.id,
+               (SELECT id FROM locations WHERE location_code = '{UNALLOCATED_LOCATION}'),
+               p.quantity - COALESCE(l.quantity, 0), 'Αρχικό υπόλοιπο'
+        FROM products p LEFT JOIN (
+            SELECT product_id, SUM(quantity) AS quantity FROM transactions
+            WHERE location_id IS NOT NULL GROUP BY product_id
+        ) l ON l.product_id = p.id
+        WHERE p.quantity <> COALESCE(l.quantity, 0)
+        """,
+    ]),
+]
+
+
+def migrate_student_db(conn, migrations=None):
+    """Εφαρμόζει όσες εκδόσεις σχήματος λείπουν και τις καταγράφει.
+
+    Το PRAGMA user_version κρατά την τρέχουσα έκδοση, ώστε μια ενημερωμένη
+    βάση να κοστίζει μόνο ένα ερώτημα. Επιστρέφει τις εκδόσεις που εφαρμόστηκαν.
+    """
+    migrations = STUDENT_DB_MIGRATIONS if migrations is None else migrations
+    latest = max((m[0] for m in migrations), default=0)
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= latest:
+        return []
+
+    applied = []
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Ξανά μέσα στη συναλλαγή: άλλη διεργασία μπορεί να προηγήθηκε
+        done = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+        for version, description, statements in sorted(migrations, key=lambda m: m[0]):
+            if version in done:
+                continue
+            for statement in STUDENT_DB_MIGRATION_AUDITS.get(version, []) + statements:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+                (version, description)
+            )
+            applied.append(version)
+        conn.execute(f"PRAGMA user_version = {latest}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return applied
+
+
+class ConnectionPool:
+    """Κοινόχρηστες, μακρόβιες συνδέσεις SQLite ανά βάση μαθητή.
+
+    Οι συνδέσεις κρατιούνται ανοιχτές ανάμεσα σε reruns και sessions, με
+    όριο ανοιχτών αρχείων και αποκοπή (LRU / TTL) όσων μένουν αδρανείς.
+    """
+
+    def __init__(self, max_open=64, idle_ttl=600, pragmas=None,
+                 maintenance_interval=MAINTENANCE_INTERVAL, on_open=None):
+        self.max_open = max_open
+        self.on_open = on_open
+        self.idle_ttl = idle_ttl
+        self.pragmas = dict(STORAGE_PROFILE if pragmas is None else pragmas)
+        self.maintenance_interval = maintenance_interval
+        self._lock = threading.Lock()
+        # key -> {'conn', 'lock', 'leases', 'last_used'} με σειρά LRU
+        self._entries = OrderedDict()
+        # key -> Event όσο ένα thread ανοίγει τη βάση (provisioning, migrations)
+        self._opening = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _open(self, path):
+        # check_same_thread=False: τα reruns του Streamlit τρέχουν σε διαφορετικά threads
+        conn = connect_db(path, self.pragmas, check_same_thread=False)
+        if self.on_open is not None:
+            self.on_open(conn)
+        return conn
+
+    def _get_entry(self, key, path, provision=None, lease=False):
+        # Το άνοιγμα (provisioning, migrations) γίνεται εκτός του κοινού
+        # κλειδώματος· όσοι ζητούν την ίδια βάση περιμένουν, οι άλλοι όχι
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                # Το αρχείο αντικαταστάθηκε (επαναφορά, αρχειοθέτηση, ίσως από άλλη
+                # διεργασία): η παλιά σύνδεση δείχνει στο παλιό inode
+                if entry is not None and entry['leases'] == 0 and file_identity(path) != entry['identity']:
+                    self._close_locked(key)
+                    entry = None
+                if entry is not None:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    entry['last_used'] = time.monotonic()
+                    if lease:
+                        entry['leases'] += 1
+                    return entry
+                opening = self._opening.get(key)
+                if opening is None:
+                    opening = self._opening[key] = threading.Event()
+                    break
+            opening.wait()
+
+        try:
+            # Δημιουργία του αρχείου μόνο όταν πρωτοχρειαστεί
+            if provision is not None:
+                provision(path)
+            conn = self._open(path)
+        except BaseException:
+            with self._lock:
+                del self._opening[key]
+            opening.set()
+            raise
+        now = time.monotonic()
+        entry = {
+            'conn': conn,
+            'identity': file_identity(path),
+            'lock': threading.RLock(),
+            'leases': 1 if lease else 0,
+            'last_used': now,
+            'last_maintenance': now,
+        }
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = entry
+            del self._opening[key]
+            self._evict_locked()
+        opening.set()
+        return entry
+
+    def _evict_locked(self):
+        now = time.monotonic()
+        # Πρώτα όσες έμειναν αδρανείς πάνω από το TTL
+        for key in list(self._entries):
+            entry = self._entries[key]
+            if entry['leases'] == 0 and now - entry['last_used'] > self.idle_ttl:
+                self._close_locked(key)
+        # Μετά οι παλαιότερες (LRU) μέχρι να πέσουμε κάτω από το όριο
+        for key in list(self._entries):
+            if len(self._entries) <= self.max_open:
+                break
+            if self._entries[key]['leases'] == 0:
+                self._close_locked(key)
+
+    def _close_locked(self, key):
+        entry = self._entries.pop(key)
+        try:
+            entry['conn'].execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
+        entry['conn'].close()
+        self.evictions += 1
+
+    def get(self, key, path, provision=None):
+        """Επιστρέφει τη σύνδεση της βάσης χωρίς δέσμευση (lease)."""
+        return self._get_entry(key, path, provision)['conn']
+
+    @contextmanager
+    def lease(self, key, path, provision=None):
+        """Δεσμεύει τη σύνδεση για όσο διαρκεί ένα rerun.
+
+        Όσο υπάρχει lease η σύνδεση δεν κλείνει από το eviction και οι
+        ταυτόχρονες καρτέλες του ίδιου μαθητή σειριοποιούνται.
+        """
+        entry = self._get_entry(key, path, provision, lease=True)
+        try:
+            with entry['lock']:
+                try:
+                    yield entry['conn']
+                finally:
+                    # Ό,τι δεν έγινε commit στο rerun δεν πρέπει να μείνει
+                    # ανοιχτό στην κοινόχρηστη σύνδεση
+                    if entry['conn'].in_transaction:
+                        entry['conn'].rollback()
+                    self._maintain(entry)
+        finally:
+            with self._lock:
+                entry['leases'] -= 1
+                entry['last_used'] = time.monotonic()
+
+    def _maintain(self, entry):
+        now = time.monotonic()
+        if now - entry['last_maintenance'] < self.maintenance_interval:
+            return
+        entry['last_maintenance'] = now
+        try:
+            run_db_maintenance(entry['conn'])
+        except sqlite3.OperationalError:
+            pass  # θα ξαναδοκιμαστεί στο επόμενο διάστημα
+
+    def discard(self, key):
+        """Κλείνει τη σύνδεση αν δεν είναι δεσμευμένη· False αν χρησιμοποιείται."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return True
+            if entry['leases']:
+                return False
+            self._close_locked(key)
+            return True
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict_locked()
+
+    def close_all(self):
+        with self._lock:
+            for key in list(self._entries):
+                if self._entries[key]['leases'] == 0:
+                    self._close_locked(key)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'open': len(self._entries),
+                'leased': sum(1 for e in self._entries.values() if e['leases']),
+                'hit_ratio': self.hits / total if total else 0.0,
+            }
+
+
+@process_singleton
+def get_student_db_pool():
+    """Ένα pool για όλη τη διεργασία, κοινό σε όλα τα sessions. Με το πρώτο
+    άνοιγμα κάθε βάση φέρνει το σχήμα της στην τελευταία έκδοση."""
+    return ConnectionPool(on_open=migrate_student_db)
+
+
+student_db_pool = get_student_db_pool()
+
+
+# Αναπαραγγελία: ημέρες ιστορικού πωλήσεων, ημέρες κάλυψης μετά την παραλαβή
+# και χρόνος παράδοσης για προϊόντα χωρίς προμηθευτή
+REORDER_WINDOW_DAYS = 30
+REORDER_COVER_DAYS = 14
+DEFAULT_LEAD_TIME_DAYS = 7
+
+
+class ReorderPlanner:
+    """Προτάσεις αναπαραγγελίας από τη ζήτηση των παραστατικών.
+
+    Η ζήτηση αθροίζεται στη βάση (γραμμές παραστατικών των τελευταίων
+    window_days ημερών) και ο υπολογισμός για όλα τα προϊόντα γίνεται με
+    πίνακες NumPy, χωρίς βρόχο ανά προϊόν. Ένα προϊόν θέλει παραγγελία όταν
+    το απόθεμα φτάσει το σημείο αναπαραγγελίας του ή, αν δεν έχει ορισθεί,
+    όταν δεν φτάνει για τον χρόνο παράδοσης. Η ποσότητα καλύπτει τον χρόνο
+    παράδοσης και cover_days ημέρες μετά.
+    """
+
+    DEMAND_SQL = """
+        SELECT il.product_id, SUM(il.quantity)
+        FROM invoices i JOIN invoice_lines il ON il.invoice_id = i.id
+        WHERE i.doc_date > ? AND i.doc_date <= ?
+        GROUP BY il.product_id
+    """
+    LEAD_TIME_SQL = "SELECT product_id, MIN(lead_time_days) FROM product_suppliers GROUP BY product_id"
+    DETAILS_SQL = """
+        SELECT p.id, p.name, (
+            SELECT s.name FROM product_suppliers ps JOIN suppliers s ON s.id = ps.supplier_id
+            WHERE ps.product_id = p.id ORDER BY ps.lead_time_days LIMIT 1
+        )
+        FROM products p WHERE p.id IN ({})
+    """
+
+    def __init__(self, window_days=REORDER_WINDOW_DAYS, cover_days=REORDER_COVER_DAYS,
+                 default_lead_days=DEFAULT_LEAD_TIME_DAYS):
+        self.window_days = window_days
+        self.cover_days = cover_days
+        self.default_lead_days = default_lead_days
+
+    @staticmethod
+    def _lookup(ids, keys, values, out):
+        """out[θέση του key στο ids] = value, για όσα keys υπάρχουν στο ids."""
+        import numpy as np
+        if not len(keys) or not len(ids):
+            return
+        pos = np.searchsorted(ids, keys).clip(max=len(ids) - 1)
+        found = ids[pos] == keys
+        out[pos[found]] = values[found]
+
+    def plan(self, db, today=None, details=True):
+        """Dict με rows (προτάσεις, πιο επείγουσες πρώτα), products, due, units, seconds.
+
+        Με details=False δεν φορτώνονται ονόματα και προμηθευτές, μόνο τα σύνολα.
+        """
+        import numpy as np
+        started = time.perf_counter()
+        today = date.today() if today is None else today
+        since = today - timedelta(days=self.window_days)
+
+        products = np.array(
+            db.execute("SELECT id, quantity, reorder_point FROM products ORDER BY id").fetchall(), dtype=float
+        ).reshape(-1, 3)
+        ids, quantity, reorder_point = products.T
+        quantity = np.nan_to_num(quantity)
+        has_point = ~np.isnan(reorder_point)
+
+        sold = np.array(db.execute(self.DEMAND_SQL, (since.isoformat(), today.isoformat())).fetchall(),
+                        dtype=float).reshape(-1, 2)
+        demand = np.zeros(len(ids))
+        self._lookup(ids, sold[:, 0], sold[:, 1], demand)
+        lead_times = np.array(db.execute(self.LEAD_TIME_SQL).fetchall(), dtype=float).reshape(-1, 2)
+        lead = np.full(len(ids), float(self.default_lead_days))
+        self._lookup(ids, lead_times[:, 0], lead_times[:, 1], lead)
+
+        daily = demand / self.window_days
+        point = np.where(has_point, reorder_point, np.ceil(daily * lead))
+        due = (quantity <= point) & (has_point | (daily > 0))
+        order = np.ceil(np.maximum(point + daily * (lead + self.cover_days), point + 1) - quantity)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            days_left = np.where(daily > 0, quantity / daily, np.inf)
+
+        selected = np.flatnonzero(due)
+        selected = selected[np.argsort(days_left[selected], kind='stable')]
+        result = {
+            'rows': [],
+            'products': len(ids),
+            'due': len(selected),
+            'units': int(order[selected].sum()),
+        }
+        if details and len(selected):
+            names = {}
+            for start in range(0, len(selected), 900):
+                part = ids[selected[start:start + 900]].astype(int).tolist()
+                for pid, name, supplier in db.execute(self.DETAILS_SQL.format(", ".join("?" * len(part))), part):
+                    names[pid] = (name, supplier)
+            for i in selected.tolist():
+                name, supplier = names.get(int(ids[i]), (None, None))
+                result['rows'].append({
+                    'id': int(ids[i]),
+                    'name': name,
+                    'quantity': int(quantity[i]),
+                    'reorder_point': int(point[i]),
+                    'daily_demand': round(float(daily[i]), 2),
+                    'days_left': None if np.isinf(days_left[i]) else round(float(days_left[i]), 1),
+                    'lead_time_days': int(lead[i]),
+                    'supplier': supplier,
+                    'order_qty': int(order[i]),
+                })
+        result['seconds'] = time.perf_counter() - started
+        return result
+
+
+@process_singleton
+def get_reorder_planner():
+    return ReorderPlanner()
+
+
+reorder_planner = get_reorder_planner()
+
+
+class DashboardSummaryCache:
+    """Μνήμη των δεικτών του πίνακα ελέγχου ανά μαθητή.
+
+    Όλοι οι δείκτες έρχονται με ένα ερώτημα από τον cursor και κρατιούνται
+    μέχρι κάποια εγγραφή (προϊόντα, θέσεις, παραστατικά, προμηθευτές) να τους
+    ακυρώσει, ή μέχρι να αλλάξει η ημέρα. Το χαμηλό απόθεμα μετριέται από τον
+    πίνακα low_stock που κρατούν τα triggers· ο planner τρέχει μόνο στη
+    σελίδα αναπαραγγελίας.
+    """
+
+    SUMMARY_SQL = """
+        SELECT
+            (SELECT COUNT(*) FROM products),
+            (SELECT COUNT(*) FROM locations),
+            (SELECT COALESCE(SUM(quantity), 0) FROM products),
+            (SELECT COUNT(*) FROM low_stock)
+    """
+    RECENT_SQL = "SELECT * FROM products ORDER BY created_date DESC LIMIT 5"
+
+    def __init__(self, max_timings=1000, notifier=None):
+        self._lock = threading.Lock()
+        self._summaries = {}
+        self.notifier = notifier
+        self.timings = deque(maxlen=max_timings)
+        if notifier is not None:
+            notifier.subscribe('dashboard', self.drop)
+
+    def get(self, student_id, db):
+        today = date.today()
+        with self._lock:
+            cached = self._summaries.get(student_id)
+        if cached is not None and cached[0] == today:
+            return cached[1]
+
+        cursor = db.cursor()
+        products_count, locations_count, total_qty, low_stock_count = cursor.execute(self.SUMMARY_SQL).fetchone()
+        cursor.execute(self.RECENT_SQL)
+        columns = [col[0] for col in cursor.description]
+        summary = {
+            'products_count': products_count,
+            'locations_count': locations_count,
+            'total_qty': total_qty,
+            'low_stock_count': low_stock_count,
+            'recent_products': [dict(zip(columns, row)) for row in cursor.fetchall()],
+        }
+        with self._lock:
+            self._summaries[student_id] = (today, summary)
+        return summary
+
+    def invalidate(self, student_id):
+        """Ακύρωση μετά από εγγραφή, εδώ και στις άλλες διεργασίες."""
+        self.drop(student_id)
+        if self.notifier is not None:
+            self.notifier.publish('dashboard', student_id)
+
+    def drop(self, student_id):
+        with self._lock:
+            self._summaries.pop(student_id, None)
+
+    def record_render(self, student_id, seconds, products_count):
+        self.timings.append((student_id, seconds, products_count))
+
+    def render_stats(self):
+        seconds = sorted(t[1] for t in list(self.timings))
+        if not seconds:
+            return {'renders': 0}
+        return {
+            'renders': len(seconds),
+            'p50_ms': seconds[len(seconds) // 2] * 1000,
+            'p95_ms': seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))] * 1000,
+            'max_ms': seconds[-1] * 1000,
+        }
+
+
+@process_singleton
+def get_dashboard_cache():
+    return DashboardSummaryCache(notifier=get_notifier())
+
+
+dashboard_cache = get_dashboard_cache()
+
+
+# Μαζική εισαγωγή: στήλες, υποχρεωτικά, μοναδικά και ακέραια πεδία ανά πίνακα
+IMPORT_SPECS = {
+    'products': {
+        'columns': ['name', 'description', 'category', 'barcode', 'quantity'],
+        'required': ['name'],
+        'unique': ['barcode'],
+        'integer': ['quantity'],
+        'upper': ['category'],
+        'opening_stock': True,
+    },
+    'suppliers': {
+        'columns': ['name', 'afm', 'address', 'phone', 'email'],
+        'required': ['name'],
+        'unique': [],
+        'integer': [],
+        'upper': [],
+        'opening_stock': False,
+    },
+    'locations': {
+        'columns': ['location_code', 'zone', 'description'],
+        'required': ['location_code'],
+        'unique': ['location_code'],
+        'integer': [],
+        'upper': [],
+        'opening_stock': False,
+    },
+}
+
+IMPORT_CHUNK_SIZE = 5000
+
+
+def read_import_chunks(uploaded_file, chunksize=IMPORT_CHUNK_SIZE):
+    """Διαβάζει CSV σε κομμάτια· το Excel φορτώνεται μια φορά και κόβεται."""
+    import pandas as pd
+    name = getattr(uploaded_file, 'name', '')
+    if name.lower().endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(uploaded_file, dtype=str)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+    else:
+        yield from pd.read_csv(uploaded_file, dtype=str, chunksize=chunksize)
+
+
+def normalize_import_chunk(df, spec):
+    """Καθαρίζει ένα κομμάτι του αρχείου.
+
+    Επιστρέφει (έγκυρες γραμμές, οι γραμμές αρχείου τους, λάθη), όπου τα
+    λάθη είναι λίστα από (γραμμή αρχείου, μήνυμα). Ο έλεγχος μοναδικότητας
+    απέναντι στη βάση γίνεται στο bulk_import.
+    """
+    import pandas as pd
+    df = df.copy()
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    for col in spec['columns']:
+        if col not in df.columns:
+            df[col] = pd.NA
+    df = df[spec['columns']]
+
+    text_cols = [c for c in spec['columns'] if c not in spec['integer']]
+    for col in text_cols:
+        df[col] = df[col].astype('string').str.strip().replace('', pd.NA)
+    for col in spec['upper']:
+        df[col] = df[col].str.upper()
+
+    # Γραμμή αρχείου: +2 για την επικεφαλίδα και την αρίθμηση από 1
+    line_numbers = df.index.to_series() + 2
+    bad = pd.Series('', index=df.index, dtype='string')
+
+    for col in spec['required']:
+        bad = bad.mask(df[col].isna() & (bad == ''), f"λείπει το πεδίο {col}")
+    for col in spec['integer']:
+        raw = df[col].astype('string').str.strip().replace('', pd.NA)
+        numbers = pd.to_numeric(raw, errors='coerce')
+        invalid = (raw.notna() & numbers.isna()).fillna(False) | (
+            numbers.notna() & ((numbers < 0) | (numbers % 1 != 0))
+        )
+        bad = bad.mask(invalid & (bad == ''), f"μη έγκυρο {col}")
+        df[col] = numbers.fillna(0)
+
+    errors = list(zip(line_numbers[bad != ''].tolist(), bad[bad != ''].tolist()))
+    valid = df[bad == ''].copy()
+    for col in spec['integer']:
+        valid[col] = valid[col].astype('int64')
+    return valid, line_numbers[bad == ''], errors
+
+
+def bulk_import(db, table, chunks, progress=None):
+    """Εισάγει όλα τα κομμάτια σε μία συναλλαγή με executemany.
+
+    Επιστρέφει (πλήθος εισαγωγών, λάθη ανά γραμμή). Οι γραμμές με λάθος
+    παραλείπονται, οι υπόλοιπες περνούν. Οι ποσότητες των προϊόντων
+    καταχωρούνται και ως παραλαβές στη θέση χωρίς ράφι. Μέσα στον writer η
+    συναλλαγή γίνεται SAVEPOINT της παρτίδας του.
+    """
+    spec = IMPORT_SPECS[table]
+    columns = spec['columns']
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+    seen = {col: set() for col in spec['unique']}
+    inserted = 0
+    errors = []
+    with write_transaction(db):
+        first_id = db.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+        for chunk in chunks:
+            valid, lines, chunk_errors = normalize_import_chunk(chunk, spec)
+            errors += chunk_errors
+
+            for col in spec['unique']:
+                values = valid[col].dropna().tolist()
+                existing = set()
+                for start in range(0, len(values), 900):
+                    part = values[start:start + 900]
+                    existing.update(row[0] for row in db.execute(
+                        f"SELECT {col} FROM {table} WHERE {col} IN ({', '.join('?' for _ in part)})",
+                        part
+                    ))
+                # Τα κενά δεν μετράνε ως διπλά
+                duplicate = (valid[col].isin(existing | seen[col]) | valid[col].duplicated()) & valid[col].notna()
+                errors += [(line, f"διπλό {col}: {value}")
+                           for line, value in zip(lines[duplicate], valid.loc[duplicate, col])]
+                valid, lines = valid[~duplicate], lines[~duplicate]
+                seen[col].update(valid[col].dropna())
+
+            rows = valid.astype(object).where(valid.notna(), None)
+            db.executemany(sql, rows.itertuples(index=False, name=None))
+            inserted += len(rows)
+            if progress is not None:
+                progress(inserted, len(errors))
+        if spec['opening_stock']:
+            record_opening_stock(db, first_id, "Μαζική εισαγωγή")
+    errors.sort()
+    return inserted, errors
+
+
+class InsufficientStockError(Exception):
+    """Κάποια γραμμή ζητά περισσότερα από το διαθέσιμο απόθεμα."""
+
+    def __init__(self, shortages):
+        # shortages: λίστα από (product_id, όνομα, ζητούμενα, διαθέσιμα)
+        self.shortages = shortages
+        super().__init__(", ".join(
+            f"{name}: ζητήθηκαν {wanted}, διαθέσιμα {available}"
+            for _, name, wanted, available in shortages
+        ))
+
+
+def find_by_barcode(db, barcode):
+    """Το προϊόν με αυτό το barcode, (id, name, barcode, quantity), ή None."""
+    return db.execute(
+        "SELECT id, name, barcode, quantity FROM products WHERE barcode = ?", (barcode.strip(),)
+    ).fetchone()
+
+
+def fts_query(term):
+    """Ερώτημα MATCH: κάθε λέξη ως πρόθεμα, όλες υποχρεωτικές."""
+    words = "".join(c if c.isalnum() else " " for c in fold_text(term)).split()
+    return " ".join(f'"{w}"*' for w in words)
+
+
+# Πόσα από τα νεότερα ταιριάσματα κατατάσσονται· σε τεράστιους καταλόγους
+# με πολύ κοινούς όρους η κατάταξη όλων θα κόστιζε δεκάδες ms
+SEARCH_RANK_CANDIDATES = 500
+
+
+def search_products(db, term, limit=20, in_stock=False):
+    """Προϊόντα με ακριβές barcode ή με λέξεις που ξεκινούν από τον όρο.
+
+    Η αναζήτηση κειμένου γίνεται στο products_fts σε όνομα, περιγραφή και
+    κατηγορία, χωρίς τόνους και κεφαλαία, με κατάταξη bm25 όπου το όνομα
+    μετράει περισσότερο. Πρώτα έρχεται το ακριβές barcode, αν υπάρχει.
+    """
+    columns = "id, name, barcode, quantity"
+    stock = " AND quantity > 0" if in_stock else ""
+    if not term:
+        return db.execute(
+            f"SELECT {columns} FROM products WHERE 1{stock} ORDER BY name LIMIT ?", (limit,)
+        ).fetchall()
+    by_barcode = db.execute(
+        f"SELECT {columns} FROM products WHERE barcode = ?{stock}", (term,)
+    ).fetchall()
+    query = fts_query(term)
+    if not query:
+        return by_barcode
+    by_text = db.execute(
+        f"""
+        SELECT p.id, p.name, p.barcode, p.quantity
+        FROM (
+            SELECT rowid, bm25(products_fts, 10.0, 1.0, 2.0) AS score
+            FROM products_fts WHERE products_fts MATCH ?
+            ORDER BY rowid DESC LIMIT ?
+        ) f JOIN products p ON p.id = f.rowid{" WHERE p.quantity > 0" if in_stock else ""}
+        ORDER BY f.score, p.name
+        LIMIT ?
+        """,
+        (query, SEARCH_RANK_CANDIDATES, limit)
+    ).fetchall()
+    seen = {row[0] for row in by_barcode}
+    return (by_barcode + [row for row in by_text if row[0] not in seen])[:limit]
+
+
+@contextmanager
+def write_transaction(db):
+    """BEGIN IMMEDIATE ... COMMIT, ή SAVEPOINT αν υπάρχει ήδη ανοιχτή συναλλαγή.
+
+    Μέσα σε group commit του DatabaseWriter ένα βήμα που αποτυγχάνει
+    αναιρείται μόνο του, χωρίς να χαθούν τα υπόλοιπα της ίδιας παρτίδας.
+    """
+    if db.in_transaction:
+        db.execute("SAVEPOINT write_step")
+        try:
+            yield
+        except BaseException:
+            db.execute("ROLLBACK TO write_step")
+            db.execute("RELEASE write_step")
+            raise
+        db.execute("RELEASE write_step")
+    else:
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            db.rollback()
+            raise
+        db.commit()
+
+
+def save_invoice(db, header, lines):
+    """Αποθηκεύει παραστατικό και βγάζει το απόθεμα από τις θέσεις σε μία συναλλαγή.
+
+    header: dict με doc_number, doc_type, doc_date, customer_name, afm, address.
+    lines: dict product_id -> ποσότητα. Κάθε γραμμή παίρνει πρώτα από τη θέση
+    χωρίς ράφι και μετά από τις υπόλοιπες θέσεις κατά σειρά, με κινήσεις
+    INVOICE μέσω post_movements. Τα υπόλοιπα διαβάζονται με την εγγραφή ήδη
+    κλειδωμένη, οπότε δύο ταυτόχρονα παραστατικά δεν μπορούν να πουλήσουν το
+    ίδιο απόθεμα· αν κάποια γραμμή δεν χωράει, τίποτα δεν αποθηκεύεται και
+    σηκώνεται InsufficientStockError.
+    """
+    items = [(int(pid), int(qty)) for pid, qty in lines.items() if qty > 0]
+    # Κλείδωμα εγγραφής από την αρχή, ώστε ο έλεγχος και η μείωση να είναι ατομικά
+    with write_transaction(db):
+        unallocated = unallocated_location(db)
+        movements, short = [], []
+        for pid, qty in items:
+            needed = qty
+            for location_id, available in db.execute(
+                "SELECT location_id, quantity FROM stock_balances "
+                "WHERE product_id = ? AND quantity > 0 ORDER BY location_id <> ?, location_id",
+                (pid, unallocated)
+            ):
+                taken = min(needed, available)
+                movements.append(('INVOICE', pid, location_id, -taken, header['doc_number']))
+                needed -= taken
+                if not needed:
+                    break
+            if needed:
+                short.append((pid, qty, qty - needed))
+        if short:
+            placeholders = ", ".join("?" for _ in short)
+            names = dict(db.execute(
+                f"SELECT id, name FROM products WHERE id IN ({placeholders})", [pid for pid, _, _ in short]
+            ))
+            raise InsufficientStockError([
+                (pid, names.get(pid, f"#{pid}"), wanted, available) for pid, wanted, available in short
+            ])
+
+        cursor = db.execute(
+            """
+            INSERT INTO invoices (doc_number, doc_type, doc_date, customer_name, afm, address)
+            VALUES (:doc_number, :doc_type, :doc_date, :customer_name, :afm, :address)
+            """,
+            header
+        )
+        invoice_id = cursor.lastrowid
+        db.executemany(
+            "INSERT INTO invoice_lines (invoice_id, product_id, quantity) VALUES (?, ?, ?)",
+            [(invoice_id, pid, qty) for pid, qty in items]
+        )
+        post_movements(db, movements)
+    return invoice_id
+
+
+# Είδη κινήσεων στο ημερολόγιο (transactions). Η ποσότητα αποθηκεύεται με
+# πρόσημο: θετική για είσοδο, αρνητική για έξοδο. Κάθε κίνηση έχει θέση, και
+# το products.quantity ισούται με το άθροισμα των υπολοίπων ανά θέση. Τα
+# τιμολόγια πριν την έκδοση 8 γράφτηκαν χωρίς θέση· μένουν για ιστορικό και
+# το αποτέλεσμά τους περιέχεται στη διόρθωση (ADJUSTMENT) της έκδοσης 8.
+MOVEMENT_TYPES = {
+    'RECEIPT': "Παραλαβή",
+    'ISSUE': "Εξαγωγή",
+    'TRANSFER_OUT': "Μεταφορά (έξοδος)",
+    'TRANSFER_IN': "Μεταφορά (είσοδος)",
+    'INVOICE': "Τιμολόγιο",
+    'ADJUSTMENT': "Διόρθωση υπολοίπου",
+}
+
+
+def receipt(product_id, location_id, quantity, notes=None):
+    return [('RECEIPT', product_id, location_id, quantity, notes)]
+
+
+def issue(product_id, location_id, quantity, notes=None):
+    return [('ISSUE', product_id, location_id, -quantity, notes)]
+
+
+def transfer(product_id, from_location_id, to_location_id, quantity, notes=None):
+    return [
+        ('TRANSFER_OUT', product_id, from_location_id, -quantity, notes),
+        ('TRANSFER_IN', product_id, to_location_id, quantity, notes),
+    ]
+
+
+def unallocated_location(db):
+    """Το id της θέσης χωρίς ράφι (UNALLOCATED_LOCATION)."""
+    return db.execute(
+        "SELECT id FROM locations WHERE location_code = ?", (UNALLOCATED_LOCATION,)
+    ).fetchone()[0]
+
+
+def record_opening_stock(db, first_id, notes="Αρχικό υπόλοιπο"):
+    """Καταχωρεί ως παραλαβή στη θέση χωρίς ράφι την ποσότητα των προϊόντων με id >= first_id.
+
+    Για προϊόντα που μόλις γράφτηκαν μαζί με την ποσότητά τους: το
+    products.quantity μένει ως έχει και το ημερολόγιο αποκτά την κίνηση που
+    το εξηγεί.
+    """
+    return db.execute(
+        """
+        INSERT INTO transactions (type, product_id, location_id, quantity, notes)
+        SELECT 'RECEIPT', id, ?, quantity, ? FROM products WHERE id >= ? AND quantity > 0
+        """,
+        (unallocated_location(db), notes, first_id)
+    ).rowcount
+
+
+def add_product(db, name, description, category, barcode, quantity):
+    """Νέο προϊόν· η αρχική ποσότητα μπαίνει ως παραλαβή στη θέση χωρίς ράφι."""
+    with write_transaction(db):
+        product_id = db.execute(
+            "INSERT INTO products (name, description, category, barcode, quantity) VALUES (?, ?, ?, ?, ?)",
+            (name, description, category, barcode, quantity)
+        ).lastrowid
+        record_opening_stock(db, product_id)
+    return product_id
+
+
+def post_movements(db, movements):
+    """Καταχωρεί πολλές κινήσεις με ένα commit.
+
+    movements: λίστα από (type, product_id, location_id, quantity, notes),
+    π.χ. receipt(...) + transfer(...). Τα υπόλοιπα ανά θέση ενημερώνονται
+    από trigger και το products.quantity με ένα UPDATE ανά προϊόν. Άγνωστο
+    προϊόν ή θέση σηκώνει ValueError· αν κάποιο υπόλοιπο θέσης ή το συνολικό
+    απόθεμα βγει αρνητικό, σηκώνεται InsufficientStockError. Και στις δύο
+    περιπτώσεις τίποτα δεν καταχωρείται.
+    """
+    movements = [tuple(m) for m in movements]
+    if not movements:
+        return 0
+    deltas, outflow = {}, {}
+    for _, pid, loc, qty, _ in movements:
+        deltas[pid] = deltas.get(pid, 0) + qty
+        if qty < 0:
+            outflow[(pid, loc)] = outflow.get((pid, loc), 0) - qty
+
+    with write_transaction(db):
+        # Τα ids περνούν ως ένας πίνακας JSON, χωρίς όριο στο πλήθος παραμέτρων
+        for table, ids, label in (
+            ("products", {m[1] for m in movements}, "Άγνωστο προϊόν"),
+            ("locations", {m[2] for m in movements}, "Άγνωστη θέση"),
+        ):
+            missing = [row[0] for row in db.execute(
+                f"SELECT value FROM json_each(?) WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE id = value)",
+                (json.dumps(list(ids)),)
+            )]
+            if missing:
+                raise ValueError(f"{label}: {', '.join(f'#{i}' for i in missing)}")
+
+        db.executemany(
+            "INSERT INTO transactions (type, product_id, location_id, quantity, notes) VALUES (?, ?, ?, ?, ?)",
+            movements
+        )
+        db.executemany(
+            "UPDATE products SET quantity = quantity + ? WHERE id = ?",
+            [(delta, pid) for pid, delta in deltas.items() if delta]
+        )
+        shortages = []
+        for (pid, loc), wanted in outflow.items():
+            row = db.execute(
+                "SELECT p.name, sb.quantity FROM stock_balances sb "
+                "LEFT JOIN products p ON p.id = sb.product_id "
+                "WHERE sb.product_id = ? AND sb.location_id = ?",
+                (pid, loc)
+            ).fetchone()
+            if row is not None and row[1] < 0:
+                shortages.append((pid, row[0] or f"#{pid}", wanted, row[1] + wanted))
+        # Και το σύνολο του προϊόντος, για υπόλοιπα που ήταν ήδη αρνητικά
+        short = {pid for pid, *_ in shortages}
+        reduced = [pid for pid, delta in deltas.items() if delta < 0 and pid not in short]
+        if reduced:
+            for pid, name, quantity in db.execute(
+                "SELECT id, name, quantity FROM products "
+                "WHERE id IN (SELECT value FROM json_each(?)) AND quantity < 0",
+                (json.dumps(reduced),)
+            ):
+                shortages.append((pid, name, -deltas[pid], quantity - deltas[pid]))
+        if shortages:
+            raise InsufficientStockError(shortages)
+    return len(movements)
+
+
+def rebuild_stock_balances(db):
+    """Ξαναχτίζει τα υπόλοιπα ανά θέση και το products.quantity από το ημερολόγιο.
+
+    Επιστρέφει (υπόλοιπα θέσεων που διέφεραν, προϊόντα με διαφορετικό
+    products.quantity από το άθροισμα των υπολοίπων τους).
+    """
+    ledger_sql = """
+        SELECT product_id, location_id, SUM(quantity) FROM transactions
+        WHERE location_id IS NOT NULL GROUP BY product_id, location_id
+    """
+    with write_transaction(db):
+        drift = db.execute(f"""
+            SELECT
+                (SELECT COUNT(*) FROM (
+                    {ledger_sql} EXCEPT SELECT product_id, location_id, quantity FROM stock_balances
+                ))
+                + (SELECT COUNT(*) FROM (
+                    SELECT product_id, location_id, quantity FROM stock_balances EXCEPT {ledger_sql}
+                ))
+        """).fetchone()[0]
+        db.execute("DELETE FROM stock_balances")
+        db.execute(f"INSERT INTO stock_balances (product_id, location_id, quantity) {ledger_sql}")
+        total_sql = "SELECT COALESCE(SUM(quantity), 0) FROM stock_balances WHERE product_id = products.id"
+        quantity_drift = db.execute(
+            f"UPDATE products SET quantity = ({total_sql}) WHERE quantity IS NOT ({total_sql})"
+        ).rowcount
+    return drift, quantity_drift
+
+
+def is_lock_error(error):
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+class DatabaseWriter:
+    """Ένα thread εγγραφής ανά βάση, με group commit.
+
+    Οι εντολές είναι συναρτήσεις fn(conn, *args) και μπαίνουν σε ουρά· το
+    submit επιστρέφει Future. Το thread παίρνει ό,τι έχει μαζευτεί (έως
+    max_batch) και το εκτελεί σε μία συναλλαγή με ένα commit, κάθε εντολή σε
+    δικό της SAVEPOINT. Όσο ένα commit γράφει στον δίσκο, οι επόμενες
+    εντολές περιμένουν στην ουρά και πάνε όλες μαζί στο επόμενο.
+
+    Αν η βάση είναι κλειδωμένη από άλλη διεργασία, η παρτίδα ξαναδοκιμάζεται
+    με εκθετική αναμονή· οι εντολές πρέπει να μπορούν να ξανατρέξουν. Με
+    lease (FileLease), κάθε παρτίδα γράφεται αφού η διεργασία πάρει την
+    κατοχή της βάσης, οπότε οι writers διαφορετικών διεργασιών εναλλάσσονται
+    ανά παρτίδα αντί να συγκρούονται σε κάθε εντολή.
+
+    Αν η βάση δεν ανοίγει (σύνδεση, provision, lease), το thread σταματά:
+    όλες οι εντολές που περιμένουν αποτυγχάνουν με το ίδιο σφάλμα και το
+    on_failure(writer) τον αφαιρεί, ώστε το επόμενο submit να φτιάξει νέο.
+    """
+
+    def __init__(self, path, profile=None, max_batch=256, retries=8, backoff=0.01,
+                 idle_timeout=300, on_idle=None, lease=None, provision=None, on_failure=None):
+        self.path = path
+        self.profile = profile
+        self.max_batch = max_batch
+        self.retries = retries
+        self.backoff = backoff
+        self.idle_timeout = idle_timeout
+        self.on_idle = on_idle
+        self.on_failure = on_failure
+        self.lease = lease
+        self.provision = provision
+        self.error = None
+        self.commits = 0
+        self.commands = 0
+        self.retried = 0
+        self.failed = 0
+        self.lease_wait = 0.0
+        self.reopened = 0
+        self._conn = None
+        self._identity = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"writer:{path}", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args):
+        future = Future()
+        self._queue.put((fn, args, future))
+        if self.error is not None:
+            # Το thread έχει ήδη σταματήσει· κανείς δεν θα διαβάσει την ουρά
+            self._fail_pending(self.error)
+        return future
+
+    def execute(self, sql, params=()):
+        """Μία εντολή SQL· το Future δίνει (lastrowid, rowcount)."""
+        def run(conn):
+            cursor = conn.execute(sql, params)
+            return cursor.lastrowid, cursor.rowcount
+        return self.submit(run)
+
+    def stop(self, wait=True):
+        self._queue.put(None)
+        if wait:
+            self._thread.join()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _connect(self):
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = connect_db(self.path, self.profile)
+        self._identity = file_identity(self.path)
+
+    @contextmanager
+    def _leased(self):
+        if self.lease is None:
+            yield
+            return
+        started = time.perf_counter()
+        with self.lease:
+            self.lease_wait += time.perf_counter() - started
+            yield
+
+    def _run(self):
+        batch = []
+        try:
+            self._connect()
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.idle_timeout)
+                except queue.Empty:
+                    if self.on_idle is not None and self.on_idle(self):
+                        return
+                    continue
+                if item is None:
+                    return
+                batch, stopping = [item], False
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                with self._leased():
+                    # Άλλη διεργασία αντικατέστησε το αρχείο (π.χ. επαναφορά στιγμιότυπου)
+                    if file_identity(self.path) != self._identity:
+                        # ...ή την αρχειοθέτησε· ξαναδημιουργείται πριν ανοίξει
+                        if self.provision is not None and not os.path.exists(self.path):
+                            self.provision(self.path)
+                        self._connect()
+                        self.reopened += 1
+                    self._commit_batch(self._conn, batch)
+                batch = []
+                if stopping:
+                    return
+        except Exception as e:
+            self.error = e
+            if self.on_failure is not None:
+                self.on_failure(self)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            self.failed += len(batch)
+            self._fail_pending(e)
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+
+    def _fail_pending(self, error):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None and not item[2].done():
+                item[2].set_exception(error)
+                self.failed += 1
+
+    def _commit_batch(self, conn, batch):
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        for attempt in range(self.retries + 1):
+            outcomes = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for fn, args, future in batch:
+                    try:
+                        with write_transaction(conn):
+                            outcomes.append((future, fn(conn, *args), None))
+                    except Exception as e:
+                        if is_lock_error(e):
+                            raise
+                        outcomes.append((future, None, e))
+                conn.commit()
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                if is_lock_error(e) and attempt < self.retries:
+                    self.retried += 1
+                    time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+                    continue
+                self.failed += len(batch)
+                for _, _, future in batch:
+                    future.set_exception(e)
+                return
+            self.commits += 1
+            self.commands += len(batch)
+            for future, result, error in outcomes:
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+            return
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'commits': self.commits,
+            'commands': self.commands,
+            'per_commit': self.commands / self.commits if self.commits else 0.0,
+            'retried': self.retried,
+            'failed': self.failed,
+            'pending': self.pending(),
+            'lease_wait_ms': self.lease_wait * 1000,
+            'reopened': self.reopened,
+        }
+
+
+class DatabaseWriters:
+    """Ένας DatabaseWriter ανά ενεργή βάση· όσοι μείνουν αδρανείς σταματούν."""
+
+    def __init__(self, idle_timeout=300, leases=False, **options):
+        self.idle_timeout = idle_timeout
+        self.leases = leases
+        self.options = options
+        self._lock = threading.Lock()
+        self._writers = {}
+
+    def submit(self, path, fn, *args, profile=None, provision=None):
+        # Υπό το κλείδωμα, ώστε ένας writer να μη σταματήσει με εντολή καθ' οδόν
+        with self._lock:
+            writer = self._writers.get(path)
+            if writer is None:
+                writer = DatabaseWriter(
+                    path, profile, idle_timeout=self.idle_timeout, on_idle=self._retire,
+                    lease=file_lease(path) if self.leases else None, provision=provision,
+                    on_failure=self._forget, **self.options
+                )
+                self._writers[path] = writer
+            return writer.submit(fn, *args)
+
+    def _retire(self, writer):
+        with self._lock:
+            if writer.pending() or self._writers.get(writer.path) is not writer:
+                return False
+            del self._writers[writer.path]
+            return True
+
+    def _forget(self, writer):
+        with self._lock:
+            if self._writers.get(writer.path) is writer:
+                del self._writers[writer.path]
+
+    def discard(self, path):
+        """Σταματά τον writer της βάσης· False αν έχει εντολές σε αναμονή."""
+        with self._lock:
+            writer = self._writers.get(path)
+            if writer is None:
+                return True
+            if writer.pending():
+                return False
+            del self._writers[path]
+        writer.stop()
+        return True
+
+    def close_all(self):
+        with self._lock:
+            writers = list(self._writers.values())
+            self._writers.clear()
+        for writer in writers:
+            writer.stop()
+
+    def stats(self):
+        with self._lock:
+            return [writer.stats() for writer in self._writers.values()]
+
+
+@process_singleton
+def get_db_writers():
+    return DatabaseWriters(leases=MULTIPROCESS)
+
+
+db_writers = get_db_writers()
+
+
+class ClassAnalytics:
+    """Συγκεντρωτικά στοιχεία για τον καθηγητή από όλες τις βάσεις μαθητών.
+
+    Κάθε βάση ανοίγει μόνο για ανάγνωση (mode=ro) από ένα thread pool.
+    Τα αποτελέσματα κρατιούνται ανά αρχείο με κλειδί το mtime/μέγεθος του
+    .db και του -wal, οπότε σε επόμενο πέρασμα διαβάζονται μόνο όσες βάσεις
+    άλλαξαν.
+    """
+
+    METRICS = ['products', 'stock', 'invoices', 'invoice_lines', 'movements', 'negative_stock']
+    METRICS_SQL = """
+        SELECT
+            (SELECT COUNT(*) FROM products),
+            (SELECT COALESCE(SUM(quantity), 0) FROM products),
+            (SELECT COUNT(*) FROM invoices),
+            (SELECT COUNT(*) FROM invoice_lines),
+            (SELECT COUNT(*) FROM transactions),
+            (SELECT COUNT(*) FROM products WHERE quantity < 0)
+    """
+
+    def __init__(self, workers=8):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._cache = {}  # path -> (κλειδί αρχείου, μετρικές)
+        self.last_sweep = {}
+
+    @staticmethod
+    def file_key(path):
+        key = []
+        for p in (path, path + '-wal'):
+            try:
+                info = os.stat(p)
+            except FileNotFoundError:
+                info = None
+            # Ένα άδειο -wal (το δημιουργεί και ο αναγνώστης) ισοδυναμεί με κανένα
+            key.append((info.st_mtime_ns, info.st_size) if info and info.st_size else None)
+        return tuple(key)
+
+    def read_student(self, path):
+        conn = connect_readonly(path)
+        try:
+            return dict(zip(self.METRICS, conn.execute(self.METRICS_SQL).fetchone()))
+        finally:
+            conn.close()
+
+    def collect(self, wms):
+        """Μετρικές ανά μαθητή ως DataFrame (με class_name και error)."""
+        started = time.perf_counter()
+        with wms.master() as conn:
+            students = conn.execute(
+                "SELECT student_id, full_name, class_name FROM students"
+            ).fetchall()
+
+        results, pending = {}, []
+        for student_id, _, _ in students:
+            path = wms.student_db_path(student_id)
+            key = self.file_key(path)
+            with self._lock:
+                cached = self._cache.get(path)
+            if cached is not None and cached[0] == key:
+                results[student_id] = cached[1]
+            elif not os.path.exists(path):
+                # Δεν έχει ανοίξει ακόμη την εφαρμογή: η βάση δεν υπάρχει
+                results[student_id] = dict.fromkeys(self.METRICS, 0)
+            else:
+                pending.append((student_id, path, key))
+
+        def work(item):
+            student_id, path, key = item
+            try:
+                return student_id, path, key, self.read_student(path), None
+            except sqlite3.Error as e:
+                return student_id, path, key, None, str(e)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for student_id, path, key, metrics, error in pool.map(work, pending):
+                if error is None:
+                    with self._lock:
+                        self._cache[path] = (key, metrics)
+                    results[student_id] = metrics
+                else:
+                    results[student_id] = {'error': error}
+
+        self.last_sweep = {
+            'students': len(students),
+            'read': len(pending),
+            'cached': len(students) - len(pending),
+            'seconds': time.perf_counter() - started,
+        }
+        rows = [
+            {'student_id': sid, 'full_name': name, 'class_name': class_name, **results[sid]}
+            for sid, name, class_name in students
+        ]
+        import pandas as pd
+        df = pd.DataFrame(rows, columns=['student_id', 'full_name', 'class_name'] + self.METRICS + ['error'])
+        df[self.METRICS] = df[self.METRICS].fillna(0).astype('int64')
+        return df
+
+    def by_class(self, per_student):
+        """Σύνολα ανά τάξη από το αποτέλεσμα του collect."""
+        grouped = per_student.assign(errors=per_student['error'].notna()).groupby('class_name')
+        summary = grouped[self.METRICS + ['errors']].sum()
+        summary.insert(0, 'students', grouped.size())
+        summary['error_rate'] = summary['errors'] / summary['students']
+        return summary.reset_index()
+
+
+@process_singleton
+def get_class_analytics():
+    return ClassAnalytics()
+
+
+class_analytics = get_class_analytics()
+
+
+# Εξαγωγή: όνομα -> (τίτλος, ερώτημα). Όλα με ORDER BY id, ώστε ο cursor
+# να διαβάζει με τη σειρά του πίνακα χωρίς ταξινόμηση στη μνήμη.
+EXPORTS = {
+    'products': ("Προϊόντα", """
+        SELECT id, name, description, category, barcode, quantity, created_date
+        FROM products ORDER BY id
+    """),
+    'invoices': ("Παραστατικά", """
+        SELECT id, doc_number, doc_type, doc_date, customer_name, afm, address, created_date
+        FROM invoices ORDER BY id
+    """),
+    'invoice_lines': ("Γραμμές Παραστατικών", """
+        SELECT l.id, l.invoice_id, i.doc_number, i.doc_date, l.product_id, p.name AS product, l.quantity
+        FROM invoice_lines l
+        JOIN invoices i ON i.id = l.invoice_id
+        LEFT JOIN products p ON p.id = l.product_id
+        ORDER BY l.id
+    """),
+    'ledger': ("Ημερολόγιο Κινήσεων", """
+        SELECT t.id, t.transaction_date, t.type, t.product_id, p.name AS product,
+               l.location_code, t.quantity, t.notes
+        FROM transactions t
+        LEFT JOIN products p ON p.id = t.product_id
+        LEFT JOIN locations l ON l.id = t.location_id
+        ORDER BY t.id
+    """),
+    'stock_balances': ("Υπόλοιπα ανά Θέση", """
+        SELECT sb.product_id, p.name AS product, l.location_code, sb.quantity
+        FROM stock_balances sb
+        LEFT JOIN products p ON p.id = sb.product_id
+        LEFT JOIN locations l ON l.id = sb.location_id
+        ORDER BY sb.product_id, sb.location_id
+    """),
+}
+EXPORT_CHUNK_SIZE = 5000
+
+
+def query_chunks(db, sql, params=(), chunksize=EXPORT_CHUNK_SIZE):
+    """(στήλες, γεννήτρια από λίστες γραμμών) με fetchmany, χωρίς fetchall."""
+    cursor = db.execute(sql, params)
+    columns = [col[0] for col in cursor.description]
+
+    def chunks():
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            yield rows
+
+    return columns, chunks()
+
+
+def write_csv(columns, chunks, out):
+    """CSV σε δυαδικό αρχείο, με BOM ώστε το Excel να δείχνει σωστά τα ελληνικά."""
+    text = io.TextIOWrapper(out, encoding='utf-8-sig', newline='')
+    writer = csv.writer(text)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+    text.flush()
+    text.detach()
+
+
+def _arrow_type(values):
+    import pyarrow as pa
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, int) for v in present):
+        return pa.int64()
+    if present and all(isinstance(v, (int, float)) for v in present):
+        return pa.float64()
+    return pa.string()
+
+
+def write_parquet(columns, chunks, out):
+    """Parquet με ένα row group ανά κομμάτι.
+
+    Οι τύποι βγαίνουν από το πρώτο κομμάτι· τα επόμενα μετατρέπονται σε
+    αυτούς, ώστε όλο το αρχείο να έχει ένα σχήμα.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def convert(value, kind):
+        if value is None:
+            return None
+        if kind == pa.string():
+            return str(value)
+        return float(value) if kind == pa.float64() else int(value)
+
+    writer = None
+    try:
+        for rows in chunks:
+            data = list(zip(*rows))
+            if writer is None:
+                schema = pa.schema([(c, _arrow_type(v)) for c, v in zip(columns, data)])
+                writer = pq.ParquetWriter(out, schema)
+            arrays = [
+                pa.array([convert(v, field.type) for v in values], type=field.type)
+                for field, values in zip(schema, data)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        if writer is None:
+            schema = pa.schema([(c, pa.string()) for c in columns])
+            writer = pq.ParquetWriter(out, schema)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+# Μορφή -> (τίτλος, κατάληξη, mime, συνάρτηση εγγραφής)
+EXPORT_FORMATS = {
+    'csv': ("CSV", ".csv", "text/csv", write_csv),
+    'parquet': ("Parquet", ".parquet", "application/vnd.apache.parquet", write_parquet),
+}
+
+
+def export_table(db, name, fmt, out):
+    columns, chunks = query_chunks(db, EXPORTS[name][1])
+    EXPORT_FORMATS[fmt][3](columns, chunks, out)
+
+
+def read_download(path):
+    """Τα bytes ενός έτοιμου αρχείου για το download_button.
+
+    Το download_button κρατά ό,τι του δοθεί στη μνήμη του server, οπότε
+    το αρχείο διαβάζεται μία φορά ολόκληρο· το handle κλείνει αμέσως.
+    """
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def export_student_file(path, name, fmt):
+    """Εξαγωγή ενός πίνακα για το download_button.
+
+    Τρέχει στο thread του download και όχι του script, με δική του σύνδεση
+    μόνο ανάγνωσης. Η εξαγωγή γράφεται κομμάτι-κομμάτι σε προσωρινό αρχείο,
+    που σβήνεται μόλις διαβαστεί· το τελικό αρχείο όμως το download_button
+    το κρατά ολόκληρο στη μνήμη.
+    """
+    with tempfile.TemporaryFile() as out:
+        conn = connect_readonly(path)
+        try:
+            export_table(conn, name, fmt, out)
+        finally:
+            conn.close()
+        out.seek(0)
+        return out.read()
+
+
+class ClassExportJobs:
+    """Εξαγωγή όλων των μαθητών μιας τάξης σε zip, στο παρασκήνιο.
+
+    Κάθε εργασία γράφει exports/<τάξη>-<id>.zip, με έναν φάκελο ανά μαθητή
+    και ένα αρχείο ανά πίνακα. Τα αρχεία γράφονται κατευθείαν μέσα στο zip,
+    κομμάτι-κομμάτι, οπότε η μνήμη κατά τη δημιουργία δεν εξαρτάται από το
+    μέγεθος των βάσεων. Στη λήψη το download_button κρατά το zip ολόκληρο
+    στη μνήμη, μία φορά.
+
+    Βάσεις σε παλιά έκδοση σχήματος ενημερώνονται πρώτα μέσω του pool. Ένας
+    μαθητής που δεν εξάγεται μπαίνει στα skipped με την αιτία και η εργασία
+    συνεχίζει με τους υπόλοιπους.
+    """
+
+    def __init__(self, workers=2, directory='exports'):
+        self.directory = directory
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='class-export')
+        self._lock = threading.Lock()
+        self.jobs = OrderedDict()
+
+    def submit(self, wms, class_name, tables, fmt):
+        job_id = uuid.uuid4().hex[:8]
+        safe_class = "".join(c if c.isalnum() else "_" for c in class_name)
+        job = {
+            'id': job_id,
+            'class_name': class_name,
+            'tables': list(tables),
+            'format': fmt,
+            'state': 'queued',
+            'done': 0,
+            'total': 0,
+            'skipped': [],
+            'path': os.path.join(self.directory, f"{safe_class}-{job_id}.zip"),
+            'error': None,
+            'created': datetime.now(),
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+        self._executor.submit(self._run, job, wms)
+        return job_id
+
+    def _run(self, job, wms):
+        job['state'] = 'running'
+        partial = job['path'] + '.part'
+        try:
+            with wms.master() as master:
+                students = [row[0] for row in master.execute(
+                    "SELECT student_id FROM students WHERE class_name = ? ORDER BY student_id",
+                    (job['class_name'],)
+                )]
+            job['total'] = len(students)
+
+            os.makedirs(self.directory, exist_ok=True)
+            suffix = EXPORT_FORMATS[job['format']][1]
+            latest = max(m[0] for m in STUDENT_DB_MIGRATIONS)
+            with zipfile.ZipFile(partial, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for student_id in students:
+                    if not os.path.exists(wms.student_db_path(student_id)):
+                        job['skipped'].append((student_id, "χωρίς βάση ή αρχειοθετημένη"))
+                    else:
+                        try:
+                            conn = self._open_student(wms, student_id, latest)
+                            try:
+                                for name in job['tables']:
+                                    with archive.open(f"{student_id}/{name}{suffix}", 'w', force_zip64=True) as out:
+                                        export_table(conn, name, job['format'], out)
+                            finally:
+                                conn.close()
+                        except sqlite3.Error as e:
+                            job['skipped'].append((student_id, str(e)))
+                    job['done'] += 1
+            os.replace(partial, job['path'])
+            job['state'] = 'done'
+        except Exception as e:
+            job['state'] = 'error'
+            job['error'] = str(e)
+            if os.path.exists(partial):
+                os.remove(partial)
+
+    def _open_student(self, wms, student_id, latest):
+        """Σύνδεση μόνο ανάγνωσης, αφού η βάση φτάσει στην τελευταία έκδοση σχήματος."""
+        path = wms.student_db_path(student_id)
+        conn = connect_readonly(path)
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        except sqlite3.Error:
+            conn.close()
+            raise
+        if version >= latest:
+            return conn
+        conn.close()
+        # Το migration γίνεται από το pool, με τον ίδιο τρόπο όπως σε ένα rerun
+        with wms.student_db(student_id):
+            pass
+        return connect_readonly(path)
+
+    def status(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def recent(self):
+        with self._lock:
+            return list(reversed(self.jobs.values()))
+
+
+@process_singleton
+def get_class_exports():
+    """Οι εργασίες εξαγωγής ζουν όσο η διεργασία, όχι όσο ένα rerun."""
+    return ClassExportJobs()
+
+
+class_exports = get_class_exports()
+
+
+def fetch_invoice(db, invoice_id):
+    """Κεφαλίδα και γραμμές ενός παραστατικού με βάση το id, ή None."""
+    cursor = db.execute(
+        "SELECT id, doc_number, doc_type, doc_date, customer_name, afm, address FROM invoices WHERE id = ?",
+        (invoice_id,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    invoice = dict(zip([col[0] for col in cursor.description], row))
+    invoice['lines'] = db.execute(
+        """
+        SELECT p.name, p.barcode, il.quantity
+        FROM invoice_lines il
+        LEFT JOIN products p ON p.id = il.product_id
+        WHERE il.invoice_id = ?
+        ORDER BY il.id
+        """,
+        (invoice_id,)
+    ).fetchall()
+    return invoice
+
+
+# Αλλάζει όταν αλλάζει το πρότυπο, ώστε να ακυρώνονται τα παλιά αποτελέσματα
+INVOICE_TEMPLATE_VERSION = 1
+
+INVOICE_CSS = """
+@page { size: A4; margin: 18mm; }
+body { font-family: 'DejaVu Sans', Arial, sans-serif; font-size: 11pt; color: #222; }
+h1 { font-size: 16pt; margin: 0 0 4mm; }
+.meta { width: 100%; margin-bottom: 8mm; }
+.meta td { padding: 1mm 0; vertical-align: top; }
+table.lines { width: 100%; border-collapse: collapse; }
+table.lines th, table.lines td { border: 1px solid #999; padding: 2mm; }
+table.lines th { background: #eee; text-align: left; }
+td.qty, th.qty { text-align: right; width: 25mm; }
+.total { margin-top: 4mm; text-align: right; font-weight: bold; }
+.signatures { margin-top: 25mm; width: 100%; }
+.signatures td { width: 50%; text-align: center; padding-top: 15mm; border-top: 1px solid #999; }
+"""
+
+
+def invoice_content_hash(invoice):
+    payload = json.dumps([INVOICE_TEMPLATE_VERSION, invoice], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def render_invoice_html(invoice):
+    """Εκτυπώσιμο Τιμολόγιο - Δελτίο Αποστολής ως αυτόνομο HTML."""
+    e = lambda value: html.escape(str(value)) if value not in (None, "") else "-"
+    rows = "".join(
+        f"<tr><td>{n}</td><td>{e(name)}</td><td>{e(barcode)}</td><td class='qty'>{e(qty)}</td></tr>"
+        for n, (name, barcode, qty) in enumerate(invoice['lines'], 1)
+    )
+    total = sum(qty or 0 for _, _, qty in invoice['lines'])
+    return f"""<!DOCTYPE html>
+<html lang="el"><head><meta charset="utf-8">
+<title>{e(invoice['doc_type'])} {e(invoice['doc_number'])}</title>
+<style>{INVOICE_CSS}</style></head>
+<body>
+<h1>{e(invoice['doc_type'] or "Τιμολόγιο - Δελτίο Αποστολής")}</h1>
+<table class="meta">
+<tr><td><b>Αριθμός:</b> {e(invoice['doc_number'])}</td><td><b>Ημερομηνία:</b> {e(invoice['doc_date'])}</td></tr>
+<tr><td><b>Πελάτης:</b> {e(invoice['customer_name'])}</td><td><b>Α.Φ.Μ.:</b> {e(invoice['afm'])}</td></tr>
+<tr><td colspan="2"><b>Διεύθυνση:</b> {e(invoice['address'])}</td></tr>
+</table>
+<table class="lines">
+<tr><th>Α/Α</th><th>Περιγραφή</th><th>Barcode</th><th class="qty">Ποσότητα</th></tr>
+{rows}
+</table>
+<div class="total">Σύνολο τεμαχίων: {total}</div>
+<table class="signatures"><tr><td>Ο Εκδότης</td><td>Ο Παραλαβών</td></tr></table>
+</body></html>
+"""
+
+
+def render_invoice_pdf(invoice):
+    """PDF από το ίδιο HTML· θέλει το προαιρετικό πακέτο weasyprint."""
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        raise RuntimeError("Για PDF χρειάζεται το πακέτο weasyprint (pip install weasyprint)")
+    return HTML(string=render_invoice_html(invoice)).write_pdf()
+
+
+def pdf_available():
+    try:
+        import weasyprint  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# Μορφή -> (τίτλος, κατάληξη, mime, συνάρτηση απόδοσης σε bytes)
+INVOICE_FORMATS = {
+    'html': ("HTML (εκτύπωση)", ".html", "text/html", lambda inv: render_invoice_html(inv).encode('utf-8')),
+    'pdf': ("PDF", ".pdf", "application/pdf", render_invoice_pdf),
+}
+
+
+class InvoiceRenderer:
+    """Απόδοση παραστατικών με cache ανά (βάση, id, μορφή).
+
+    Κάθε εγγραφή κρατά και το hash του περιεχομένου: αν το παραστατικό ή το
+    πρότυπο αλλάξει, το hash δεν ταιριάζει και το έγγραφο ξαναβγαίνει.
+    """
+
+    def __init__(self, max_entries=1000, workers=4):
+        self.max_entries = max_entries
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, db_key, invoice, fmt='html'):
+        key = (db_key, invoice['id'], fmt)
+        digest = invoice_content_hash(invoice)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == digest:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        document = INVOICE_FORMATS[fmt][3](invoice)
+        with self._lock:
+            self._cache[key] = (digest, document)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return document
+
+    def render_range(self, path, date_from, date_to, out, fmt='html', db_key=None):
+        """Όλα τα παραστατικά ενός διαστήματος σε zip στο out, με thread pool.
+
+        Κάθε worker έχει δική του σύνδεση μόνο ανάγνωσης. db_key είναι το
+        κλειδί της cache για τη βάση (προεπιλογή το path). Επιστρέφει
+        (πλήθος, δευτερόλεπτα).
+        """
+        db_key = db_key or path
+        started = time.perf_counter()
+        conn = connect_readonly(path)
+        try:
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM invoices WHERE doc_date BETWEEN ? AND ? ORDER BY doc_date, id",
+                (str(date_from), str(date_to))
+            )]
+        finally:
+            conn.close()
+
+        local = threading.local()
+        connections = []
+
+        def work(invoice_id):
+            if not hasattr(local, 'conn'):
+                local.conn = connect_readonly(path)
+                connections.append(local.conn)
+            invoice = fetch_invoice(local.conn, invoice_id)
+            return invoice, self.render(db_key, invoice, fmt)
+
+        suffix = INVOICE_FORMATS[fmt][1]
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool, \
+                    zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for invoice, document in pool.map(work, ids):
+                    safe_number = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(invoice['doc_number']))
+                    archive.writestr(f"{invoice['doc_date']}_{invoice['id']}_{safe_number}{suffix}", document)
+        finally:
+            for conn in connections:
+                conn.close()
+        return len(ids), time.perf_counter() - started
+
+    def stats(self):
+        with self._lock:
+            return {'cached': len(self._cache), 'hits': self.hits, 'misses': self.misses}
+
+
+@process_singleton
+def get_invoice_renderer():
+    return InvoiceRenderer()
+
+
+invoice_renderer = get_invoice_renderer()
+
+
+class StudentDirectory:
+    """Κατάλογος μαθητών στη μνήμη, φορτωμένος από το master.db.
+
+    Το PRAGMA data_version δείχνει αν άλλη σύνδεση άλλαξε το master.db· τότε
+    φορτώνονται μόνο οι νέες γραμμές (rowid > τελευταίο), εκτός αν το πλήθος
+    δεν ταιριάζει οπότε γίνεται πλήρης φόρτωση.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._data_version = None
+        self._max_rowid = 0
+        self._students = {}
+        self.reloads = 0
+
+    def _load_locked(self, since_rowid):
+        rows = self._conn.execute(
+            "SELECT rowid, student_id, full_name, class_name FROM students WHERE rowid > ?",
+            (since_rowid,)
+        ).fetchall()
+        for rowid, student_id, full_name, class_name in rows:
+            self._students[student_id] = (full_name, class_name)
+            self._max_rowid = max(self._max_rowid, rowid)
+
+    def _refresh_locked(self):
+        if self._conn is None:
+            self._conn = connect_db(self.path, check_same_thread=False)
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        self._data_version = version
+        self._load_locked(self._max_rowid)
+        count = self._conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+        if count != len(self._students):
+            self._students, self._max_rowid = {}, 0
+            self._load_locked(0)
+        self.reloads += 1
+
+    def get(self, student_id):
+        """(full_name, class_name) του μαθητή ή None."""
+        with self._lock:
+            self._refresh_locked()
+            return self._students.get(student_id)
+
+    def exists(self, student_id):
+        return self.get(student_id) is not None
+
+    def add(self, student_id, full_name, class_name):
+        with self._lock:
+            self._students[student_id] = (full_name, class_name)
+
+    def __len__(self):
+        with self._lock:
+            self._refresh_locked()
+            return len(self._students)
+
+
+@process_singleton
+def _student_directories():
+    return {}, threading.Lock()
+
+
+def get_student_directory(path):
+    """Ένας κατάλογος ανά master.db για όλη τη διεργασία."""
+    path = os.path.abspath(path)
+    directories, lock = _student_directories()
+    with lock:
+        if path not in directories:
+            directories[path] = StudentDirectory(path)
+        return directories[path]
+
+
+# Τα ids γίνονται ονόματα αρχείων, οπότε οι νέες εγγραφές δέχονται μόνο αυτά
+STUDENT_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]+')
+
+
+def valid_student_id(student_id):
+    return bool(student_id) and STUDENT_ID_PATTERN.fullmatch(student_id) is not None
+
+
+def _student_file_name(student_id):
+    """<id>.db· παλιά ids με άλλους χαρακτήρες περνούν, όχι όμως διαχωριστικά φακέλων."""
+    if not student_id or any(sep in student_id for sep in ('/', '\\', '\0')):
+        raise ValueError(f"Μη έγκυρο student ID: {student_id!r}")
+    return f'{student_id}.db'
+
+
+class FlatLayout:
+    """Όλες οι βάσεις μαθητών σε έναν φάκελο: student_dbs/<id>.db"""
+
+    name = 'flat'
+
+    def __init__(self, root='student_dbs'):
+        self.root = root
+
+    def path(self, student_id):
+        return f'{self.root}/{_student_file_name(student_id)}'
+
+    def iter_paths(self):
+        return sorted(glob.glob(f'{self.root}/*.db'))
+
+
+class ShardedLayout:
+    """Βάσεις σε υποφακέλους από το hash του id: student_dbs/ab/cd/<id>.db
+
+    Με 2 επίπεδα των 2 hex χαρακτήρων, 100k μαθητές μοιράζονται σε 65536
+    φακέλους και κανένας φάκελος δεν μεγαλώνει πολύ.
+    """
+
+    name = 'sharded'
+
+    def __init__(self, root='student_dbs', levels=2, width=2):
+        self.root = root
+        self.levels = levels
+        self.width = width
+
+    def path(self, student_id):
+        digest = hashlib.sha1(student_id.encode('utf-8')).hexdigest()
+        shards = [digest[i * self.width:(i + 1) * self.width] for i in range(self.levels)]
+        return '/'.join([self.root] + shards + [_student_file_name(student_id)])
+
+    def iter_paths(self):
+        return sorted(glob.glob('/'.join([self.root] + ['*'] * self.levels + ['*.db'])))
+
+
+STORAGE_LAYOUTS = {'flat': FlatLayout, 'sharded': ShardedLayout}
+LAYOUT_MARKER = 'student_dbs/LAYOUT'
+
+
+def detect_storage_layout():
+    """Το layout γράφεται μία φορά στο student_dbs/LAYOUT.
+
+    Υπάρχουσα εγκατάσταση με αρχεία student_dbs/*.db μένει flat μέχρι να
+    τρέξει το 'wms_admin.py migrate-layout'· μια νέα ξεκινά sharded.
+    """
+    if os.path.exists(LAYOUT_MARKER):
+        with open(LAYOUT_MARKER, encoding='utf-8') as f:
+            return f.read().strip()
+    name = 'flat' if FlatLayout().iter_paths() else 'sharded'
+    write_layout_marker(name)
+    return name
+
+
+def write_layout_marker(name):
+    tmp = f"{LAYOUT_MARKER}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(name + '\n')
+    os.replace(tmp, LAYOUT_MARKER)
+
+
+@process_singleton
+def _storage_init():
+    """Αρχικοποίηση αποθήκευσης μία φορά ανά διεργασία: master.db -> όνομα layout"""
+    return {}, threading.Lock()
+
+
+class StudentSnapshots:
+    """Στιγμιότυπα βάσεων μαθητών και επαναφορά ολόκληρης τάξης.
+
+    Το VACUUM INTO από σύνδεση μόνο ανάγνωσης δίνει συνεπές, συμπαγές
+    αντίγραφο χωρίς να σταματά τους εγγραφείς (WAL). Ίδιο περιεχόμενο δίνει
+    ίδια bytes, οπότε κάθε αρχείο αποθηκεύεται μία φορά με όνομα το sha256
+    του· ο πίνακας snapshots στο master.db δείχνει στο hash.
+    """
+
+    def __init__(self, wms, directory='student_snapshots', workers=8):
+        self.wms = wms
+        self.directory = directory
+        self.workers = workers
+
+    def object_path(self, digest):
+        return os.path.join(self.directory, digest[:2], f"{digest}.db")
+
+    def _temp_path(self):
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"{uuid.uuid4().hex}.tmp")
+
+    def _store(self, tmp):
+        """Μεταφέρει το αρχείο στην αποθήκη· επιστρέφει (digest, μέγεθος, νέο)."""
+        sha = hashlib.sha256()
+        with open(tmp, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        digest = sha.hexdigest()
+        size = os.path.getsize(tmp)
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            os.remove(tmp)
+            return digest, size, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp, path)
+        return digest, size, True
+
+    def capture(self, path):
+        """Συνεπές αντίγραφο μιας βάσης, ακόμη κι αν είναι σε χρήση."""
+        tmp = self._temp_path()
+        conn = connect_readonly(path)
+        try:
+            conn.execute("VACUUM INTO ?", (tmp,))
+        finally:
+            conn.close()
+        return self._store(tmp)
+
+    def _record(self, label, captured):
+        with self.wms.master() as conn:
+            conn.executemany(
+                "INSERT INTO snapshots (label, student_id, digest, size) VALUES (?, ?, ?, ?)",
+                [(label, student_id, digest, size) for student_id, digest, size, _ in captured]
+            )
+            conn.commit()
+
+    def take(self, label, student_ids, workers=None):
+        """Στιγμιότυπο κάθε βάσης που υπάρχει, όλα με την ίδια ετικέτα."""
+        started = time.perf_counter()
+
+        def work(student_id):
+            path = self.wms.student_db_path(student_id)
+            if not os.path.exists(path):
+                return None
+            return (student_id,) + self.capture(path)
+
+        with ThreadPoolExecutor(max_workers=workers or self.workers) as pool:
+            captured = [c for c in pool.map(work, student_ids) if c is not None]
+        self._record(label, captured)
+        return {
+            'taken': len(captured),
+            'stored': sum(1 for c in captured if c[3]),
+            'skipped': len(student_ids) - len(captured),
+            'seconds': time.perf_counter() - started,
+        }
+
+    def take_empty(self, label="Κενή αποθήκη"):
+        """Στιγμιότυπο της άδειας βάσης (το template), για μηδενισμό τάξης."""
+        captured = (None,) + self.capture(self.wms.ensure_template())
+        self._record(label, [captured])
+        return captured[1]
+
+    def labels(self):
+        """Σύνοψη ανά ετικέτα: πλήθος, μοναδικά αρχεία και μέγεθος στον δίσκο."""
+        with self.wms.master() as conn:
+            cursor = conn.execute("""
+                SELECT label, COUNT(*) AS snapshots, COUNT(DISTINCT digest) AS files,
+                       MAX(created_date) AS created_date
+                FROM snapshots GROUP BY label ORDER BY MAX(id) DESC
+            """)
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def catalog(self, label):
+        with self.wms.master() as conn:
+            cursor = conn.execute(
+                "SELECT id, student_id, digest, size, created_date FROM snapshots WHERE label = ? ORDER BY student_id",
+                (label,)
+            )
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get(self, snapshot_id):
+        with self.wms.master() as conn:
+            row = conn.execute("SELECT digest FROM snapshots WHERE id = ?", (snapshot_id,)).fetchone()
+        if row is None:
+            raise KeyError(snapshot_id)
+        return row[0]
+
+    def upgraded(self, digest):
+        """Το στιγμιότυπο στην τελευταία έκδοση σχήματος.
+
+        Παλιά στιγμιότυπα ενημερώνονται μία φορά σε νέο αντικείμενο, ώστε
+        οι βάσεις που επαναφέρονται να μη χρειάζονται migration η καθεμία.
+        """
+        latest = max(m[0] for m in STUDENT_DB_MIGRATIONS)
+        conn = connect_readonly(self.object_path(digest))
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+        if version >= latest:
+            return digest
+        tmp = self._temp_path()
+        shutil.copyfile(self.object_path(digest), tmp)
+        conn = register_sql_functions(sqlite3.connect(tmp))
+        try:
+            migrate_student_db(conn)
+        finally:
+            conn.close()
+        try:
+            return self.capture(tmp)[0]
+        finally:
+            os.remove(tmp)
+
+    def restore(self, student_id, digest):
+        """Αντικαθιστά τη βάση του μαθητή με το στιγμιότυπο· False αν είναι σε χρήση."""
+        wms = self.wms
+        path = wms.student_db_path(student_id)
+        if not wms.pool.discard(student_id) or not wms.writers.discard(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(self.object_path(digest), tmp)
+        # Κανένας writer άλλης διεργασίας στη μέση παρτίδας· μετά την αλλαγή
+        # οι συνδέσεις τους βλέπουν νέο inode και ανοίγουν ξανά
+        with file_lease(path):
+            # Ένα παλιό -wal δεν πρέπει να εφαρμοστεί πάνω στο νέο αρχείο
+            for p in (path + '-wal', path + '-shm'):
+                if os.path.exists(p):
+                    os.remove(p)
+            os.replace(tmp, path)
+            archive = wms.archive_path(path)
+            if os.path.exists(archive):
+                os.remove(archive)
+        dashboard_cache.invalidate(student_id)
+        return True
+
+    def restore_class(self, class_name, digest, workers=None):
+        """Ίδιο στιγμιότυπο σε όλους τους μαθητές της τάξης, παράλληλα."""
+        started = time.perf_counter()
+        digest = self.upgraded(digest)
+        students = self.wms.class_students(class_name)
+        with ThreadPoolExecutor(max_workers=workers or self.workers) as pool:
+            restored = list(pool.map(lambda student_id: self.restore(student_id, digest), students))
+        return {
+            'restored': sum(restored),
+            'busy': [sid for sid, ok in zip(students, restored) if not ok],
+            'seconds': time.perf_counter() - started,
+        }
+
+    def delete(self, label):
+        """Διαγραφή στιγμιοτύπων με την ετικέτα και όσων αρχείων δεν χρειάζονται πια."""
+        with self.wms.master() as conn:
+            conn.execute("DELETE FROM snapshots WHERE label = ?", (label,))
+            conn.commit()
+            referenced = {row[0] for row in conn.execute("SELECT DISTINCT digest FROM snapshots")}
+        removed = 0
+        for path in glob.glob(os.path.join(self.directory, '*', '*.db')):
+            if os.path.basename(path)[:-len('.db')] not in referenced:
+                os.remove(path)
+                removed += 1
+                if not os.listdir(os.path.dirname(path)):
+                    os.rmdir(os.path.dirname(path))
+        return removed
 
-# Ρύθμιση σελίδας
-st.set_page_config(
-    page_title="WMS Μαθητών",
-    page_icon="📦",
-    layout="wide"
-)
 
 class StudentWMS:
-    def __init__(self):
-        self.init_master_db()
+    def __init__(self, pool=None, profile=None, layout=None, writers=None):
+        self.pool = pool if pool is not None else student_db_pool
+        self.writers = writers if writers is not None else db_writers
+        self.profile = STORAGE_PROFILE if profile is None else profile
+        layout_name = self.init_master_db()
+        self.layout = layout if layout is not None else STORAGE_LAYOUTS[layout_name]()
+        self.directory = get_student_directory('master.db')
+        self._master = None
+        self._master_lock = threading.RLock()
+        self.snapshots = StudentSnapshots(self)
     
-    def init_master_db(self):
-        os.makedirs('student_dbs', exist_ok=True)
-        conn = sqlite3.connect('master.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS students (
-                student_id TEXT PRIMARY KEY,
-                full_name TEXT,
-                class_name TEXT,
-                created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn.commit()
-        conn.close()
+    def connect_master(self):
+        return connect_db('master.db', self.profile)
     
-    def register_student(self, student_id, full_name, class_name):
-        try:
-            conn = sqlite3.connect('master.db')
+    @contextmanager
+    def master(self):
+        """Η κοινή σύνδεση στο master.db, ένα thread τη φορά.
+
+        Ανοίγει με την πρώτη χρήση· σε σφάλμα γίνεται rollback ώστε να μη
+        μείνει ανοιχτή συναλλαγή που κρατά το κλείδωμα εγγραφής.
+        """
+        with self._master_lock:
+            if self._master is None:
+                self._master = connect_db('master.db', self.profile, check_same_thread=False)
+            try:
+                yield self._master
+            except BaseException:
+                self._master.rollback()
+                raise
+    
+    def init_master_db(self):
+        """Φάκελοι, πίνακας students και layout· μία φορά ανά διεργασία."""
+        key = os.path.abspath('master.db')
+        initialized, lock = _storage_init()
+        with lock:
+            if key in initialized:
+                return initialized[key]
+            os.makedirs('student_dbs', exist_ok=True)
+            conn = self.connect_master()
             cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO students (student_id, full_name, class_name) VALUES (?, ?, ?)",
-                (student_id, full_name, class_name)
-            )
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS students (
+                    student_id TEXT PRIMARY KEY,
+                    full_name TEXT,
+                    class_name TEXT,
+                    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    label TEXT NOT NULL,
+                    student_id TEXT,
+                    digest TEXT NOT NULL,
+                    size INTEGER,
+                    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
             conn.commit()
             conn.close()
+            initialized[key] = detect_storage_layout()
+            return initialized[key]
+    
+    def register_student(self, student_id, full_name, class_name):
+        if not valid_student_id(student_id):
+            raise ValueError(f"Μη έγκυρο student ID: {student_id!r}")
+        try:
+            with self.master() as conn:
+                conn.execute(
+                    "INSERT INTO students (student_id, full_name, class_name) VALUES (?, ?, ?)",
+                    (student_id, full_name, class_name)
+                )
+                conn.commit()
             
-            # Δημιουργία προσωπικής βάσης
-            self.create_student_database(student_id)
+            # Η προσωπική βάση δημιουργείται με το πρώτο άνοιγμα (provision_student_db)
+            self.directory.add(student_id, full_name, class_name)
             return True
         except sqlite3.IntegrityError:
             return False
@@ -50,8 +3044,55 @@ class StudentWMS:
             st.error(f"Σφάλμα: {e}")
             return False
     
+    def student_exists(self, student_id):
+        return self.directory.exists(student_id)
+    
+    def class_students(self, class_name):
+        with self.master() as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT student_id FROM students WHERE class_name = ? ORDER BY student_id", (class_name,)
+            )]
+    
+    def template_path(self):
+        latest = max(m[0] for m in STUDENT_DB_MIGRATIONS)
+        return f'student_dbs/.template-v{latest}.db'
+    
+    def ensure_template(self):
+        """Έτοιμη βάση με το σχήμα στην τελευταία έκδοση, για κλωνοποίηση."""
+        path = self.template_path()
+        if not os.path.exists(path):
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            self.build_student_database(tmp)
+            os.replace(tmp, path)
+        return path
+    
     def create_student_database(self, student_id):
-        conn = sqlite3.connect(f'student_dbs/{student_id}.db')
+        self.provision_student_db(self.student_db_path(student_id))
+    
+    def provision_student_db(self, path):
+        """Δημιουργεί τη βάση αν λείπει: από το αρχείο αρχειοθέτησης αν υπάρχει,
+        αλλιώς αντίγραφο του template αντί για CREATE TABLE."""
+        if os.path.exists(path):
+            return
+        # Δύο διεργασίες (ή threads) μπορεί να δουν ταυτόχρονα ότι λείπει· η
+        # δεύτερη δεν πρέπει να αντικαταστήσει βάση που ήδη χρησιμοποιείται
+        with file_lease(path):
+            if os.path.exists(path):
+                return
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            archive = self.archive_path(path)
+            if os.path.exists(archive):
+                with gzip.open(archive, 'rb') as src, open(tmp, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.replace(tmp, path)
+                os.remove(archive)
+            else:
+                shutil.copyfile(self.ensure_template(), tmp)
+                os.replace(tmp, path)
+    
+    def build_student_database(self, path):
+        conn = connect_db(path, self.profile)
         cursor = conn.cursor()
         
         # Προϊόντα
@@ -130,24 +3171,228 @@ class StudentWMS:
         ''')
         
         conn.commit()
+        migrate_student_db(conn)
+        # Όλο το περιεχόμενο στο κύριο αρχείο, ώστε να αντιγράφεται μόνο του
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
         conn.close()
     
+    def student_db_path(self, student_id):
+        return self.layout.path(student_id)
+    
+    def archive_path(self, path):
+        # Ίδια δομή φακέλων με τη ζωντανή βάση, κάτω από το student_archive/
+        return os.path.join('student_archive', os.path.relpath(path, self.layout.root)) + '.gz'
+    
+    def archive_inactive(self, max_idle_days, now=None):
+        """Συμπίεση και αρχειοθέτηση βάσεων που δεν άλλαξαν για max_idle_days.
+
+        VACUUM INTO φτιάχνει συμπαγές αντίγραφο, που γίνεται gzip· η ζωντανή
+        βάση αφαιρείται και ξαναδημιουργείται από το αρχείο με το επόμενο
+        άνοιγμα. Βάσεις ανοιχτές αυτή τη στιγμή παραλείπονται.
+        """
+        cutoff = (time.time() if now is None else now) - max_idle_days * 86400
+        archived = []
+        for path in self.layout.iter_paths():
+            if max(os.path.getmtime(p) for p in (path, path + '-wal') if os.path.exists(p)) > cutoff:
+                continue
+            student_id = os.path.basename(path)[:-len('.db')]
+            if not self.pool.discard(student_id) or not self.writers.discard(path):
+                continue
+            archive = self.archive_path(path)
+            os.makedirs(os.path.dirname(archive), exist_ok=True)
+            compact = f"{archive}.{os.getpid()}.vacuum"
+            # Οι writers των άλλων διεργασιών περιμένουν και μετά βρίσκουν το αρχείο
+            with file_lease(path):
+                if not os.path.exists(path):
+                    continue
+                conn = sqlite3.connect(path)
+                try:
+                    conn.execute("VACUUM INTO ?", (compact,))
+                finally:
+                    conn.close()
+                with open(compact, 'rb') as src, gzip.open(f"{archive}.tmp", 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(compact)
+                os.replace(f"{archive}.tmp", archive)
+                for p in (path, path + '-wal', path + '-shm'):
+                    if os.path.exists(p):
+                        os.remove(p)
+            archived.append(student_id)
+        return archived
+    
+    def migrate_layout(self, target):
+        """Μεταφέρει τις βάσεις στο νέο layout (π.χ. από flat σε sharded)."""
+        moved = 0
+        for path in self.layout.iter_paths():
+            student_id = os.path.basename(path)[:-len('.db')]
+            dest = target.path(student_id)
+            if dest == path:
+                continue
+            if not self.pool.discard(student_id) or not self.writers.discard(path):
+                raise RuntimeError(f"Η βάση {student_id} είναι σε χρήση")
+            # Όλο το περιεχόμενο στο κύριο αρχείο πριν τη μετακίνηση
+            conn = sqlite3.connect(path)
+            try:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                conn.close()
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(path, dest)
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            moved += 1
+        write_layout_marker(target.name)
+        initialized, lock = _storage_init()
+        with lock:
+            initialized[os.path.abspath('master.db')] = target.name
+        self.layout = target
+        return moved
+
+    def upgrade_storage(self):
+        """Μετατρέπει επιτόπου τις υπάρχουσες βάσεις στο τρέχον προφίλ.
+
+        Το journal_mode=WAL μένει αποθηκευμένο στο αρχείο, οπότε αρκεί ένα
+        πέρασμα για master.db και όλες τις βάσεις μαθητών.
+        """
+        upgraded = []
+        for path in ['master.db'] + self.layout.iter_paths():
+            conn = connect_db(path, self.profile)
+            try:
+                run_db_maintenance(conn)
+                mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+                upgraded.append((path, mode))
+            finally:
+                conn.close()
+        return upgraded
+
     def get_student_db_connection(self, student_id):
-        return sqlite3.connect(f'student_dbs/{student_id}.db')
+        return self.pool.get(student_id, self.student_db_path(student_id), self.provision_student_db)
+
+    def student_db(self, student_id):
+        """Σύνδεση από το pool, δεσμευμένη για τη διάρκεια του rerun."""
+        return self.pool.lease(student_id, self.student_db_path(student_id), self.provision_student_db)
+    
+    def write(self, student_id, fn, *args):
+        """Εγγραφή fn(conn, *args) μέσω του writer της βάσης· επιστρέφει Future."""
+        path = self.student_db_path(student_id)
+        if not os.path.exists(path):
+            self.provision_student_db(path)
+        return self.writers.submit(
+            path, fn, *args, profile=self.profile, provision=self.provision_student_db
+        )
+
+@process_singleton
+def get_wms():
+    """Ένα StudentWMS για όλα τα sessions: pool, writers και σύνδεση master κοινά."""
+    return StudentWMS()
+
+
+@process_singleton
+def _archiver_state():
+    return {'started': False, 'lock': threading.Lock()}
+
+
+def start_background_archiver(wms, max_idle_days, interval=3600):
+    """Thread που αρχειοθετεί περιοδικά τις ανενεργές βάσεις· ένα ανά διεργασία."""
+    state = _archiver_state()
+    with state['lock']:
+        if state['started']:
+            return
+        state['started'] = True
+
+    def run():
+        while True:
+            try:
+                wms.archive_inactive(max_idle_days)
+            except Exception:
+                pass  # ξανά στο επόμενο διάστημα
+            time.sleep(interval)
+
+    threading.Thread(target=run, name="wms-archiver", daemon=True).start()
+
+# Παλιότερα το token ήταν στο URL (?session=...)· δεν γίνεται πλέον δεκτό
+SESSION_PARAM = 'session'
+SESSION_COOKIE = 'wms_session'
+
+
+def restore_session():
+    """Σύνδεση από το cookie της συνεδρίας, π.χ. μετά από ανανέωση σελίδας ή
+    όταν ο load balancer στείλει τον χρήστη σε άλλη διεργασία."""
+    st.query_params.pop(SESSION_PARAM, None)
+    token = st.context.cookies.get(SESSION_COOKIE)
+    # Χωρίς πραγματικό browser (π.χ. AppTest) τα cookies δεν είναι strings
+    data = get_session_store().get(token) if isinstance(token, str) and token else None
+    if data is None:
+        return
+    if not st.session_state.wms.student_exists(data.get('student_id')):
+        return
+    st.session_state.logged_in = True
+    st.session_state.student_id = data['student_id']
+    st.session_state.session_token = token
+
+
+def start_session(student_id):
+    """Token σε cookie μόνο για μαθητές· ο καθηγητής μένει στο session της καρτέλας."""
+    token = get_session_store().create({'student_id': student_id})
+    st.session_state.session_token = token
+    st.session_state.session_cookie = token
+
+
+def end_session():
+    token = st.session_state.pop('session_token', None)
+    if token:
+        get_session_store().delete(token)
+        st.session_state.session_cookie = ''
+    st.session_state.logged_in = False
+    st.session_state.student_id = None
+    st.session_state.teacher = False
+
+
+def write_session_cookie():
+    """Γράφει ή σβήνει το cookie της συνεδρίας στο rerun μετά τη σύνδεση ή την αποσύνδεση.
+
+    Το Streamlit διαβάζει cookies αλλά δεν τα ορίζει, οπότε το γράφει ένα
+    μικρό script στη σελίδα. Χωρίς Max-Age ζει όσο ο browser· τη λήξη την
+    ορίζει το SessionStore.
+    """
+    token = st.session_state.pop('session_cookie', None)
+    if token is None:
+        return
+    attributes = "Path=/; SameSite=Strict" + ("" if token else "; Max-Age=0")
+    st.html(
+        f"<script>document.cookie = '{SESSION_COOKIE}={token}; {attributes}'"
+        " + (location.protocol === 'https:' ? '; Secure' : '');</script>",
+        unsafe_allow_javascript=True,
+    )
+
 
 def main():
     st.title("🎓 Εκπαιδευτικό WMS για Μαθητές")
+    write_session_cookie()
     
     # Αρχικοποίηση συστήματος
     if 'wms' not in st.session_state:
-        st.session_state.wms = StudentWMS()
+        st.session_state.wms = get_wms()
+    
+    if os.environ.get('WMS_ARCHIVE_AFTER_DAYS'):
+        start_background_archiver(st.session_state.wms, float(os.environ['WMS_ARCHIVE_AFTER_DAYS']))
+    
+    # Ακυρώσεις cache από τις άλλες διεργασίες
+    notifier = get_notifier()
+    if notifier is not None:
+        notifier.poll()
     
     # Σύνδεση/Εγγραφή
     if 'logged_in' not in st.session_state:
         st.session_state.logged_in = False
+        restore_session()
     
-    if not st.session_state.logged_in:
-        show_login_register()
+    if st.session_state.get('teacher'):
+        show_teacher_app()
+    elif not st.session_state.logged_in:
+        with perf.section("🔐 Σύνδεση/Εγγραφή"):
+            show_login_register()
     else:
         show_main_app()
 
@@ -165,13 +3410,14 @@ def show_login_register():
             
             submitted = st.form_submit_button("📋 Εγγραφή Μαθητή")
             if submitted:
-                if student_id and full_name and class_name:
-                    if st.session_state.wms.register_student(student_id, full_name, class_name):
-                        st.success(f"✅ Εγγράφηκες επιτυχώς! ID: {student_id}")
-                    else:
-                        st.error("❌ Το Student ID υπάρχει ήδη")
-                else:
+                if not (student_id and full_name and class_name):
                     st.error("❌ Συμπλήρωσε όλα τα πεδία")
+                elif not valid_student_id(student_id):
+                    st.error("❌ Το Student ID δέχεται μόνο λατινικά γράμματα, αριθμούς, - και _")
+                elif st.session_state.wms.register_student(student_id, full_name, class_name):
+                    st.success(f"✅ Εγγράφηκες επιτυχώς! ID: {student_id}")
+                else:
+                    st.error("❌ Το Student ID υπάρχει ήδη")
     
     with col2:
         st.subheader("🔐 Σύνδεση Μαθητή")
@@ -180,23 +3426,291 @@ def show_login_register():
             
             submitted = st.form_submit_button("🚀 Σύνδεση")
             if submitted:
-                if os.path.exists(f'student_dbs/{student_id}.db'):
+                if st.session_state.wms.student_exists(student_id):
                     st.session_state.logged_in = True
                     st.session_state.student_id = student_id
+                    start_session(student_id=student_id)
                     st.rerun()
                 else:
                     st.error("❌ Δεν βρέθηκε μαθητής με αυτό το ID")
+    
+    st.markdown("---")
+    with st.expander("👩‍🏫 Σύνδεση Καθηγητή"):
+        teacher_password = os.environ.get('WMS_TEACHER_PASSWORD')
+        if not teacher_password:
+            st.info("Η σύνδεση καθηγητή ενεργοποιείται με τη μεταβλητή WMS_TEACHER_PASSWORD")
+        else:
+            with st.form("teacher_login_form"):
+                password = st.text_input("Κωδικός", type="password")
+                if st.form_submit_button("🚀 Σύνδεση Καθηγητή"):
+                    if hmac.compare_digest(password.encode(), teacher_password.encode()):
+                        st.session_state.teacher = True
+                        st.rerun()
+                    else:
+                        st.error("❌ Λάθος κωδικός")
+
+def show_teacher_app():
+    """Εφαρμογή καθηγητή: στοιχεία από όλες τις βάσεις μαθητών"""
+    st.success("✅ Συνδεμένος ως: **Καθηγητής**")
+    
+    if st.button("🚪 Αποσύνδεση"):
+        end_session()
+        st.rerun()
+    
+    st.markdown("---")
+    
+    menu = st.selectbox(
+        "Επιλογή Ενότητας",
+        [
+            "📈 Αναλυτικά Τάξεων",
+            "📦 Εξαγωγή Τάξης",
+            "🗂️ Στιγμιότυπα",
+            "⏱️ Απόδοση",
+        ]
+    )
+    
+    if menu == "📈 Αναλυτικά Τάξεων":
+        show_class_analytics(st.session_state.wms)
+    elif menu == "📦 Εξαγωγή Τάξης":
+        show_class_export(st.session_state.wms)
+    elif menu == "🗂️ Στιγμιότυπα":
+        show_snapshots(st.session_state.wms)
+    elif menu == "⏱️ Απόδοση":
+        show_performance_panel()
+
+def show_class_analytics(wms):
+    st.header("📈 Αναλυτικά Τάξεων")
+    
+    per_student = class_analytics.collect(wms)
+    sweep = class_analytics.last_sweep
+    st.caption(
+        f"{sweep['students']} μαθητές · {sweep['read']} βάσεις διαβάστηκαν, "
+        f"{sweep['cached']} από cache · {sweep['seconds']:.2f} δευτ."
+    )
+    if per_student.empty:
+        st.info("Δεν υπάρχουν εγγεγραμμένοι μαθητές ακόμη")
+        return
+    
+    st.subheader("Ανά Τάξη")
+    st.dataframe(class_analytics.by_class(per_student))
+    
+    st.subheader("Ανά Μαθητή")
+    class_names = sorted(per_student['class_name'].dropna().unique().tolist())
+    selected_class = st.selectbox("Τάξη", class_names)
+    st.dataframe(per_student[per_student['class_name'] == selected_class])
+
+def show_class_export(wms):
+    st.header("📦 Εξαγωγή Τάξης")
+    
+    with wms.master() as conn:
+        class_names = [row[0] for row in conn.execute(
+            "SELECT DISTINCT class_name FROM students WHERE class_name IS NOT NULL ORDER BY class_name"
+        )]
+    if not class_names:
+        st.info("Δεν υπάρχουν εγγεγραμμένοι μαθητές ακόμη")
+        return
+    
+    with st.form("class_export"):
+        class_name = st.selectbox("Τάξη", class_names)
+        tables = st.multiselect(
+            "Πίνακες", list(EXPORTS), default=list(EXPORTS), format_func=lambda n: EXPORTS[n][0]
+        )
+        fmt = st.radio("Μορφή", list(EXPORT_FORMATS), format_func=lambda f: EXPORT_FORMATS[f][0], horizontal=True)
+        if st.form_submit_button("▶️ Έναρξη εξαγωγής"):
+            if tables:
+                class_exports.submit(wms, class_name, tables, fmt)
+            else:
+                st.error("❌ Διάλεξε τουλάχιστον έναν πίνακα")
+    
+    show_export_jobs()
+
+def show_snapshots(wms):
+    st.header("🗂️ Στιγμιότυπα")
+    st.caption("Συνεπή αντίγραφα βάσεων χωρίς διακοπή της εφαρμογής· ίδια αντίγραφα κρατιούνται μία φορά.")
+    
+    with wms.master() as conn:
+        class_names = [row[0] for row in conn.execute(
+            "SELECT DISTINCT class_name FROM students WHERE class_name IS NOT NULL ORDER BY class_name"
+        )]
+    
+    tab1, tab2 = st.tabs(["📸 Λήψη", "♻️ Επαναφορά Τάξης"])
+    
+    with tab1:
+        with st.form("take_snapshot"):
+            label = st.text_input("Ετικέτα *", placeholder="π.χ. Άσκηση 3 - αρχή")
+            source = st.radio("Από", ["Τάξη", "Μαθητής", "Κενή αποθήκη"], horizontal=True)
+            class_name = st.selectbox("Τάξη", class_names)
+            student_id = st.text_input("Κωδικός Μαθητή")
+            if st.form_submit_button("📸 Λήψη"):
+                if not label:
+                    st.error("❌ Η ετικέτα είναι υποχρεωτική")
+                elif source == "Τάξη":
+                    if class_name is None:
+                        st.error("❌ Δεν υπάρχουν τάξεις")
+                    else:
+                        result = wms.snapshots.take(label, wms.class_students(class_name))
+                        st.success(
+                            f"✅ {result['taken']} στιγμιότυπα ({result['stored']} νέα αρχεία) "
+                            f"σε {result['seconds']:.2f} δευτ."
+                        )
+                        if result['skipped']:
+                            st.caption(f"{result['skipped']} μαθητές χωρίς βάση παραλείφθηκαν")
+                elif source == "Μαθητής":
+                    if not wms.student_exists(student_id):
+                        st.error("❌ Ο μαθητής δεν βρέθηκε")
+                    elif not wms.snapshots.take(label, [student_id])['taken']:
+                        st.error("❌ Ο μαθητής δεν έχει βάση ακόμη")
+                    else:
+                        st.success("✅ Το στιγμιότυπο αποθηκεύτηκε")
+                else:
+                    wms.snapshots.take_empty(label)
+                    st.success("✅ Το στιγμιότυπο αποθηκεύτηκε")
+    
+    labels = wms.snapshots.labels()
+    
+    with tab2:
+        if not labels:
+            st.info("Δεν υπάρχουν στιγμιότυπα ακόμη")
+        elif not class_names:
+            st.info("Δεν υπάρχουν εγγεγραμμένοι μαθητές ακόμη")
+        else:
+            label = st.selectbox("Στιγμιότυπο", [l['label'] for l in labels])
+            snapshots = wms.snapshots.catalog(label)
+            snapshot = st.selectbox(
+                "Πρότυπο",
+                snapshots,
+                format_func=lambda s: f"{s['student_id'] or 'κενή αποθήκη'} · {s['size'] / 1024:.0f} KB",
+            )
+            class_name = st.selectbox("Τάξη", class_names, key="restore_class")
+            confirm = st.checkbox("Οι βάσεις όλων των μαθητών της τάξης θα αντικατασταθούν")
+            if st.button("♻️ Επαναφορά", disabled=not confirm):
+                with st.spinner("Επαναφορά..."):
+                    result = wms.snapshots.restore_class(class_name, snapshot['digest'])
+                st.success(f"✅ Επαναφέρθηκαν {result['restored']} βάσεις σε {result['seconds']:.2f} δευτ.")
+                if result['busy']:
+                    st.warning(f"Σε χρήση, δεν άλλαξαν: {', '.join(result['busy'])}")
+    
+    st.subheader("Αποθηκευμένα")
+    if labels:
+        st.dataframe(labels)
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            label = st.selectbox("Ετικέτα", [l['label'] for l in labels], key="delete_label")
+        with col2:
+            if st.button("🗑️ Διαγραφή"):
+                wms.snapshots.delete(label)
+                st.rerun()
+
+@st.fragment(run_every=2)
+def show_export_jobs():
+    """Κατάσταση εργασιών· ανανεώνεται μόνο αυτό το κομμάτι της σελίδας."""
+    jobs = class_exports.recent()
+    if not jobs:
+        return
+    st.subheader("Εργασίες")
+    for job in jobs:
+        title = f"{job['class_name']} · {EXPORT_FORMATS[job['format']][0]} · {job['created']:%H:%M:%S}"
+        if job['state'] == 'done':
+            st.download_button(
+                f"⬇️ {title}",
+                data=lambda path=job['path']: read_download(path),
+                file_name=os.path.basename(job['path']),
+                mime="application/zip",
+                key=f"export_{job['id']}",
+                on_click="ignore",
+            )
+            if job['skipped']:
+                st.caption("Παραλείφθηκαν: " + ", ".join(
+                    f"{student_id} ({reason})" for student_id, reason in job['skipped']
+                ))
+        elif job['state'] == 'error':
+            st.error(f"{title}: {job['error']}")
+        else:
+            st.progress(job['done'] / job['total'] if job['total'] else 0.0, text=f"{title} · {job['done']}/{job['total']}")
+
+def explain_query_plan(query):
+    """EXPLAIN QUERY PLAN για ένα καταγεγραμμένο ερώτημα, σε σύνδεση μόνο ανάγνωσης."""
+    conn = connect_readonly(query['db'])
+    try:
+        return conn.execute(f"EXPLAIN QUERY PLAN {query['sql']}", query['params'] or ()).fetchall()
+    finally:
+        conn.close()
+
+def show_performance_panel():
+    st.header("⏱️ Απόδοση")
+    
+    if not INSTRUMENT:
+        st.info("Οι μετρήσεις είναι απενεργοποιημένες (WMS_INSTRUMENT=0)")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    pool_stats = student_db_pool.stats()
+    col1.metric("Ανοιχτές βάσεις", pool_stats['open'])
+    col2.metric("Pool hit ratio", f"{pool_stats['hit_ratio']:.0%}")
+    col3.metric("Καταγεγραμμένα ερωτήματα", len(perf.queries))
+
+    if perf.startup:
+        st.subheader("Εκκίνηση Script")
+        first, last = perf.startup['first'], perf.startup['last']
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Πρώτο φόρτωμα", f"{first['import_ms']:.0f} ms")
+        col2.metric("Πρώτη σχεδίαση", f"{first['render_ms']:.0f} ms")
+        col3.metric("Τελευταίο φόρτωμα", f"{last['import_ms']:.0f} ms")
+        col4.metric("Τελευταία σχεδίαση", f"{last['render_ms']:.0f} ms")
+        st.caption(f"{perf.startup['runs']} εκτελέσεις· το φόρτωμα μετρά από την αρχή του script ως το main().")
+
+    writers = db_writers.stats()
+    if writers:
+        st.subheader("Writers Βάσεων (group commit)")
+        st.dataframe(writers)
+    
+    st.subheader("Χρόνος ανά Ενότητα")
+    st.dataframe(perf.section_stats())
+    
+    st.subheader("Ερωτήματα (ταξινόμηση κατά p95)")
+    st.dataframe(perf.query_stats())
+    
+    st.subheader(f"Αργά Ερωτήματα (≥ {perf.slow_ms} ms)")
+    slow = [q for q in reversed(perf.slow_queries()) if q['sql'].split()[0].upper() in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")]
+    if not slow:
+        st.info("Δεν υπάρχουν αργά ερωτήματα")
+    else:
+        st.dataframe([{k: q[k] for k in ('section', 'db', 'ms', 'rows', 'sql')} for q in slow])
+        index = st.selectbox(
+            "EXPLAIN QUERY PLAN για",
+            range(len(slow)),
+            format_func=lambda i: f"{slow[i]['ms']:.1f} ms · {slow[i]['sql'][:80]}"
+        )
+        if not os.path.exists(slow[index]['db']):
+            st.info("Η βάση του ερωτήματος δεν υπάρχει πλέον")
+        else:
+            try:
+                st.table([{"id": r[0], "parent": r[1], "detail": r[3]} for r in explain_query_plan(slow[index])])
+            except sqlite3.Error as e:
+                st.error(f"Σφάλμα: {e}")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "⬇️ Εξαγωγή JSON lines", perf.export_jsonl(),
+            file_name="wms_perf.jsonl", mime="application/x-ndjson"
+        )
+    with col2:
+        if st.button("🧹 Καθαρισμός μετρήσεων"):
+            perf.clear()
+            st.rerun()
 
 def show_main_app():
     """Κύρια εφαρμογή αφού συνδεθεί ο μαθητής"""
     student_id = st.session_state.student_id
-    student_db = st.session_state.wms.get_student_db_connection(student_id)
-    
+    with st.session_state.wms.student_db(student_id) as student_db:
+        show_sections(student_db, student_id)
+
+def show_sections(student_db, student_id):
     st.success(f"✅ Συνδεμένος ως: **{student_id}**")
     
     if st.button("🚪 Αποσύνδεση"):
-        st.session_state.logged_in = False
-        st.session_state.student_id = None
+        end_session()
         st.rerun()
     
     st.markdown("---")
@@ -211,55 +3725,271 @@ def show_main_app():
             "🔄 Συναλλαγές",
             "🏭 Προμηθευτές",
             "📄 Τιμολόγια - Δ.Α.",
-            "📊 Αποθήκη"
+            "📊 Αποθήκη",
+            "🛒 Αναπαραγγελία",
+            "📤 Εξαγωγή"
         ]
     )
 
-    if menu == "🏠 Αρχική":
-        show_dashboard(student_db, student_id)
-    elif menu == "📋 Προϊόντα":
-        manage_products(student_db)
-    elif menu == "📍 Θέσεις Αποθήκης":
-        manage_locations(student_db)
-    elif menu == "🔄 Συναλλαγές":
-        manage_transactions(student_db)
-    elif menu == "🏭 Προμηθευτές":
-        manage_suppliers(student_db)
-    elif menu == "📄 Τιμολόγια - Δ.Α.":
-        manage_invoices(student_db)
-    elif menu == "📊 Αποθήκη":
-        show_inventory(student_db)
+    with perf.section(menu):
+        if menu == "🏠 Αρχική":
+            show_dashboard(student_db, student_id)
+        elif menu == "📋 Προϊόντα":
+            manage_products(student_db, student_id)
+        elif menu == "📍 Θέσεις Αποθήκης":
+            manage_locations(student_db, student_id)
+        elif menu == "🔄 Συναλλαγές":
+            manage_transactions(student_db, student_id)
+        elif menu == "🏭 Προμηθευτές":
+            manage_suppliers(student_db, student_id)
+        elif menu == "📄 Τιμολόγια - Δ.Α.":
+            manage_invoices(student_db, student_id)
+        elif menu == "📊 Αποθήκη":
+            show_inventory(student_db)
+        elif menu == "🛒 Αναπαραγγελία":
+            manage_reorder(student_db, student_id)
+        elif menu == "📤 Εξαγωγή":
+            show_export(st.session_state.wms.student_db_path(student_id), student_id)
 
 
 def show_dashboard(db, student_id):
     st.header("🏠 Πίνακας Ελέγχου")
+    started = time.perf_counter()
+    summary = dashboard_cache.get(student_id, db)
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        products_count = pd.read_sql("SELECT COUNT(*) as count FROM products", db)['count'].iloc[0]
-        st.metric("📦 Προϊόντα", products_count)
+        st.metric("📦 Προϊόντα", summary['products_count'])
     
     with col2:
-        locations_count = pd.read_sql("SELECT COUNT(*) as count FROM locations", db)['count'].iloc[0]
-        st.metric("📍 Θέσεις", locations_count)
+        st.metric("📍 Θέσεις", summary['locations_count'])
     
     with col3:
-        total_qty = pd.read_sql("SELECT SUM(quantity) as total FROM products", db)['total'].iloc[0] or 0
-        st.metric("📊 Συνολικό Απόθεμα", total_qty)
+        st.metric("📊 Συνολικό Απόθεμα", summary['total_qty'])
+    
+    st.metric("⚠️ Χαμηλό Απόθεμα", summary['low_stock_count'])
+    if summary['low_stock_count']:
+        st.caption("Οι προτάσεις παραγγελίας βρίσκονται στη σελίδα «🛒 Αναπαραγγελία»")
     
     st.markdown("---")
     st.subheader("Πρόσφατα Προϊόντα")
-    products = pd.read_sql("SELECT * FROM products ORDER BY created_date DESC LIMIT 5", db)
-    if not products.empty:
-        st.dataframe(products)
+    if summary['recent_products']:
+        st.dataframe(summary['recent_products'])
     else:
         st.info("Δεν υπάρχουν προϊόντα ακόμη. Πρόσθεσε κάποια από το μενού 'Προϊόντα'")
+    
+    dashboard_cache.record_render(student_id, time.perf_counter() - started, summary['products_count'])
+
+# Πόσο περιμένει η σελίδα το commit του writer
+WRITE_TIMEOUT = 30
+
+def run_write(student_id, fn, *args):
+    """Εκτελεί την εγγραφή στον writer της βάσης και περιμένει το αποτέλεσμα."""
+    return st.session_state.wms.write(student_id, fn, *args).result(timeout=WRITE_TIMEOUT)
+
+def execute_write(student_id, sql, params=()):
+    """Μία εντολή SQL μέσω του writer· επιστρέφει το rowcount."""
+    return run_write(student_id, lambda conn: conn.execute(sql, params).rowcount)
+
+def has_rows(db, table):
+    return db.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is not None
+
+def show_migration_notes(db, entity):
+    """Αλλαγές σε δεδομένα από ενημέρωση σχήματος, π.χ. διπλά barcodes που αφαιρέθηκαν."""
+    notes = db.execute(
+        "SELECT entity_id, note, created_date FROM migration_log WHERE entity = ? ORDER BY id", (entity,)
+    ).fetchall()
+    if notes:
+        with st.expander(f"⚠️ {len(notes)} αλλαγές από την ενημέρωση της βάσης"):
+            st.dataframe([{"Α/Α": i, "Σημείωση": note, "Ημερομηνία": date} for i, note, date in notes])
+
+def search_prefix(db, table, column, prefix, limit=20):
+    """Τιμές της στήλης που ξεκινούν με το prefix, με εύρος πάνω στο ευρετήριο."""
+    if prefix:
+        rows = db.execute(
+            f"SELECT DISTINCT {column} FROM {table} WHERE {column} >= ? AND {column} < ? "
+            f"ORDER BY {column} LIMIT ?",
+            (prefix, prefix + '\uffff', limit)
+        )
+    else:
+        rows = db.execute(
+            f"SELECT DISTINCT {column} FROM {table} ORDER BY {column} LIMIT ?", (limit,)
+        )
+    return [row[0] for row in rows]
+
+def typeahead_select(db, label, table, column, key, limit=20):
+    """Selectbox που φορτώνει μόνο όσες τιμές ταιριάζουν με ό,τι πληκτρολογήθηκε."""
+    prefix = st.text_input(f"🔎 {label} - αρχικά γράμματα", key=f"{key}_q")
+    options = search_prefix(db, table, column, prefix.strip(), limit)
+    return st.selectbox(label, options, key=f"{key}_sel")
+
+def keyset_page(db, table, columns, sort_col, search_columns, search='',
+                start=None, page_size=50, descending=False):
+    """Μία σελίδα της λίστας: (γραμμές, υπάρχει επόμενη).
+
+    Κάθε γραμμή είναι (id, τιμή ταξινόμησης, *columns). start είναι το
+    (τιμή ταξινόμησης, id) της τελευταίας γραμμής της προηγούμενης σελίδας.
+    """
+    where, params = [], []
+    if search:
+        where.append("(" + " OR ".join(f"{c} LIKE ?" for c in search_columns) + ")")
+        params += [f"%{search}%"] * len(search_columns)
+    if start is not None:
+        where.append(f"({sort_col}, id) {'<' if descending else '>'} (?, ?)")
+        params += list(start)
+    direction = "DESC" if descending else "ASC"
+    sql = (
+        f"SELECT id, {sort_col}, {', '.join(columns)} FROM {table}"
+        + (f" WHERE {' AND '.join(where)}" if where else "")
+        + f" ORDER BY {sort_col} {direction}, id {direction} LIMIT ?"
+    )
+    rows = db.execute(sql, params + [page_size + 1]).fetchall()
+    return rows[:page_size], len(rows) > page_size
+
+def paginated_list(db, key, table, columns, sort_columns, search_columns,
+                   page_size=50, descending=False):
+    """Λίστα με σελιδοποίηση keyset, ταξινόμηση και φίλτρο στη βάση.
+
+    Στο Streamlit φτάνει μόνο η τρέχουσα σελίδα. Για κάθε σελίδα κρατάμε
+    το (τιμή ταξινόμησης, id) της τελευταίας γραμμής της προηγούμενης,
+    οπότε η επόμενη ξεκινά με αναζήτηση στο ευρετήριο και όχι με OFFSET.
+    Οι στήλες ταξινόμησης πρέπει να μην έχουν NULL.
+    """
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        search = st.text_input("🔎 Φίλτρο", key=f"{key}_search").strip()
+    with col2:
+        sort_label = st.selectbox("Ταξινόμηση", list(sort_columns), key=f"{key}_sort")
+    with col3:
+        descending = st.checkbox("Φθίνουσα", value=descending, key=f"{key}_desc")
+    sort_col = sort_columns[sort_label]
+
+    # Αλλαγή φίλτρου ή ταξινόμησης = επιστροφή στην πρώτη σελίδα
+    signature = (search, sort_col, descending)
+    state = st.session_state.get(f"{key}_pages")
+    if state is None or state['signature'] != signature:
+        state = {'signature': signature, 'cursors': [None]}
+        st.session_state[f"{key}_pages"] = state
+
+    rows, has_next = keyset_page(
+        db, table, columns, sort_col, search_columns, search,
+        state['cursors'][-1], page_size, descending
+    )
+
+    if rows:
+        st.dataframe([dict(zip(['id'] + columns, (r[0],) + r[2:])) for r in rows])
+    else:
+        st.info("Δεν βρέθηκαν εγγραφές")
+
+    page = len(state['cursors'])
+    nav1, nav2, nav3 = st.columns([1, 1, 4])
+    with nav1:
+        if page > 1 and st.button("◀ Προηγούμενη", key=f"{key}_prev"):
+            state['cursors'].pop()
+            st.rerun()
+    with nav2:
+        if has_next and st.button("Επόμενη ▶", key=f"{key}_next"):
+            state['cursors'].append((rows[-1][1], rows[-1][0]))
+            st.rerun()
+    with nav3:
+        st.caption(f"Σελίδα {page} · {len(rows)} εγγραφές")
+    return len(rows)
 
-def manage_products(db):
+def show_bulk_import(db, student_id, table):
+    """Μαζική εισαγωγή από CSV/Excel για products, suppliers ή locations."""
+    spec = IMPORT_SPECS[table]
+    st.caption(
+        "Στήλες αρχείου: " + ", ".join(spec['columns'])
+        + " · υποχρεωτικά: " + ", ".join(spec['required'])
+    )
+    uploaded = st.file_uploader(
+        "Αρχείο CSV ή Excel", type=["csv", "xlsx"], key=f"import_{table}"
+    )
+    if uploaded is None or not st.button("📥 Εισαγωγή", key=f"import_{table}_run"):
+        return
+
+    size = uploaded.size or 1
+    bar = st.progress(0.0, text="Εισαγωγή...")
+    # Η εισαγωγή τρέχει στο thread του writer, που δεν μπορεί να γράψει στη
+    # σελίδα· η πρόοδος περνά από ουρά και τη δείχνει το script
+    updates = queue.Queue()
+
+    def progress(inserted, failed):
+        done = min(1.0, uploaded.tell() / size) if uploaded.name.lower().endswith('.csv') else 1.0
+        updates.put((done, inserted, failed))
+
+    def import_file(conn):
+        # Αν ο writer ξαναδοκιμάσει την παρτίδα, το αρχείο διαβάζεται από την αρχή
+        uploaded.seek(0)
+        return bulk_import(conn, table, read_import_chunks(uploaded), progress)
+
+    started = time.perf_counter()
+    future = st.session_state.wms.write(student_id, import_file)
+    while True:
+        try:
+            inserted, errors = future.result(timeout=0.2)
+            break
+        except FutureTimeoutError:
+            pass
+        except Exception as e:
+            st.error(f"Σφάλμα κατά την εισαγωγή: {e}")
+            return
+        finally:
+            while not updates.empty():
+                done, count, failed = updates.get_nowait()
+                bar.progress(done, text=f"Εισήχθησαν {count} γραμμές · {failed} με λάθη")
+    elapsed = time.perf_counter() - started
+    bar.progress(1.0, text="Ολοκληρώθηκε")
+
+    dashboard_cache.invalidate(student_id)
+    st.success(
+        f"✅ Εισήχθησαν {inserted} γραμμές σε {elapsed:.2f} δευτ. "
+        f"({inserted / elapsed if elapsed else 0:.0f} γραμμές/δευτ.)"
+    )
+    if errors:
+        st.warning(f"⚠️ {len(errors)} γραμμές δεν εισήχθησαν")
+        st.dataframe(
+            [{"Γραμμή": line, "Σφάλμα": message} for line, message in errors[:1000]]
+        )
+
+def show_product_search(db):
+    """Σάρωση barcode ή αναζήτηση με λέξεις. Ο σαρωτής γράφει τον κωδικό και πατά Enter."""
+    term = st.text_input(
+        "📷 Barcode ή λέξεις (όνομα, περιγραφή, κατηγορία)", key="product_scan"
+    ).strip()
+    if not term:
+        st.caption("Σάρωσε ένα barcode ή γράψε την αρχή λέξεων, π.χ. «καφ ελλ»")
+        return
+    
+    product = find_by_barcode(db, term)
+    if product:
+        st.success(f"**{product[1]}** · Barcode: {product[2]} · Απόθεμα: {product[3]}")
+        balances = db.execute("""
+            SELECT l.location_code, sb.quantity
+            FROM stock_balances sb JOIN locations l ON l.id = sb.location_id
+            WHERE sb.product_id = ? AND sb.quantity <> 0
+            ORDER BY l.location_code
+        """, (product[0],)).fetchall()
+        if balances:
+            st.dataframe([{"Θέση": code, "Υπόλοιπο": qty} for code, qty in balances])
+        return
+    
+    matches = search_products(db, term, limit=50)
+    if matches:
+        st.dataframe([
+            {"id": pid, "Προϊόν": name, "Barcode": barcode, "Απόθεμα": qty}
+            for pid, name, barcode, qty in matches
+        ])
+    else:
+        st.info("Δεν βρέθηκαν προϊόντα")
+
+def manage_products(db, student_id):
     st.header("📋 Διαχείριση Προϊόντων")
     
-    tab1, tab2 = st.tabs(["➕ Προσθήκη Προϊόντος", "📋 Λίστα Προϊόντων"])
+    tab1, tab2, tab3, tab4 = st.tabs(
+        ["➕ Προσθήκη Προϊόντος", "📋 Λίστα Προϊόντων", "🔎 Αναζήτηση / Σάρωση", "📥 Μαζική Εισαγωγή"]
+    )
     
     with tab1:
         with st.form("add_product"):
@@ -275,38 +4005,51 @@ def manage_products(db):
             
             if st.form_submit_button("💾 Αποθήκευση Προϊόντος"):
                 if name:
-                    cursor = db.cursor()
-                    cursor.execute(
-                        "INSERT INTO products (name, description, category, barcode, quantity) VALUES (?, ?, ?, ?, ?)",
-                        (name, description, category, barcode, quantity)
-                    )
-                    db.commit()
-                    st.success("✅ Προϊόν προστέθηκε επιτυχώς!")
+                    try:
+                        run_write(
+                            student_id, add_product,
+                            name, description, category, barcode.strip() or None, quantity
+                        )
+                        dashboard_cache.invalidate(student_id)
+                        st.success("✅ Προϊόν προστέθηκε επιτυχώς!")
+                    except sqlite3.IntegrityError:
+                        st.error("❌ Το barcode υπάρχει ήδη σε άλλο προϊόν")
                 else:
                     st.error("❌ Το όνομα προϊόντος είναι υποχρεωτικό")
     
     with tab2:
-        products = pd.read_sql("SELECT * FROM products ORDER BY name", db)
-        if not products.empty:
-            st.dataframe(products)
+        show_migration_notes(db, "products")
+        if has_rows(db, "products"):
+            paginated_list(
+                db, "products_list", "products",
+                ["name", "category", "barcode", "quantity", "description", "created_date"],
+                {"Όνομα": "name", "Ημ/νία Καταχώρησης": "created_date"},
+                ["name", "category", "barcode", "description"]
+            )
             
             # Διαγραφή προϊόντος
             st.subheader("Διαγραφή Προϊόντος")
-            product_names = products['name'].tolist()
-            delete_product = st.selectbox("Επιλογή προϊόντος για διαγραφή", product_names)
-            if st.button("🗑️ Διαγραφή"):
-                cursor = db.cursor()
-                cursor.execute("DELETE FROM products WHERE name = ?", (delete_product,))
-                db.commit()
+            delete_product = typeahead_select(
+                db, "Επιλογή προϊόντος για διαγραφή", "products", "name", "delete_product"
+            )
+            if delete_product and st.button("🗑️ Διαγραφή"):
+                execute_write(student_id, "DELETE FROM products WHERE name = ?", (delete_product,))
+                dashboard_cache.invalidate(student_id)
                 st.success("✅ Προϊόν διαγράφηκε!")
                 st.rerun()
         else:
             st.info("Δεν υπάρχουν προϊόντα ακόμη")
+    
+    with tab3:
+        show_product_search(db)
+    
+    with tab4:
+        show_bulk_import(db, student_id, "products")
 
-def manage_locations(db):
+def manage_locations(db, student_id):
     st.header("📍 Διαχείριση Θέσεων Αποθήκης")
     
-    tab1, tab2 = st.tabs(["➕ Προσθήκη Θέσης", "📋 Λίστα Θέσεων"])
+    tab1, tab2, tab3 = st.tabs(["➕ Προσθήκη Θέσης", "📋 Λίστα Θέσεων", "📥 Μαζική Εισαγωγή"])
     
     with tab1:
         with st.form("add_location"):
@@ -320,12 +4063,12 @@ def manage_locations(db):
             if st.form_submit_button("💾 Αποθήκευση Θέσης"):
                 if location_code:
                     try:
-                        cursor = db.cursor()
-                        cursor.execute(
+                        execute_write(
+                            student_id,
                             "INSERT INTO locations (location_code, zone, description) VALUES (?, ?, ?)",
                             (location_code, zone, description)
                         )
-                        db.commit()
+                        dashboard_cache.invalidate(student_id)
                         st.success("✅ Θέση προστέθηκε επιτυχώς!")
                     except sqlite3.IntegrityError:
                         st.error("❌ Ο κωδικός θέσης υπάρχει ήδη")
@@ -333,23 +4076,127 @@ def manage_locations(db):
                     st.error("❌ Ο κωδικός θέσης είναι υποχρεωτικός")
     
     with tab2:
-        locations = pd.read_sql("SELECT * FROM locations ORDER BY location_code", db)
-        if not locations.empty:
-            st.dataframe(locations)
+        if has_rows(db, "locations"):
+            paginated_list(
+                db, "locations_list", "locations",
+                ["location_code", "zone", "description"],
+                {"Κωδικός Θέσης": "location_code"},
+                ["location_code", "zone", "description"]
+            )
         else:
             st.info("Δεν υπάρχουν θέσεις ακόμη")
+    
+    with tab3:
+        show_bulk_import(db, student_id, "locations")
+
+def product_picker(db, key, label="Προϊόν"):
+    """Επιλογή προϊόντος με αναζήτηση· επιστρέφει (id, name, barcode, quantity) ή None."""
+    term = st.text_input(f"🔎 {label} (όνομα ή barcode)", key=f"{key}_q").strip()
+    matches = search_products(db, term)
+    return st.selectbox(
+        label, matches, format_func=lambda row: f"{row[1]} (σύνολο: {row[3]})", key=f"{key}_sel"
+    )
+
+def location_picker(db, key, label="Θέση"):
+    """Επιλογή θέσης με αναζήτηση κωδικού· επιστρέφει το id ή None."""
+    code = typeahead_select(db, label, "locations", "location_code", key)
+    if code is None:
+        return None
+    return db.execute("SELECT id FROM locations WHERE location_code = ?", (code,)).fetchone()[0]
+
+def supplier_picker(db, key, label="Προμηθευτής"):
+    """Επιλογή προμηθευτή με αναζήτηση ονόματος· επιστρέφει το id ή None."""
+    name = typeahead_select(db, label, "suppliers", "name", key)
+    if name is None:
+        return None
+    return db.execute("SELECT id FROM suppliers WHERE name = ? ORDER BY id LIMIT 1", (name,)).fetchone()[0]
 
-def manage_transactions(db):
+def manage_transactions(db, student_id):
     st.header("🔄 Διαχείριση Συναλλαγών")
-    st.info("🚧 Αυτή η ενότητα θα προστεθεί σύντομα...")
     
-    # Εδώ θα προστεθεί κώδικας για συναλλαγές
-    st.write("Εισαγωγές, Εξαγωγές, Μεταφορές")
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+        "📥 Παραλαβή", "📤 Εξαγωγή", "🔁 Μεταφορά", "📜 Ημερολόγιο", "📦 Υπόλοιπα ανά Θέση"
+    ])
+    
+    for tab, kind in ((tab1, 'RECEIPT'), (tab2, 'ISSUE'), (tab3, 'TRANSFER')):
+        with tab:
+            product = product_picker(db, f"mv_{kind}_product")
+            if kind == 'TRANSFER':
+                from_loc = location_picker(db, f"mv_{kind}_from", "Από θέση")
+                to_loc = location_picker(db, f"mv_{kind}_to", "Προς θέση")
+            else:
+                from_loc = to_loc = location_picker(db, f"mv_{kind}_loc")
+            qty = st.number_input("Ποσότητα", min_value=1, value=1, key=f"mv_{kind}_qty")
+            notes = st.text_input("Σημειώσεις", key=f"mv_{kind}_notes")
+            
+            if st.button("💾 Καταχώρηση", key=f"mv_{kind}_save"):
+                if product is None or from_loc is None or to_loc is None:
+                    st.error("❌ Επέλεξε προϊόν και θέση")
+                elif kind == 'TRANSFER' and from_loc == to_loc:
+                    st.error("❌ Η θέση προέλευσης και προορισμού είναι ίδια")
+                else:
+                    if kind == 'RECEIPT':
+                        movements = receipt(product[0], to_loc, qty, notes)
+                    elif kind == 'ISSUE':
+                        movements = issue(product[0], from_loc, qty, notes)
+                    else:
+                        movements = transfer(product[0], from_loc, to_loc, qty, notes)
+                    try:
+                        run_write(student_id, post_movements, movements)
+                        dashboard_cache.invalidate(student_id)
+                        st.success("✅ Η κίνηση καταχωρήθηκε!")
+                    except InsufficientStockError as e:
+                        st.error(f"❌ Ανεπαρκές απόθεμα στη θέση: {e}")
+                    except ValueError as e:
+                        st.error(f"❌ {e}")
+    
+    with tab4:
+        if has_rows(db, "transactions"):
+            paginated_list(
+                db, "ledger_list", "transactions",
+                ["type", "product_id", "location_id", "quantity", "notes", "transaction_date"],
+                {"Ημερομηνία": "transaction_date", "Α/Α": "id"},
+                ["type", "notes"],
+                descending=True
+            )
+        else:
+            st.info("Δεν υπάρχουν κινήσεις ακόμη")
+    
+    with tab5:
+        location_id = location_picker(db, "balances_loc")
+        if location_id is not None:
+            balances = db.execute(
+                """
+                SELECT p.name, p.barcode, sb.quantity
+                FROM stock_balances sb
+                JOIN products p ON p.id = sb.product_id
+                WHERE sb.location_id = ? AND sb.quantity <> 0
+                ORDER BY p.name
+                LIMIT 500
+                """,
+                (location_id,)
+            ).fetchall()
+            if balances:
+                st.dataframe([
+                    {"Προϊόν": name, "Barcode": barcode, "Υπόλοιπο": qty}
+                    for name, barcode, qty in balances
+                ])
+            else:
+                st.info("Η θέση είναι άδεια")
+        
+        st.markdown("---")
+        if st.button("🧮 Επανυπολογισμός υπολοίπων από το ημερολόγιο"):
+            drift, quantity_drift = run_write(student_id, rebuild_stock_balances)
+            dashboard_cache.invalidate(student_id)
+            st.success(
+                f"✅ Τα υπόλοιπα ξαναχτίστηκαν ({drift} διαφορές θέσεων και "
+                f"{quantity_drift} διαφορές συνολικού αποθέματος διορθώθηκαν)"
+            )
 
-def manage_suppliers(db):
+def manage_suppliers(db, student_id):
     st.header("🏭 Διαχείριση Προμηθευτών")
     
-    tab1, tab2 = st.tabs(["➕ Προσθήκη Προμηθευτή", "📋 Λίστα Προμηθευτών"])
+    tab1, tab2, tab3 = st.tabs(["➕ Προσθήκη Προμηθευτή", "📋 Λίστα Προμηθευτών", "📥 Μαζική Εισαγωγή"])
     
     # --- Προσθήκη προμηθευτή ---
     with tab1:
@@ -369,134 +4216,203 @@ def manage_suppliers(db):
             
             if submitted:
                 if name:
-                    cursor = db.cursor()
-                    cursor.execute(
+                    execute_write(
+                        student_id,
                         "INSERT INTO suppliers (name, afm, address, phone, email) VALUES (?, ?, ?, ?, ?)",
                         (name, afm, address, phone, email)
                     )
-                    db.commit()
+                    dashboard_cache.invalidate(student_id)
                     st.success("✅ Ο προμηθευτής αποθηκεύτηκε επιτυχώς!")
                 else:
                     st.error("❌ Η επωνυμία προμηθευτή είναι υποχρεωτική")
     
     # --- Λίστα προμηθευτών ---
     with tab2:
-        suppliers = pd.read_sql("SELECT * FROM suppliers ORDER BY name", db)
-        
-        if suppliers.empty:
+        if not has_rows(db, "suppliers"):
             st.info("Δεν υπάρχουν προμηθευτές ακόμη.")
         else:
-            st.dataframe(suppliers)
+            paginated_list(
+                db, "suppliers_list", "suppliers",
+                ["name", "afm", "address", "phone", "email", "created_date"],
+                {"Επωνυμία": "name", "Ημ/νία Καταχώρησης": "created_date"},
+                ["name", "afm", "phone", "email"]
+            )
             
             st.subheader("🗑️ Διαγραφή Προμηθευτή")
-            supplier_names = suppliers['name'].tolist()
-            selected_supplier = st.selectbox("Επίλεξε προμηθευτή για διαγραφή", supplier_names)
+            selected_supplier = typeahead_select(
+                db, "Επίλεξε προμηθευτή για διαγραφή", "suppliers", "name", "delete_supplier"
+            )
             
-            if st.button("🗑️ Διαγραφή Προμηθευτή"):
-                cursor = db.cursor()
-                cursor.execute("DELETE FROM suppliers WHERE name = ?", (selected_supplier,))
-                db.commit()
+            if selected_supplier and st.button("🗑️ Διαγραφή Προμηθευτή"):
+                execute_write(student_id, "DELETE FROM suppliers WHERE name = ?", (selected_supplier,))
+                dashboard_cache.invalidate(student_id)
                 st.success("✅ Ο προμηθευτής διαγράφηκε!")
                 st.rerun()
+    
+    # --- Μαζική εισαγωγή ---
+    with tab3:
+        show_bulk_import(db, student_id, "suppliers")
+
+def invoice_formats():
+    return [fmt for fmt in INVOICE_FORMATS if fmt != 'pdf' or pdf_available()]
+
+def invoice_picker(db, key):
+    """Επιλογή παραστατικού από το πρόθεμα του αριθμού· επιστρέφει το id ή None."""
+    prefix = st.text_input("🔎 Αριθμός παραστατικού", key=f"{key}_q").strip()
+    if prefix:
+        rows = db.execute(
+            "SELECT id, doc_number, doc_date, customer_name FROM invoices "
+            "WHERE doc_number >= ? AND doc_number < ? ORDER BY doc_number, id DESC LIMIT 20",
+            (prefix, prefix + '\uffff')
+        ).fetchall()
+    else:
+        rows = db.execute(
+            "SELECT id, doc_number, doc_date, customer_name FROM invoices ORDER BY id DESC LIMIT 20"
+        ).fetchall()
+    row = st.selectbox(
+        "Επίλεξε παραστατικό", rows,
+        format_func=lambda r: f"{r[1]} · {r[2]} · {r[3]}", key=f"{key}_sel"
+    )
+    return row[0] if row else None
+
+def show_invoice_batch(student_id):
+    """Όλα τα παραστατικά ενός διαστήματος σε ένα zip."""
+    path = st.session_state.wms.student_db_path(student_id)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        date_from = st.date_input("Από", value=date.today().replace(day=1), key="batch_from")
+    with col2:
+        date_to = st.date_input("Έως", value=date.today(), key="batch_to")
+    with col3:
+        fmt = st.radio(
+            "Μορφή", invoice_formats(), format_func=lambda f: INVOICE_FORMATS[f][0], key="batch_fmt"
+        )
+    
+    if st.button("🖨️ Δημιουργία"):
+        # Στη μνήμη: το download_button κρατά ούτως ή άλλως ολόκληρο το αρχείο,
+        # και δεν μένει τίποτα στον δίσκο να σβηστεί
+        out = io.BytesIO()
+        with st.spinner("Απόδοση παραστατικών..."):
+            count, seconds = invoice_renderer.render_range(path, date_from, date_to, out, fmt, db_key=student_id)
+        st.session_state.invoice_batch = {
+            'data': out.getvalue(), 'count': count, 'seconds': seconds,
+            'file_name': f"{student_id}_{date_from}_{date_to}.zip",
+        }
+    
+    batch = st.session_state.get('invoice_batch')
+    if batch:
+        rate = batch['count'] / batch['seconds'] if batch['seconds'] else 0
+        st.caption(f"{batch['count']} παραστατικά σε {batch['seconds']:.2f} δευτ. ({rate:.0f} έγγραφα/δευτ.)")
+        if batch['count']:
+            st.download_button(
+                "⬇️ Λήψη zip",
+                data=batch['data'],
+                file_name=batch['file_name'],
+                mime="application/zip",
+                on_click="ignore",
+            )
+        else:
+            st.info("Δεν υπάρχουν παραστατικά στο διάστημα")
 
-def manage_invoices(db):
+def manage_invoices(db, student_id):
     st.header("📄 Τιμολόγια - Δελτία Αποστολής")
     
-    tab1, tab2 = st.tabs(["➕ Δημιουργία Παραστατικού", "📋 Λίστα Παραστατικών"])
+    tab1, tab2, tab3 = st.tabs(["➕ Δημιουργία Παραστατικού", "📋 Λίστα Παραστατικών", "🖨️ Μαζική Εκτύπωση"])
     
     # --- Δημιουργία νέου παραστατικού ---
     with tab1:
-        with st.form("create_invoice"):
-            col1, col2 = st.columns(2)
+        col1, col2 = st.columns(2)
+        with col1:
+            doc_number = st.text_input("Αριθμός Παραστατικού*", key="inv_doc_number")
+            doc_date = st.date_input("Ημερομηνία", value=date.today(), key="inv_doc_date")
+        with col2:
+            doc_type = st.selectbox("Είδος Παραστατικού", ["Τιμολόγιο - Δελτίο Αποστολής"], key="inv_doc_type")
+        
+        st.subheader("Στοιχεία Πελάτη")
+        customer_name = st.text_input("Επωνυμία Πελάτη*", key="inv_customer_name")
+        afm = st.text_input("Α.Φ.Μ.", key="inv_afm")
+        address = st.text_input("Διεύθυνση", key="inv_address")
+        
+        st.markdown("---")
+        st.subheader("Γραμμές Παραστατικού (Προϊόντα)")
+        
+        # Στο session μένουν μόνο οι γραμμές που διάλεξε ο μαθητής: product_id -> γραμμή
+        lines = st.session_state.setdefault(f"invoice_lines_{student_id}", {})
+        
+        term = st.text_input("🔎 Αναζήτηση προϊόντος (όνομα ή barcode)", key="inv_search").strip()
+        matches = search_products(db, term, in_stock=True)
+        if not matches:
+            st.info("Δεν βρέθηκαν διαθέσιμα προϊόντα με απόθεμα. Πρόσθεσε προϊόντα ή αύξησε τα αποθέματα.")
+        else:
+            col1, col2, col3 = st.columns([3, 1, 1])
             with col1:
-                doc_number = st.text_input("Αριθμός Παραστατικού*")
-                doc_date = st.date_input("Ημερομηνία", value=date.today())
+                product = st.selectbox(
+                    "Προϊόν", matches,
+                    format_func=lambda row: f"{row[1]} (διαθέσιμα: {row[3]})",
+                    key="inv_product"
+                )
             with col2:
-                doc_type = st.selectbox("Είδος Παραστατικού", ["Τιμολόγιο - Δελτίο Αποστολής"])
-            
-            st.subheader("Στοιχεία Πελάτη")
-            customer_name = st.text_input("Επωνυμία Πελάτη*")
-            afm = st.text_input("Α.Φ.Μ.")
-            address = st.text_input("Διεύθυνση")
-            
-            st.markdown("---")
-            st.subheader("Γραμμές Παραστατικού (Προϊόντα)")
-            
-            products = pd.read_sql("SELECT id, name, quantity FROM products WHERE quantity > 0", db)
-            qty_inputs = {}
-
-            if products.empty:
-                st.info("Δεν υπάρχουν διαθέσιμα προϊόντα με απόθεμα. Πρόσθεσε προϊόντα ή αύξησε τα αποθέματα.")
+                qty = st.number_input(
+                    "Ποσότητα", min_value=1, max_value=int(product[3]), value=1,
+                    key=f"inv_qty_{product[0]}"
+                )
+            with col3:
+                st.write("")
+                if st.button("➕ Προσθήκη γραμμής"):
+                    lines[product[0]] = {'name': product[1], 'quantity': int(qty), 'available': int(product[3])}
+        
+        for pid, line in list(lines.items()):
+            col1, col2, col3 = st.columns([3, 1, 1])
+            col1.write(f"**{line['name']}** (διαθέσιμα: {line['available']})")
+            col2.write(f"Ποσότητα: {line['quantity']}")
+            if col3.button("❌ Αφαίρεση", key=f"inv_remove_{pid}"):
+                del lines[pid]
+                st.rerun()
+        
+        if st.button("💾 Αποθήκευση Παραστατικού"):
+            if not doc_number or not customer_name:
+                st.error("❌ Συμπλήρωσε τουλάχιστον **αριθμό παραστατικού** και **επωνυμία πελάτη**.")
+            elif not lines:
+                st.error("❌ Επέλεξε τουλάχιστον **ένα προϊόν** με ποσότητα > 0.")
             else:
-                for _, row in products.iterrows():
-                    max_qty = int(row['quantity']) if row['quantity'] is not None else 0
-                    qty = st.number_input(
-                        f"{row['name']} (διαθέσιμα: {max_qty})",
-                        min_value=0,
-                        max_value=max_qty,
-                        value=0,
-                        key=f"inv_qty_{row['id']}"
-                    )
-                    if qty > 0:
-                        qty_inputs[row['id']] = qty
-            
-            submitted = st.form_submit_button("💾 Αποθήκευση Παραστατικού")
-            
-            if submitted:
-                if not doc_number or not customer_name:
-                    st.error("❌ Συμπλήρωσε τουλάχιστον **αριθμό παραστατικού** και **επωνυμία πελάτη**.")
-                elif not qty_inputs:
-                    st.error("❌ Επέλεξε τουλάχιστον **ένα προϊόν** με ποσότητα > 0.")
-                else:
-                    try:
-                        cursor = db.cursor()
-                        # Εισαγωγή header παραστατικού
-                        cursor.execute(
-                            """
-                            INSERT INTO invoices (doc_number, doc_type, doc_date, customer_name, afm, address)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                            """,
-                            (doc_number, doc_type, doc_date.isoformat(), customer_name, afm, address)
-                        )
-                        invoice_id = cursor.lastrowid
-                        
-                        # Εισαγωγή γραμμών & ενημέρωση αποθήκης
-                        for pid, q in qty_inputs.items():
-                            cursor.execute(
-                                "INSERT INTO invoice_lines (invoice_id, product_id, quantity) VALUES (?, ?, ?)",
-                                (invoice_id, pid, q)
-                            )
-                            cursor.execute(
-                                "UPDATE products SET quantity = quantity - ? WHERE id = ?",
-                                (q, pid)
-                            )
-                        
-                        db.commit()
-                        st.success("✅ Το παραστατικό αποθηκεύτηκε επιτυχώς και τα αποθέματα ενημερώθηκαν!")
-                    except Exception as e:
-                        db.rollback()
-                        st.error(f"Σφάλμα κατά την αποθήκευση παραστατικού: {e}")
+                header = {
+                    'doc_number': doc_number,
+                    'doc_type': doc_type,
+                    'doc_date': doc_date.isoformat(),
+                    'customer_name': customer_name,
+                    'afm': afm,
+                    'address': address,
+                }
+                try:
+                    run_write(student_id, save_invoice, header, {pid: line['quantity'] for pid, line in lines.items()})
+                    lines.clear()
+                    dashboard_cache.invalidate(student_id)
+                    st.success("✅ Το παραστατικό αποθηκεύτηκε επιτυχώς και τα αποθέματα ενημερώθηκαν!")
+                except InsufficientStockError as e:
+                    st.error(f"❌ Ανεπαρκές απόθεμα: {e}")
+                except Exception as e:
+                    st.error(f"Σφάλμα κατά την αποθήκευση παραστατικού: {e}")
     
     # --- Λίστα παραστατικών ---
     with tab2:
-        invoices = pd.read_sql(
-            "SELECT id, doc_number, doc_type, doc_date, customer_name FROM invoices ORDER BY doc_date DESC, id DESC",
-            db
-        )
-        
-        if invoices.empty:
+        if not has_rows(db, "invoices"):
             st.info("Δεν υπάρχουν παραστατικά ακόμη.")
         else:
             st.subheader("Όλα τα Παραστατικά")
-            st.dataframe(invoices)
+            paginated_list(
+                db, "invoices_list", "invoices",
+                ["doc_number", "doc_type", "doc_date", "customer_name"],
+                {"Ημερομηνία": "doc_date", "Αριθμός": "doc_number"},
+                ["doc_number", "customer_name", "afm"],
+                descending=True
+            )
             
             st.markdown("---")
             st.subheader("Προβολή Αναλυτικού Παραστατικού")
-            doc_numbers = invoices['doc_number'].tolist()
-            selected_doc = st.selectbox("Επίλεξε παραστατικό", doc_numbers)
+            invoice_id = invoice_picker(db, "view_invoice")
             
-            if selected_doc:
-                inv_row = invoices[invoices['doc_number'] == selected_doc].iloc[0]
+            if invoice_id:
+                inv_row = fetch_invoice(db, invoice_id)
                 
                 st.write(f"**Αρ. Παραστατικού:** {inv_row['doc_number']}")
                 st.write(f"**Είδος:** {inv_row['doc_type']}")
@@ -504,42 +4420,175 @@ def manage_invoices(db):
                 st.write(f"**Πελάτης:** {inv_row['customer_name']}")
                 
                 # Γραμμές παραστατικού
-                lines = pd.read_sql(
-                    """
-                    SELECT p.name AS Προϊόν, il.quantity AS Ποσότητα
-                    FROM invoice_lines il
-                    JOIN products p ON p.id = il.product_id
-                    WHERE il.invoice_id = ?
-                    """,
-                    db,
-                    params=(int(inv_row['id']),)
-                )
-                
-                if not lines.empty:
-                    st.table(lines)
+                if inv_row['lines']:
+                    st.table([
+                        {"Προϊόν": name, "Ποσότητα": qty} for name, _, qty in inv_row['lines']
+                    ])
                 else:
                     st.info("Δεν βρέθηκαν γραμμές για το συγκεκριμένο παραστατικό.")
-
-def show_inventory(db):
-    st.header("📊 Κατάσταση Αποθήκης")
+                
+                cols = st.columns(len(invoice_formats()))
+                for col, fmt in zip(cols, invoice_formats()):
+                    label, suffix, mime, _ = INVOICE_FORMATS[fmt]
+                    with col:
+                        st.download_button(
+                            f"🖨️ {label}",
+                            invoice_renderer.render(student_id, inv_row, fmt),
+                            file_name=f"{inv_row['doc_number']}{suffix}",
+                            mime=mime,
+                            key=f"print_{fmt}",
+                            on_click="ignore",
+                        )
     
-    # Σύνολο αποθέματος
+    # --- Μαζική εκτύπωση ---
+    with tab3:
+        show_invoice_batch(student_id)
+
+def load_inventory(db):
+    """Προϊόντα με απόθεμα και το σύνολο ανά κατηγορία."""
+    import pandas as pd
     inventory = pd.read_sql("""
         SELECT p.name, p.category, p.quantity, p.description 
         FROM products p 
         WHERE p.quantity > 0
         ORDER BY p.quantity DESC
     """, db)
+    return inventory, inventory.groupby('category')['quantity'].sum()
+
+def show_export(path, student_id):
+    st.header("📤 Εξαγωγή Δεδομένων")
+    st.caption("Το αρχείο ετοιμάζεται τη στιγμή του κατεβάσματος, κομμάτι-κομμάτι από τη βάση.")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        name = st.selectbox("Πίνακας", list(EXPORTS), format_func=lambda n: EXPORTS[n][0])
+    with col2:
+        fmt = st.radio("Μορφή", list(EXPORT_FORMATS), format_func=lambda f: EXPORT_FORMATS[f][0], horizontal=True)
+    
+    _, suffix, mime, _ = EXPORT_FORMATS[fmt]
+    st.download_button(
+        "⬇️ Λήψη",
+        data=lambda: export_student_file(path, name, fmt),
+        file_name=f"{student_id}_{name}{suffix}",
+        mime=mime,
+        on_click="ignore",
+    )
+
+def manage_reorder(db, student_id):
+    st.header("🛒 Αναπαραγγελία")
+    
+    tab1, tab2, tab3 = st.tabs(["🛒 Προτάσεις", "⚠️ Χαμηλό Απόθεμα", "⚙️ Ρυθμίσεις"])
+    
+    with tab1:
+        plan = reorder_planner.plan(db)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Προϊόντα για παραγγελία", plan['due'])
+        col2.metric("Τεμάχια", plan['units'])
+        col3.metric("Προϊόντα που εξετάστηκαν", plan['products'])
+        st.caption(
+            f"Ζήτηση από τα παραστατικά των τελευταίων {reorder_planner.window_days} ημερών · "
+            f"κάλυψη {reorder_planner.cover_days} ημερών μετά την παραλαβή · {plan['seconds'] * 1000:.0f} ms"
+        )
+        if plan['rows']:
+            st.dataframe([
+                {
+                    "Προϊόν": r['name'], "Απόθεμα": r['quantity'], "Σημείο": r['reorder_point'],
+                    "Ζήτηση/ημέρα": r['daily_demand'], "Ημέρες που φτάνει": r['days_left'],
+                    "Παράδοση (ημ.)": r['lead_time_days'], "Προμηθευτής": r['supplier'],
+                    "Παραγγελία": r['order_qty'],
+                }
+                for r in plan['rows']
+            ])
+        else:
+            st.info("Δεν χρειάζεται παραγγελία αυτή τη στιγμή")
+    
+    with tab2:
+        count = db.execute("SELECT COUNT(*) FROM low_stock").fetchone()[0]
+        if not count:
+            st.info("Κανένα προϊόν δεν έφτασε το σημείο αναπαραγγελίας")
+        else:
+            st.caption(f"{count} προϊόντα στο ή κάτω από το σημείο αναπαραγγελίας (τα 500 παλαιότερα)")
+            rows = db.execute("""
+                SELECT p.name, p.barcode, p.quantity, p.reorder_point, ls.since
+                FROM low_stock ls JOIN products p ON p.id = ls.product_id
+                ORDER BY ls.since, ls.product_id LIMIT 500
+            """).fetchall()
+            st.dataframe([
+                {"Προϊόν": name, "Barcode": barcode, "Απόθεμα": qty, "Σημείο": point, "Από": since}
+                for name, barcode, qty, point, since in rows
+            ])
+    
+    with tab3:
+        product = product_picker(db, "reorder_product")
+        if product is None:
+            st.info("Διάλεξε προϊόν")
+            return
+        product_id = product[0]
+        current = db.execute("SELECT reorder_point FROM products WHERE id = ?", (product_id,)).fetchone()[0]
+        
+        st.subheader("Σημείο Αναπαραγγελίας")
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            point = st.number_input(
+                "Παραγγελία όταν το απόθεμα πέσει στο", min_value=0, value=current or 0, key="reorder_point"
+            )
+        with col2:
+            if st.button("💾 Αποθήκευση", key="save_reorder_point"):
+                execute_write(student_id, "UPDATE products SET reorder_point = ? WHERE id = ?", (point, product_id))
+                dashboard_cache.invalidate(student_id)
+                st.success("✅ Αποθηκεύτηκε")
+        with col3:
+            if current is not None and st.button("✖️ Χωρίς σημείο", key="clear_reorder_point"):
+                execute_write(student_id, "UPDATE products SET reorder_point = NULL WHERE id = ?", (product_id,))
+                dashboard_cache.invalidate(student_id)
+                st.rerun()
+        
+        st.subheader("Προμηθευτές Προϊόντος")
+        links = db.execute("""
+            SELECT s.name, ps.lead_time_days
+            FROM product_suppliers ps JOIN suppliers s ON s.id = ps.supplier_id
+            WHERE ps.product_id = ? ORDER BY ps.lead_time_days
+        """, (product_id,)).fetchall()
+        if links:
+            st.dataframe([{"Προμηθευτής": name, "Παράδοση (ημ.)": days} for name, days in links])
+        
+        supplier_id = supplier_picker(db, "reorder_supplier")
+        lead_time = st.number_input(
+            "Χρόνος παράδοσης (ημέρες)", min_value=0, value=DEFAULT_LEAD_TIME_DAYS, key="reorder_lead_time"
+        )
+        col1, col2 = st.columns(2)
+        with col1:
+            if supplier_id is not None and st.button("🔗 Σύνδεση / Ενημέρωση", key="link_supplier"):
+                execute_write(student_id, """
+                    INSERT INTO product_suppliers (product_id, supplier_id, lead_time_days) VALUES (?, ?, ?)
+                    ON CONFLICT (product_id, supplier_id) DO UPDATE SET lead_time_days = excluded.lead_time_days
+                """, (product_id, supplier_id, lead_time))
+                dashboard_cache.invalidate(student_id)
+                st.rerun()
+        with col2:
+            if supplier_id is not None and st.button("✂️ Αποσύνδεση", key="unlink_supplier"):
+                execute_write(
+                    student_id, "DELETE FROM product_suppliers WHERE product_id = ? AND supplier_id = ?",
+                    (product_id, supplier_id)
+                )
+                dashboard_cache.invalidate(student_id)
+                st.rerun()
+
+def show_inventory(db):
+    st.header("📊 Κατάσταση Αποθήκης")
+    
+    inventory, category_sum = load_inventory(db)
     
     if not inventory.empty:
         st.dataframe(inventory)
         
         # Γράφημα
         st.subheader("Απόθεμα ανά Κατηγορία")
-        category_sum = inventory.groupby('category')['quantity'].sum()
         st.bar_chart(category_sum)
     else:
         st.info("Η αποθήκη είναι άδεια")
 
 if __name__ == "__main__":
+    script_ready = time.perf_counter()
     main()
+    perf.record_startup(script_ready - SCRIPT_STARTED, time.perf_counter() - script_ready)
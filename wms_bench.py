@@ -0,0 +1,1126 @@
+"""Μετρήσεις απόδοσης για το WMS, εκτός Streamlit.
+
+    python wms_bench.py storage
+    python wms_bench.py dashboard
+    python wms_bench.py import
+    python wms_bench.py ledger
+    python wms_bench.py analytics
+    python wms_bench.py login
+    python wms_bench.py search --products 1000000
+    python wms_bench.py invoices --invoices 5000
+    python wms_bench.py writers --writers 50
+    python wms_bench.py startup --runs 5
+    python wms_bench.py reset --students 500
+    python wms_bench.py reorder --products 100000
+    python wms_bench.py multiprocess --workers 1 2 4
+    python wms_bench.py suite --save-baseline bench_baseline.json
+    python wms_bench.py suite --baseline bench_baseline.json --threshold 0.2
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from wms_app import (
+    COORDINATION_DB,
+    INSTRUMENT,
+    STORAGE_PROFILE,
+    ClassAnalytics,
+    DashboardSummaryCache,
+    DatabaseWriter,
+    FlatLayout,
+    InvoiceRenderer,
+    ReorderPlanner,
+    SessionStore,
+    StudentWMS,
+    add_product,
+    bulk_import,
+    connect_db,
+    dashboard_cache,
+    find_by_barcode,
+    get_notifier,
+    get_session_store,
+    get_wms,
+    keyset_page,
+    load_inventory,
+    post_movements,
+    read_import_chunks,
+    rebuild_stock_balances,
+    receipt,
+    record_opening_stock,
+    save_invoice,
+    search_products,
+    transfer,
+    unallocated_location,
+)
+
+# Το προφίλ πριν: rollback journal και πλήρες fsync σε κάθε commit
+LEGACY_PROFILE = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def summarize(latencies):
+    return {
+        'count': len(latencies),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def fresh_student_db(workdir, student_id='bench'):
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        wms = StudentWMS()
+        wms.create_student_database(student_id)
+        return os.path.join(workdir, wms.student_db_path(student_id))
+    finally:
+        os.chdir(cwd)
+
+
+def bench_storage_profile(workdir, profile, writes=500, readers=4, duration=2.0):
+    """Καθυστέρηση εγγραφής και ταυτόχρονες αναγνώσεις για ένα προφίλ."""
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        wms = StudentWMS(profile=profile)
+        wms.create_student_database('bench')
+        path = wms.student_db_path('bench')
+    finally:
+        os.chdir(cwd)
+    path = os.path.join(workdir, path)
+
+    # Μεμονωμένα INSERT + commit, όπως η φόρμα προϊόντος
+    conn = connect_db(path, profile)
+    latencies = []
+    for i in range(writes):
+        start = time.perf_counter()
+        conn.execute(
+            "INSERT INTO products (name, category, quantity) VALUES (?, ?, ?)",
+            (f"P{i}", "ΑΛΛΟ", i % 50)
+        )
+        conn.commit()
+        latencies.append(time.perf_counter() - start)
+
+    # Αναγνώστες τύπου dashboard ενώ ένας εγγραφέας κάνει commits
+    stop = threading.Event()
+    reads = [0] * readers
+    locked = [0] * (readers + 1)
+
+    def writer():
+        w = connect_db(path, profile)
+        w.execute("PRAGMA busy_timeout = 0")
+        i = 0
+        while not stop.is_set():
+            try:
+                w.execute("UPDATE products SET quantity = quantity + 1 WHERE id = ?", (i % writes + 1,))
+                w.commit()
+            except sqlite3.OperationalError:
+                locked[readers] += 1
+            i += 1
+        w.close()
+
+    def reader(n):
+        r = connect_db(path, profile)
+        r.execute("PRAGMA busy_timeout = 0")
+        while not stop.is_set():
+            try:
+                r.execute("SELECT COUNT(*), SUM(quantity) FROM products").fetchone()
+                reads[n] += 1
+            except sqlite3.OperationalError:
+                locked[n] += 1
+        r.close()
+
+    threads = [threading.Thread(target=writer)] + [
+        threading.Thread(target=reader, args=(n,)) for n in range(readers)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    conn.close()
+
+    return {
+        'write_latency': summarize(latencies),
+        'reads_per_sec': sum(reads) / duration,
+        'lock_errors': sum(locked),
+    }
+
+
+def cmd_storage(args):
+    results = {}
+    for label, profile in (('before', LEGACY_PROFILE), ('after', STORAGE_PROFILE)):
+        with tempfile.TemporaryDirectory() as workdir:
+            results[label] = bench_storage_profile(
+                workdir, profile, writes=args.writes, readers=args.readers,
+                duration=args.duration
+            )
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+def bench_dashboard(workdir, sizes, repeat=20):
+    """Χρόνος του πίνακα ελέγχου χωρίς cache και με cache ανά πλήθος προϊόντων."""
+    conn = connect_db(fresh_student_db(workdir))
+
+    results = []
+    loaded = 0
+    for size in sorted(sizes):
+        # Περίπου ένα στα πέντε προϊόντα στο ή κάτω από το σημείο αναπαραγγελίας, ώστε ο
+        # low_stock να μην είναι άδειος
+        conn.executemany(
+            "INSERT INTO products (name, category, quantity, reorder_point) VALUES (?, ?, ?, ?)",
+            ((f"P{i:07d}", "ΑΛΛΟ", i % 50, 10) for i in range(loaded, size))
+        )
+        conn.commit()
+        loaded = size
+
+        # Όπως στην εφαρμογή· ο notifier αφορά μόνο την ακύρωση σε άλλες διεργασίες
+        cache = DashboardSummaryCache()
+        cold, warm = [], []
+        for _ in range(repeat):
+            cache.invalidate('bench')
+            start = time.perf_counter()
+            cache.get('bench', conn)
+            cold.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            cache.get('bench', conn)
+            warm.append(time.perf_counter() - start)
+        results.append({'products': size, 'cold': summarize(cold), 'cached': summarize(warm)})
+    conn.close()
+    return results
+
+
+def cmd_dashboard(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        results = bench_dashboard(workdir, args.sizes, repeat=args.repeat)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+def bench_import(workdir, rows):
+    """Γραμμές/δευτ.: μία-μία με commit (όπως η φόρμα) έναντι bulk_import."""
+    data = [(f"P{i:07d}", f"Περιγραφή {i}", "ΑΛΛΟ", f"{i:013d}", i % 100) for i in range(rows)]
+
+    conn = connect_db(fresh_student_db(workdir, 'per_row'))
+    start = time.perf_counter()
+    for row in data:
+        add_product(conn, *row)
+    per_row = time.perf_counter() - start
+    conn.close()
+
+    buffer = io.StringIO()
+    buffer.write("name,description,category,barcode,quantity\n")
+    buffer.writelines(f"{n},{d},{c},{b},{q}\n" for n, d, c, b, q in data)
+    buffer.seek(0)
+    conn = connect_db(fresh_student_db(workdir, 'bulk'))
+    start = time.perf_counter()
+    inserted, errors = bulk_import(conn, 'products', read_import_chunks(buffer))
+    bulk = time.perf_counter() - start
+    conn.close()
+
+    return {
+        'rows': rows,
+        'per_row_rows_per_sec': rows / per_row,
+        'bulk_rows_per_sec': inserted / bulk,
+        'bulk_errors': len(errors),
+        'speedup': per_row / bulk,
+    }
+
+
+def cmd_import(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        results = bench_import(workdir, args.rows)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+def bench_ledger(workdir, movements, products=1000, locations=50, batch=1000):
+    """Ρυθμός καταχώρησης κινήσεων, ανάγνωση υπολοίπων και επανυπολογισμός."""
+    conn = connect_db(fresh_student_db(workdir))
+    conn.executemany(
+        "INSERT INTO products (name, quantity) VALUES (?, 0)",
+        ((f"P{i:07d}",) for i in range(products))
+    )
+    conn.executemany(
+        "INSERT INTO locations (location_code) VALUES (?)",
+        ((f"L-{i:04d}",) for i in range(locations))
+    )
+    conn.commit()
+
+    rng = random.Random(42)
+    posted = 0
+    start = time.perf_counter()
+    while posted < movements:
+        items = []
+        for _ in range(batch // 3):
+            pid = rng.randint(1, products)
+            src, dst = rng.sample(range(1, locations + 1), 2)
+            # Παραλαβή και μεταφορά μέρους της, ώστε να μην βγαίνει αρνητικό
+            items += receipt(pid, src, 10) + transfer(pid, src, dst, 3)
+        posted += post_movements(conn, items)
+    posting = time.perf_counter() - start
+
+    lookups = []
+    for _ in range(1000):
+        loc = rng.randint(1, locations)
+        start = time.perf_counter()
+        conn.execute(
+            "SELECT product_id, quantity FROM stock_balances WHERE location_id = ? LIMIT 500", (loc,)
+        ).fetchall()
+        lookups.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    drift, quantity_drift = rebuild_stock_balances(conn)
+    reconcile = time.perf_counter() - start
+    conn.close()
+
+    return {
+        'movements': posted,
+        'movements_per_sec': posted / posting,
+        'balance_lookup': summarize(lookups),
+        'reconcile_sec': reconcile,
+        'reconcile_drift': drift,
+        'quantity_drift': quantity_drift,
+    }
+
+
+def cmd_ledger(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        results = bench_ledger(workdir, args.movements, batch=args.batch)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+def bench_analytics(workdir, students, products=500, workers=8):
+    """Πέρασμα καθηγητή πάνω από όλες τις βάσεις: πρώτο (κρύο) και δεύτερο (cache)."""
+    template = fresh_student_db(workdir, 'template')
+    conn = connect_db(template)
+    conn.executemany(
+        "INSERT INTO products (name, quantity) VALUES (?, ?)",
+        ((f"P{i:07d}", i % 20) for i in range(products))
+    )
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        wms = StudentWMS()
+        master = wms.connect_master()
+        master.executemany(
+            "INSERT INTO students (student_id, full_name, class_name) VALUES (?, ?, ?)",
+            ((f"s{i:05d}", f"Μαθητής {i}", f"Τ{i % 20}") for i in range(students))
+        )
+        master.commit()
+        master.close()
+        for i in range(students):
+            path = wms.student_db_path(f"s{i:05d}")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(template, path)
+
+        analytics = ClassAnalytics(workers=workers)
+        start = time.perf_counter()
+        per_student = analytics.collect(wms)
+        analytics.by_class(per_student)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        analytics.by_class(analytics.collect(wms))
+        warm = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+
+    return {
+        'students': students,
+        'workers': workers,
+        'cold_sweep_sec': cold,
+        'cached_sweep_sec': warm,
+        'errors': int(per_student['error'].notna().sum()),
+    }
+
+
+def cmd_analytics(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        results = bench_analytics(workdir, args.students, workers=args.workers)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+def bench_login(workdir, sessions, legacy):
+    """Εγγραφή και σύνδεση από πολλά ταυτόχρονα sessions (ένα thread το καθένα).
+
+    legacy=True: CREATE TABLE σε κάθε εγγραφή και os.path.exists στη σύνδεση,
+    όπως πριν από τον κατάλογο μαθητών και το template.
+    """
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        wms = StudentWMS(layout=FlatLayout() if legacy else None)
+        wms.ensure_template()
+        barrier = threading.Barrier(sessions)
+
+        def session(n):
+            student_id = f"s{n:05d}"
+            barrier.wait()
+            start = time.perf_counter()
+            if legacy:
+                conn = wms.connect_master()
+                conn.execute(
+                    "INSERT INTO students (student_id, full_name, class_name) VALUES (?, ?, ?)",
+                    (student_id, "Μαθητής", "Α1")
+                )
+                conn.commit()
+                conn.close()
+                wms.build_student_database(wms.student_db_path(student_id))
+            else:
+                # Μαζί με τη δημιουργία της βάσης, που πλέον γίνεται στο πρώτο άνοιγμα
+                wms.register_student(student_id, "Μαθητής", "Α1")
+                wms.create_student_database(student_id)
+            registered = time.perf_counter() - start
+
+            start = time.perf_counter()
+            if legacy:
+                found = os.path.exists(wms.student_db_path(student_id))
+            else:
+                found = wms.student_exists(student_id)
+            logged_in = time.perf_counter() - start
+            return registered, logged_in, found
+
+        with ThreadPoolExecutor(max_workers=sessions) as pool:
+            results = list(pool.map(session, range(sessions)))
+    finally:
+        os.chdir(cwd)
+
+    return {
+        'register': summarize([r[0] for r in results]),
+        'login': summarize([r[1] for r in results]),
+        'not_found': sum(1 for r in results if not r[2]),
+    }
+
+
+def cmd_login(args):
+    results = {}
+    for label, legacy in (('before', True), ('after', False)):
+        with tempfile.TemporaryDirectory() as workdir:
+            results[label] = bench_login(workdir, args.sessions, legacy)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+def bench_search(workdir, products, lookups=1000, batch=50000):
+    """Αναζήτηση barcode και κειμένου σε μεγάλο κατάλογο, έναντι σάρωσης με LIKE."""
+    conn = connect_db(fresh_student_db(workdir))
+    rng = random.Random(42)
+    words = ["Καφές", "Τσάι", "Ζάχαρη", "Γάλα", "Σοκολάτα", "Μπισκότα", "Χαρτί", "Σαπούνι", "Ελαιόλαδο", "Μέλι"]
+    adjectives = ["Ελληνικός", "Φίλτρου", "Βιολογικό", "Light", "Οικογενειακό", "Premium", "Κλασικό"]
+
+    # Η εισαγωγή περνά από τα triggers του FTS, όπως στην εφαρμογή
+    start = time.perf_counter()
+    for offset in range(0, products, batch):
+        conn.executemany(
+            "INSERT INTO products (name, description, category, barcode, quantity) VALUES (?, ?, ?, ?, ?)",
+            (
+                (f"{rng.choice(words)} {rng.choice(adjectives)} {i}", f"Συσκευασία {i % 12 + 1}",
+                 rng.choice(CATEGORIES), f"520{i:010d}", rng.randint(0, 100))
+                for i in range(offset, min(products, offset + batch))
+            )
+        )
+        conn.commit()
+    load = time.perf_counter() - start
+
+    barcodes = [f"520{rng.randrange(products):010d}" for _ in range(lookups)]
+    terms = [f"{rng.choice(words)[:3].lower()} {rng.choice(adjectives)[:3]}" for _ in range(lookups)]
+
+    barcode, text, like = [], [], []
+    for code in barcodes:
+        t = time.perf_counter()
+        find_by_barcode(conn, code)
+        barcode.append(time.perf_counter() - t)
+    for term in terms:
+        t = time.perf_counter()
+        search_products(conn, term)
+        text.append(time.perf_counter() - t)
+    # Η παλιά λύση: φίλτρο LIKE σε όλο τον πίνακα (λίγες επαναλήψεις, είναι αργή)
+    for term in terms[:20]:
+        t = time.perf_counter()
+        conn.execute(
+            "SELECT id, name, barcode, quantity FROM products WHERE name LIKE ? LIMIT 20",
+            (f"%{term.split()[0]}%{term.split()[1]}%",)
+        ).fetchall()
+        like.append(time.perf_counter() - t)
+    conn.close()
+
+    return {
+        'products': products,
+        'load_rows_per_sec': products / load,
+        'barcode_lookup': summarize(barcode),
+        'fts_search': summarize(text),
+        'like_scan': summarize(like),
+    }
+
+
+def cmd_search(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        results = bench_search(workdir, args.products, lookups=args.lookups)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+def bench_invoices(workdir, invoices, lines=5, workers=4, fmt='html'):
+    """Έγγραφα/δευτ. για μαζική απόδοση: πρώτη φορά και ξανά από την cache."""
+    path = fresh_student_db(workdir)
+    conn = connect_db(path)
+    generate_student_db(conn, random.Random(42), products=2000, locations=0, suppliers=0,
+                        invoices=invoices, lines=lines)
+    conn.close()
+
+    renderer = InvoiceRenderer(max_entries=invoices, workers=workers)
+    results = {'invoices': invoices, 'lines': lines, 'workers': workers, 'format': fmt}
+    for label in ('cold', 'cached'):
+        with tempfile.TemporaryFile() as out:
+            count, seconds = renderer.render_range(path, '2026-01-01', '2026-12-31', out, fmt)
+            size = out.tell()
+        results[label] = {'documents': count, 'docs_per_sec': count / seconds, 'zip_bytes': size}
+    results['cache'] = renderer.stats()
+    return results
+
+
+def cmd_invoices(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        results = bench_invoices(workdir, args.invoices, workers=args.workers, fmt=args.format)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+def bench_writers(workdir, writers, writes, mode):
+    """writers ταυτόχρονοι εγγραφείς σε μία βάση μαθητή, writes εγγραφές ο καθένας.
+
+    mode='legacy': κάθε εγγραφέας με δική του σύνδεση, INSERT και commit, όπως
+    οι φόρμες αρχικά (rollback journal, χωρίς busy_timeout). mode='wal': το
+    ίδιο με το τρέχον προφίλ (WAL, busy_timeout). mode='writer': όλες οι
+    εγγραφές περνούν από έναν DatabaseWriter.
+    """
+    legacy = mode != 'writer'
+    path = fresh_student_db(workdir)
+    sql = "INSERT INTO suppliers (name, afm) VALUES (?, ?)"
+    barrier = threading.Barrier(writers)
+    errors = [0] * writers
+    latencies = [[] for _ in range(writers)]
+    writer = None if legacy else DatabaseWriter(path)
+
+    def client(n):
+        conn = None
+        if mode == 'legacy':
+            conn = connect_db(path, LEGACY_PROFILE, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout = 0")
+        elif mode == 'wal':
+            conn = connect_db(path, check_same_thread=False)
+        barrier.wait()
+        for i in range(writes):
+            start = time.perf_counter()
+            try:
+                if legacy:
+                    conn.execute(sql, (f"W{n}-{i}", str(n)))
+                    conn.commit()
+                else:
+                    writer.execute(sql, (f"W{n}-{i}", str(n))).result()
+                latencies[n].append(time.perf_counter() - start)
+            except sqlite3.OperationalError:
+                errors[n] += 1
+                if conn is not None and conn.in_transaction:
+                    conn.rollback()
+        if conn is not None:
+            conn.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        list(pool.map(client, range(writers)))
+    elapsed = time.perf_counter() - start
+
+    check = connect_db(path)
+    stored = check.execute("SELECT COUNT(*) FROM suppliers").fetchone()[0]
+    check.close()
+    result = {
+        'writers': writers,
+        'attempted': writers * writes,
+        'stored': stored,
+        'lock_errors': sum(errors),
+        'rows_per_sec': stored / elapsed,
+        'latency': summarize([t for per in latencies for t in per]),
+    }
+    if writer is not None:
+        writer.stop()
+        stats = writer.stats()
+        result.update(commits=stats['commits'], rows_per_commit=stats['per_commit'], retried=stats['retried'])
+    else:
+        result['commits'] = stored
+    return result
+
+
+def cmd_writers(args):
+    results = {}
+    for mode in ('legacy', 'wal', 'writer'):
+        with tempfile.TemporaryDirectory() as workdir:
+            results[mode] = bench_writers(workdir, args.writers, args.writes, mode)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+# Τρέχει σε νέα διεργασία: το πρώτο run πληρώνει imports και αρχικοποίηση
+STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+harness = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+first = time.perf_counter()
+at.run()
+rerun = time.perf_counter()
+print(json.dumps({
+    'harness_s': harness - started,
+    'first_run_s': first - harness,
+    'rerun_s': rerun - first,
+    'pandas_loaded': 'pandas' in sys.modules,
+    'error': bool(at.exception),
+}))
+"""
+
+
+def bench_startup(runs):
+    """Χρόνος ως την πρώτη σχεδίαση της σελίδας σύνδεσης, από κρύα διεργασία."""
+    app = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wms_app.py')
+    samples = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as workdir:
+            out = subprocess.run(
+                [sys.executable, '-c', STARTUP_PROBE, app],
+                cwd=workdir, capture_output=True, text=True, check=True,
+            ).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    return {
+        'runs': runs,
+        'first_run': summarize([s['first_run_s'] for s in samples]),
+        'rerun': summarize([s['rerun_s'] for s in samples]),
+        'pandas_loaded': any(s['pandas_loaded'] for s in samples),
+        'errors': sum(s['error'] for s in samples),
+    }
+
+
+def cmd_startup(args):
+    print(json.dumps(bench_startup(args.runs), indent=2, ensure_ascii=False))
+
+
+def bench_reset(workdir, students, workers=8, products=2000):
+    """Επαναφορά τάξης students μαθητών από το στιγμιότυπο ενός μαθητή."""
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        wms = StudentWMS()
+        ids = [f"s{n:05d}" for n in range(students)]
+        for student_id in ids:
+            wms.register_student(student_id, student_id, "Τ1")
+            wms.create_student_database(student_id)
+        conn = connect_db(wms.student_db_path(ids[0]))
+        generate_student_db(conn, random.Random(42), products=products, locations=50, suppliers=20,
+                            invoices=200, lines=5)
+        conn.close()
+
+        results = {'students': students, 'workers': workers}
+        results['snapshot_class'] = wms.snapshots.take('bench', ids, workers=workers)
+        template = wms.snapshots.catalog('bench')[0]
+        results['template_bytes'] = template['size']
+        restore = wms.snapshots.restore_class("Τ1", template['digest'], workers=workers)
+        results['restore_class'] = {
+            'restored': restore['restored'],
+            'busy': len(restore['busy']),
+            'seconds': restore['seconds'],
+            'per_sec': restore['restored'] / restore['seconds'],
+        }
+        # Χωρίς στιγμιότυπα: διαγραφή των βάσεων και νέα δημιουργία από το template
+        started = time.perf_counter()
+        for student_id in ids:
+            path = wms.student_db_path(student_id)
+            wms.pool.discard(student_id)
+            os.remove(path)
+            wms.create_student_database(student_id)
+        results['delete_recreate_seconds'] = time.perf_counter() - started
+        return results
+    finally:
+        os.chdir(cwd)
+
+
+def cmd_reset(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        results = bench_reset(workdir, args.students, args.workers)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+def bench_reorder(workdir, products, invoices, lines=5, repeat=10):
+    """Προτάσεις αναπαραγγελίας σε μεγάλο κατάλογο και κόστος της λίστας χαμηλού αποθέματος."""
+    path = fresh_student_db(workdir)
+    conn = connect_db(path)
+    rng = random.Random(42)
+    generate_student_db(conn, rng, products=products, locations=0, suppliers=200,
+                        invoices=invoices, lines=lines)
+    # Σημείο αναπαραγγελίας στο μισό κατάλογο και προμηθευτής στο 80%
+    conn.execute("UPDATE products SET reorder_point = abs(random()) % 100 WHERE id % 2 = 0")
+    conn.executemany(
+        "INSERT OR IGNORE INTO product_suppliers (product_id, supplier_id, lead_time_days) VALUES (?, ?, ?)",
+        ((pid, rng.randint(1, 200), rng.randint(1, 21)) for pid in range(1, products + 1) if pid % 5)
+    )
+    conn.commit()
+    conn.execute("PRAGMA optimize")
+
+    # Το τέλος του έτους των συνθετικών παραστατικών, ώστε το παράθυρο να έχει ζήτηση
+    planner, today = ReorderPlanner(), date(2026, 12, 28)
+    results = {'products': products, 'invoices': invoices}
+    for label, details in (('counts', False), ('details', True)):
+        latencies = []
+        for _ in range(repeat):
+            plan = planner.plan(conn, today=today, details=details)
+            latencies.append(plan['seconds'])
+        results[label] = dict(summarize(latencies), due=plan['due'], units=plan['units'])
+
+    timings = {}
+    for label, sql in (
+        ('low_stock_table', "SELECT COUNT(*) FROM low_stock"),
+        ('full_scan', "SELECT COUNT(*) FROM products WHERE quantity <= reorder_point"),
+    ):
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            count = conn.execute(sql).fetchone()[0]
+            latencies.append(time.perf_counter() - started)
+        timings[label] = dict(summarize(latencies), count=count)
+    results['low_stock_count'] = timings
+
+    # Κόστος των triggers στη ροή αποθέματος: 10k ενημερώσεις ποσότητας
+    started = time.perf_counter()
+    with conn:
+        conn.executemany(
+            "UPDATE products SET quantity = quantity + ? WHERE id = ?",
+            ((rng.randint(-50, 50), rng.randint(1, products)) for _ in range(10000))
+        )
+    results['stock_updates_per_sec'] = 10000 / (time.perf_counter() - started)
+    conn.close()
+    return results
+
+
+def cmd_reorder(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        results = bench_reorder(workdir, args.products, args.invoices)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+def _add_supplier(conn, name):
+    conn.execute("INSERT INTO suppliers (name, afm) VALUES (?, ?)", (name, '000000000'))
+
+
+def multiprocess_worker(tokens, sessions, duration, write_ratio, barrier, results):
+    """Μία διεργασία «Streamlit» χωρίς UI: sessions threads που, όπως ένα
+    rerun, διαβάζουν το session από το token, κάνουν poll τις ειδοποιήσεις
+    και μετά είτε σελίδα με πίνακα ελέγχου είτε εγγραφή με ακύρωση cache.
+    Τα tokens είναι κοινά σε όλες τις διεργασίες, σαν load balancer χωρίς
+    sticky sessions.
+    """
+    wms, store, notifier = get_wms(), get_session_store(), get_notifier()
+    table, columns, search_columns = PRODUCT_LIST
+    latencies = [[] for _ in range(sessions)]
+    writes = [0] * sessions
+    barrier.wait()
+    deadline = time.perf_counter() + duration
+
+    def session(n):
+        rng = random.Random(f"{os.getpid()}-{n}")
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            student_id = store.get(rng.choice(tokens))['student_id']
+            notifier.poll()
+            if rng.random() < write_ratio:
+                wms.write(student_id, _add_supplier, f"MP{os.getpid()}-{n}").result()
+                dashboard_cache.invalidate(student_id)
+                writes[n] += 1
+            else:
+                with wms.student_db(student_id) as db:
+                    dashboard_cache.get(student_id, db)
+                    keyset_page(db, table, columns, "name", search_columns)
+            latencies[n].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    notifier.flush()
+    writers = wms.writers.stats()
+    results.put({
+        'latencies': [t for per in latencies for t in per],
+        'writes': sum(writes),
+        'notifier': notifier.stats(),
+        'lease_wait_ms': sum(w['lease_wait_ms'] for w in writers),
+        'commits': sum(w['commits'] for w in writers),
+    })
+    wms.writers.close_all()
+
+
+def bench_multiprocess(workdir, workers, students, sessions, duration, write_ratio):
+    """Ρυθμός ίδιου φόρτου με 1..N διεργασίες πάνω στις ίδιες βάσεις.
+
+    Μετρά και ότι καμία εγγραφή δεν χάθηκε: οι προμηθευτές όλων των βάσεων
+    πρέπει να αυξηθούν ακριβώς όσο οι εγγραφές που επιβεβαιώθηκαν.
+    """
+    wms, ids = generate_class(workdir, students, products=2000, locations=20, suppliers=20,
+                              invoices=200, lines=3)
+    store = SessionStore(os.path.join(workdir, COORDINATION_DB))
+    tokens = [store.create({'student_id': s}) for s in ids]
+    paths = [os.path.join(workdir, wms.student_db_path(s)) for s in ids]
+
+    def suppliers():
+        total = 0
+        for path in paths:
+            conn = connect_db(path)
+            total += conn.execute("SELECT COUNT(*) FROM suppliers").fetchone()[0]
+            conn.close()
+        return total
+
+    # Τα παιδιά διαβάζουν το WMS_MULTIPROCESS στο import και ξεκινούν στον φάκελο του γονέα
+    ctx = multiprocessing.get_context('spawn')
+    os.environ['WMS_MULTIPROCESS'] = '1'
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    results = {'cpu_count': os.cpu_count(), 'students': students, 'sessions_per_worker': sessions}
+    try:
+        for n in workers:
+            before = suppliers()
+            barrier, queue = ctx.Barrier(n), ctx.Queue()
+            procs = [
+                ctx.Process(target=multiprocess_worker, args=(tokens, sessions, duration, write_ratio, barrier, queue))
+                for _ in range(n)
+            ]
+            for p in procs:
+                p.start()
+            reports = [queue.get() for _ in procs]
+            for p in procs:
+                p.join()
+            latencies = [t for r in reports for t in r['latencies']]
+            writes = sum(r['writes'] for r in reports)
+            results[n] = {
+                'ops_per_sec': len(latencies) / duration,
+                'latency': summarize(latencies),
+                'writes': writes,
+                'lost_writes': before + writes - suppliers(),
+                'commits': sum(r['commits'] for r in reports),
+                'lease_wait_ms': sum(r['lease_wait_ms'] for r in reports),
+                'notifications_published': sum(r['notifier']['published'] for r in reports),
+                'notifier_commits': sum(r['notifier']['flushes'] for r in reports),
+                'notifications_received': sum(r['notifier']['received'] for r in reports),
+            }
+    finally:
+        os.chdir(cwd)
+        os.environ.pop('WMS_MULTIPROCESS', None)
+    base = results[workers[0]]['ops_per_sec'] / workers[0]
+    for n in workers:
+        results[n]['speedup'] = results[n]['ops_per_sec'] / base
+        results[n]['efficiency'] = results[n]['speedup'] / n
+    return results
+
+
+def cmd_multiprocess(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        results = bench_multiprocess(workdir, args.workers, args.students, args.sessions,
+                                     args.duration, args.write_ratio)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+CATEGORIES = ["ΤΡΟΦΙΜΑ", "ΠΟΤΑ", "ΕΙΔΗ ΚΑΘΑΡΙΣΜΟΥ", "ΧΑΡΤΙΚΑ", "ΗΛΕΚΤΡΙΚΑ", "ΑΛΛΟ"]
+DOC_TYPES = ["Τιμολόγιο", "Δελτίο Αποστολής"]
+
+# Ίδια ορίσματα με τις λίστες των σελίδων Προϊόντα και Τιμολόγια
+PRODUCT_LIST = (
+    "products",
+    ["name", "category", "barcode", "quantity", "description", "created_date"],
+    ["name", "category", "barcode", "description"],
+)
+
+
+def generate_student_db(conn, rng, products, locations, suppliers, invoices, lines):
+    """Γεμίζει μια άδεια βάση μαθητή με συνθετικά δεδομένα."""
+    conn.executemany(
+        "INSERT INTO products (name, description, category, barcode, quantity, created_date) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (
+                f"Προϊόν {i:07d}", f"Περιγραφή {i}", rng.choice(CATEGORIES), f"{i:013d}",
+                rng.randint(0, 500), f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 10:00:00",
+            )
+            for i in range(products)
+        )
+    )
+    record_opening_stock(conn, 1)
+    conn.executemany(
+        "INSERT INTO locations (location_code, zone, description) VALUES (?, ?, ?)",
+        ((f"{chr(65 + i % 26)}-{i:04d}", chr(65 + i % 26), f"Ράφι {i}") for i in range(locations))
+    )
+    conn.executemany(
+        "INSERT INTO suppliers (name, afm, phone, email) VALUES (?, ?, ?, ?)",
+        ((f"Προμηθευτής {i}", f"{i:09d}", f"210{i:07d}", f"s{i}@example.gr") for i in range(suppliers))
+    )
+    conn.executemany(
+        "INSERT INTO invoices (doc_number, doc_type, doc_date, customer_name, afm) VALUES (?, ?, ?, ?, ?)",
+        (
+            (f"INV-{i:06d}", rng.choice(DOC_TYPES), f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+             f"Πελάτης {rng.randint(1, 200)}", f"{rng.randint(0, 10**9):09d}")
+            for i in range(invoices)
+        )
+    )
+    if products:
+        conn.executemany(
+            "INSERT INTO invoice_lines (invoice_id, product_id, quantity) VALUES (?, ?, ?)",
+            (
+                (inv, rng.randint(1, products), rng.randint(1, 10))
+                for inv in range(1, invoices + 1) for _ in range(lines)
+            )
+        )
+    conn.commit()
+
+
+def generate_class(workdir, students, seed=42, **scale):
+    """N μαθητές στη master.db, με μια συνθετική βάση ο καθένας.
+
+    Κάθε μαθητής παίρνει δικό του seed (seed + n), οπότε το ίδιο σενάριο
+    δίνει πάντα τα ίδια δεδομένα. Επιστρέφει τα ids των μαθητών.
+    """
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        wms = StudentWMS()
+        ids = [f"s{n:05d}" for n in range(students)]
+        for n, student_id in enumerate(ids):
+            wms.register_student(student_id, f"Μαθητής {n}", f"Τ{n % 20}")
+            wms.create_student_database(student_id)
+            conn = connect_db(wms.student_db_path(student_id))
+            generate_student_db(conn, random.Random(seed + n), **scale)
+            conn.execute("PRAGMA optimize")
+            conn.close()
+        return wms, ids
+    finally:
+        os.chdir(cwd)
+
+
+def run_workload(operation, iterations):
+    """Εκτελεί iterations φορές και επιστρέφει ρυθμό και percentiles."""
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        t = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    return {'ops_per_sec': iterations / elapsed if elapsed else 0.0, **summarize(latencies)}
+
+
+def bench_suite(workdir, students, iterations, seed=42, **scale):
+    """Τα ερωτήματα κάθε σελίδας πάνω σε συνθετική τάξη."""
+    wms, ids = generate_class(workdir, students, seed=seed, **scale)
+    conns = [connect_db(os.path.join(workdir, wms.student_db_path(s))) for s in ids]
+    rng = random.Random(seed)
+    products = scale['products']
+    table, columns, search_columns = PRODUCT_LIST
+
+    def dashboard(i):
+        # Κρύος υπολογισμός, όπως μετά από κάθε εγγραφή· ο planner δεν τρέχει εδώ,
+        # όπως και στην εφαρμογή
+        DashboardSummaryCache().get(ids[i % students], conns[i % students])
+
+    cursors = {}
+
+    def product_list(i):
+        # Πρώτη σελίδα, μετά «Επόμενη» μέχρι το τέλος, και κάθε 10η με φίλτρο
+        n = i % students
+        search = "Προϊόν 00001" if i % 10 == 9 else ''
+        rows, has_next = keyset_page(
+            conns[n], table, columns, "name", search_columns, search, cursors.get(n)
+        )
+        cursors[n] = (rows[-1][1], rows[-1][0]) if has_next and not search else None
+
+    def invoice_create(i):
+        lines = {rng.randint(1, products): 1 for _ in range(rng.randint(1, 5))}
+        save_invoice(conns[i % students], {
+            'doc_number': f"B-{i:06d}", 'doc_type': DOC_TYPES[0], 'doc_date': "2026-10-18",
+            'customer_name': "Πελάτης", 'afm': "", 'address': "",
+        }, lines)
+
+    def inventory(i):
+        load_inventory(conns[i % students])
+
+    # Τα παραστατικά μειώνουν απόθεμα, οπότε φροντίζουμε να υπάρχει
+    for conn in conns:
+        location_id = unallocated_location(conn)
+        post_movements(conn, [
+            movement for pid in range(1, products + 1) for movement in receipt(pid, location_id, iterations)
+        ])
+
+    results = {}
+    for name, operation in (
+        ('dashboard', dashboard),
+        ('product_list', product_list),
+        ('invoice_create', invoice_create),
+        ('inventory', inventory),
+    ):
+        results[name] = run_workload(operation, iterations)
+    for conn in conns:
+        conn.close()
+    return results
+
+
+def compare_baseline(results, baseline, threshold):
+    """Λίστα με τα workloads που χειροτέρεψαν πάνω από το threshold."""
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if current['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.3f} -> {current['p95_ms']:.3f} ms")
+        if current['ops_per_sec'] < before['ops_per_sec'] / (1 + threshold):
+            regressions.append(
+                f"{name}: ops/sec {before['ops_per_sec']:.1f} -> {current['ops_per_sec']:.1f}"
+            )
+    return regressions
+
+
+def cmd_suite(args):
+    scale = {
+        'products': args.products, 'locations': args.locations, 'suppliers': args.suppliers,
+        'invoices': args.invoices, 'lines': args.lines,
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        results = bench_suite(workdir, args.students, args.iterations, seed=args.seed, **scale)
+    report = {
+        'config': {'students': args.students, 'iterations': args.iterations, 'seed': args.seed,
+                   'instrumented': INSTRUMENT, **scale},
+        'results': results,
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['config'] != report['config']:
+            print("⚠️ Διαφορετικές ρυθμίσεις από το baseline", file=sys.stderr)
+        report['regressions'] = compare_baseline(results, baseline['results'], args.threshold)
+        status = 1 if report['regressions'] else 0
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks του WMS Μαθητών")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('storage', help="rollback journal έναντι WAL προφίλ")
+    p.add_argument('--writes', type=int, default=500)
+    p.add_argument('--readers', type=int, default=4)
+    p.add_argument('--duration', type=float, default=2.0)
+    p.set_defaults(func=cmd_storage)
+
+    p = sub.add_parser('dashboard', help="δείκτες πίνακα ελέγχου ανά πλήθος προϊόντων")
+    p.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    p.add_argument('--repeat', type=int, default=20)
+    p.set_defaults(func=cmd_dashboard)
+
+    p = sub.add_parser('import', help="μαζική εισαγωγή προϊόντων έναντι μίας-μίας")
+    p.add_argument('--rows', type=int, default=50000)
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser('ledger', help="ημερολόγιο κινήσεων και υπόλοιπα ανά θέση")
+    p.add_argument('--movements', type=int, default=1000000)
+    p.add_argument('--batch', type=int, default=1000)
+    p.set_defaults(func=cmd_ledger)
+
+    p = sub.add_parser('analytics', help="συγκεντρωτικά καθηγητή πάνω σε πολλές βάσεις")
+    p.add_argument('--students', type=int, default=2000)
+    p.add_argument('--workers', type=int, default=8)
+    p.set_defaults(func=cmd_analytics)
+
+    p = sub.add_parser('login', help="p99 εγγραφής και σύνδεσης σε ταυτόχρονα sessions")
+    p.add_argument('--sessions', type=int, default=500)
+    p.set_defaults(func=cmd_login)
+
+    p = sub.add_parser('search', help="barcode και αναζήτηση κειμένου σε μεγάλο κατάλογο")
+    p.add_argument('--products', type=int, default=1000000)
+    p.add_argument('--lookups', type=int, default=1000)
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser('invoices', help="μαζική απόδοση παραστατικών, έγγραφα/δευτ.")
+    p.add_argument('--invoices', type=int, default=5000)
+    p.add_argument('--workers', type=int, default=4)
+    p.add_argument('--format', choices=['html', 'pdf'], default='html')
+    p.set_defaults(func=cmd_invoices)
+
+    p = sub.add_parser('writers', help="ταυτόχρονοι εγγραφείς σε μία βάση: commit ανά εγγραφή έναντι group commit")
+    p.add_argument('--writers', type=int, default=50)
+    p.add_argument('--writes', type=int, default=100)
+    p.set_defaults(func=cmd_writers)
+
+    p = sub.add_parser('startup', help="χρόνος ως την πρώτη σχεδίαση σε νέα διεργασία")
+    p.add_argument('--runs', type=int, default=5)
+    p.set_defaults(func=cmd_startup)
+
+    p = sub.add_parser('reset', help="στιγμιότυπο και επαναφορά ολόκληρης τάξης")
+    p.add_argument('--students', type=int, default=500)
+    p.add_argument('--workers', type=int, default=8)
+    p.set_defaults(func=cmd_reset)
+
+    p = sub.add_parser('reorder', help="προτάσεις αναπαραγγελίας και λίστα χαμηλού αποθέματος")
+    p.add_argument('--products', type=int, default=100000)
+    p.add_argument('--invoices', type=int, default=50000)
+    p.set_defaults(func=cmd_reorder)
+
+    p = sub.add_parser('multiprocess', help="κλιμάκωση από 1 σε N διεργασίες με κοινά sessions και βάσεις")
+    p.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    p.add_argument('--students', type=int, default=40)
+    p.add_argument('--sessions', type=int, default=8, help="ταυτόχρονα sessions ανά διεργασία")
+    p.add_argument('--duration', type=float, default=5)
+    p.add_argument('--write-ratio', type=float, default=0.2)
+    p.set_defaults(func=cmd_multiprocess)
+
+    p = sub.add_parser('suite', help="ερωτήματα σελίδων σε συνθετική τάξη, με σύγκριση baseline")
+    p.add_argument('--students', type=int, default=5)
+    p.add_argument('--products', type=int, default=10000)
+    p.add_argument('--locations', type=int, default=200)
+    p.add_argument('--suppliers', type=int, default=100)
+    p.add_argument('--invoices', type=int, default=2000)
+    p.add_argument('--lines', type=int, default=5, help="γραμμές ανά παραστατικό")
+    p.add_argument('--iterations', type=int, default=200)
+    p.add_argument('--seed', type=int, default=42)
+    p.add_argument('--baseline', help="JSON προηγούμενης εκτέλεσης για σύγκριση")
+    p.add_argument('--threshold', type=float, default=0.2, help="ανεκτή επιβάρυνση, π.χ. 0.2 = 20%%")
+    p.add_argument('--save-baseline', help="αποθήκευση των αποτελεσμάτων ως νέο baseline")
+    p.set_defaults(func=cmd_suite)
+
+    args = parser.parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())